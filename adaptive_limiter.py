@@ -0,0 +1,119 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class AdaptiveLimiter:
+    """
+    AIMD自适应并发限制器
+
+    每收集window个成功请求的耗时计算一次p95：p95不超过基线的tolerance倍时并发上限加1，
+    否则按latency_backoff收缩；遇到超时、429或5xx时并发上限立即按error_backoff减半。
+    """
+
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=100, window=20,
+                 tolerance=1.5, error_backoff=0.5, latency_backoff=0.9):
+        """
+        :param initial_limit: 初始并发上限，默认为10
+        :param min_limit: 最小并发上限，默认为1
+        :param max_limit: 最大并发上限，默认为100
+        :param window: 每次调整所需的成功请求样本数，默认为20
+        :param tolerance: p95相对基线的容忍倍数，默认为1.5
+        :param error_backoff: 出错时并发上限的收缩系数，默认为0.5
+        :param latency_backoff: 延迟升高时并发上限的收缩系数，默认为0.9
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.tolerance = tolerance
+        self.error_backoff = error_backoff
+        self.latency_backoff = latency_backoff
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.baseline_p95 = None
+        self.last_p95 = None
+        self.increases = 0
+        self.decreases = 0
+        self.errors = 0
+        self._samples = []
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self):
+        """当前并发上限"""
+        return int(self._limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        占用一个并发名额，退出时释放
+
+        :return: 名额的开始时间（time.monotonic），用于调用record
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield time.monotonic()
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, started, ok):
+        """
+        记录一次请求结果并调整并发上限
+
+        应在slot退出前调用，上限增加后由释放名额时的通知唤醒等待中的请求。
+
+        :param started: slot返回的开始时间
+        :param ok: 请求是否正常（超时、429或5xx为False）
+        """
+        now = time.monotonic()
+        if not ok:
+            self.errors += 1
+            # 同一批在途请求的连续错误只收缩一次
+            if started >= self._last_decrease:
+                self._decrease(self.error_backoff, now)
+            return
+
+        self._samples.append(now - started)
+        if len(self._samples) < self.window:
+            return
+
+        samples = sorted(self._samples)
+        self._samples = []
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        self.last_p95 = p95
+
+        if self.baseline_p95 is None or p95 <= self.baseline_p95 * self.tolerance:
+            self.baseline_p95 = p95 if self.baseline_p95 is None else 0.8 * self.baseline_p95 + 0.2 * p95
+            if self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1)
+                self.increases += 1
+        else:
+            self._decrease(self.latency_backoff, now)
+
+    def _decrease(self, factor, now):
+        self._limit = max(self.min_limit, self._limit * factor)
+        self._samples = []
+        self._last_decrease = now
+        self.decreases += 1
+
+    def stats(self):
+        """
+        获取限制器当前状态
+
+        :return: 包含当前上限、在途请求数、p95和调整次数的字典
+        """
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'last_p95': self.last_p95,
+            'baseline_p95': self.baseline_p95,
+            'increases': self.increases,
+            'decreases': self.decreases,
+            'errors': self.errors
+        }
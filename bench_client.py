@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+from page_tuner import PageSizeTuner
+from registry_crawl import RegistryCrawler
+
+
+def percentile(values, q):
+    """
+    :param values: 已排序的数值列表
+    :param q: 分位数，如0.95
+    :return: 最近秩分位数，列表为空时返回None
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(q * len(values))) - 1))]
+
+
+def summarize(name, started, latencies, errors, ops=None):
+    """
+    汇总一个场景的结果
+
+    :param name: 场景名
+    :param started: 场景开始时间（time.perf_counter）
+    :param latencies: 每次操作的耗时（秒）列表
+    :param errors: 失败的操作数
+    :param ops: 计入吞吐量的操作数，默认为None表示len(latencies)
+    :return: 结果字典
+    """
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latencies)
+    ops = len(latencies) if ops is None else ops
+    return {
+        'scenario': name,
+        'ops': ops,
+        'errors': errors,
+        'elapsed': elapsed,
+        'ops_per_sec': ops / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99)
+    }
+
+
+async def bench_update_control(client, server, ops, batch, concurrency):
+    """每次操作为一批采集器调用update_control_by_serial_no"""
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def run(i):
+        nonlocal errors
+        start = (i * batch) % max(1, len(serial_nos))
+        chunk = (serial_nos[start:] + serial_nos[:start])[:batch]
+        async with semaphore:
+            op_started = time.perf_counter()
+            result = await client.update_control_by_serial_no(chunk, resolver='lookup')
+            latencies.append(time.perf_counter() - op_started)
+        if not result['success']:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run(i) for i in range(ops)])
+    return summarize('update_control_by_serial_no', started, latencies, errors)
+
+
+async def bench_renumber(client, server, ops, concurrency):
+    """每次操作为一个户阀调用update_valve_serial_no（查询+更新）"""
+    valves = server.valves[:ops]
+    tasks = [(valve['serialNo'], valve['address'], str(int(valve['serialNo']) + 50000000)) for valve in valves]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def run(task):
+        nonlocal errors
+        async with semaphore:
+            op_started = time.perf_counter()
+            result = await client.update_valve_serial_no(*task)
+            latencies.append(time.perf_counter() - op_started)
+        if not result['success']:
+            errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run(task) for task in tasks])
+    return summarize('update_valve_serial_no', started, latencies, errors)
+
+
+async def bench_scan(client, page_size, stream):
+    """全量翻页扫描户阀，吞吐量按记录数计算，延迟按页计算"""
+    latencies = []
+    count = 0
+    errors = 0
+    started = time.perf_counter()
+    page_started = started
+    try:
+        async for _ in client.iter_household_valves(FindHouseholdValveParams(page_size=page_size), stream=stream):
+            count += 1
+            if count % page_size == 0:
+                now = time.perf_counter()
+                latencies.append(now - page_started)
+                page_started = now
+    except RuntimeError:
+        errors += 1
+    name = 'full_scan_stream' if stream else 'full_scan'
+    return summarize(name, started, latencies, errors, ops=count)
+
+
+async def bench_crawl(client, page_size, concurrency, split_threshold):
+    """按组织树分区并行扫描户阀，吞吐量按记录数计算，延迟按请求计算"""
+    crawler = RegistryCrawler(client, FindHouseholdValveParams(page_size=page_size),
+                              max_concurrency=concurrency, split_threshold=split_threshold)
+    started = time.perf_counter()
+    count = 0
+    errors = 0
+    try:
+        async for _ in crawler.iter_valves():
+            count += 1
+    except RuntimeError:
+        errors += 1
+    result = summarize('registry_crawl', started, [], errors, ops=count)
+    # 分区之间交错返回，按客户端统计的findHouseholdValve请求延迟代替
+    latency = client.metrics.snapshot().get('findHouseholdValve', {}).get('latency', {})
+    result.update({q: latency.get(q) for q in ('p50', 'p95', 'p99')})
+    return result
+
+
+async def bench_scan_tuned(client):
+    """全量翻页扫描户阀，每页大小由page_tuner自动调整，吞吐量按记录数计算，延迟按请求计算"""
+    started = time.perf_counter()
+    count = 0
+    errors = 0
+    try:
+        async for _ in client.iter_household_valves():
+            count += 1
+    except RuntimeError:
+        errors += 1
+    result = summarize('full_scan_tuned', started, [], errors, ops=count)
+    latency = client.metrics.snapshot().get('findHouseholdValve', {}).get('latency', {})
+    result.update({q: latency.get(q) for q in ('p50', 'p95', 'p99')})
+    result['page_tuner'] = client.page_tuner.stats()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    与基线结果对比吞吐量
+
+    :param results: 本次结果列表
+    :param baseline: 基线结果列表
+    :param tolerance: 允许的吞吐量下降比例
+    :return: 退化的场景描述列表
+    """
+    baseline_by_name = {item['scenario']: item for item in baseline}
+    regressions = []
+    for item in results:
+        base = baseline_by_name.get(item['scenario'])
+        if base and item['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{item['scenario']}: {item['ops_per_sec']:.1f} ops/s，基线 {base['ops_per_sec']:.1f} ops/s"
+            )
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='基于模拟服务的客户端吞吐量和尾延迟基准测试')
+    parser.add_argument('--valves', type=int, default=10000, help='模拟户阀数量')
+    parser.add_argument('--net-equipment', type=int, default=500, help='模拟采集器数量')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟服务的基础延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.01, help='模拟服务的随机附加延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟HTTP 500的概率')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='模拟超时的概率')
+    parser.add_argument('--record-latency', type=float, default=0.0, help='查询接口每返回一条记录增加的延迟（秒）')
+    parser.add_argument('--ops', type=int, default=200, help='update_control和renumber场景的操作次数')
+    parser.add_argument('--batch', type=int, default=50, help='每次update_control下发的采集器数量')
+    parser.add_argument('--concurrency', type=int, default=10, help='同时执行的操作数')
+    parser.add_argument('--page-size', type=int, default=1000, help='全量扫描的每页记录数')
+    parser.add_argument('--page-tuning', default=':memory:',
+                        help="scan_tuned场景的每页大小调整记录文件，默认为':memory:'表示每次从初始值开始")
+    parser.add_argument('--split-threshold', type=int, default=2000, help='分区扫描场景中记录数超过该值的节点才拆分')
+    parser.add_argument('--scenarios', default='update_control,renumber,scan,scan_stream,scan_tuned,crawl',
+                        help='要运行的场景，逗号分隔')
+    parser.add_argument('--output', help='将结果写入JSON文件，可作为之后的基线')
+    parser.add_argument('--baseline', help='基线结果JSON文件，吞吐量下降超过tolerance时返回非0')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许的吞吐量下降比例')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    results = []
+    for name in scenarios:
+        # 每个场景使用新的模拟数据和客户端，互不影响
+        server = MockValveServer(
+            valve_count=args.valves,
+            net_equipment_count=args.net_equipment,
+            latency=args.latency,
+            latency_jitter=args.jitter,
+            error_rate=args.error_rate,
+            timeout_rate=args.timeout_rate,
+            record_latency=args.record_latency
+        )
+        page_tuner = PageSizeTuner(args.page_tuning) if name == 'scan_tuned' else None
+        async with HouseValveClient(**server.client_kwargs(), page_tuner=page_tuner) as client:
+            if name == 'update_control':
+                result = await bench_update_control(client, server, args.ops, args.batch, args.concurrency)
+            elif name == 'renumber':
+                result = await bench_renumber(client, server, args.ops, args.concurrency)
+            elif name in ('scan', 'scan_stream'):
+                result = await bench_scan(client, args.page_size, name == 'scan_stream')
+            elif name == 'scan_tuned':
+                result = await bench_scan_tuned(client)
+            elif name == 'crawl':
+                result = await bench_crawl(client, args.page_size, args.concurrency, args.split_threshold)
+            else:
+                parser.error(f"未知场景：{name}")
+            result['requests'] = dict(server.calls)
+            result['server_max_in_flight'] = server.max_in_flight
+            result['endpoints'] = {
+                endpoint: stats['latency'] for endpoint, stats in client.metrics.snapshot().items()
+            }
+        if page_tuner is not None:
+            page_tuner.close()
+        results.append(result)
+
+        def ms(value):
+            return '-' if value is None else f"{value * 1000:.1f}"
+
+        print(f"{result['scenario']}: {result['ops']} 次操作，{result['elapsed']:.2f} 秒，"
+              f"{result['ops_per_sec']:.1f} ops/s，p50/p95/p99 {ms(result['p50'])}/{ms(result['p95'])}/{ms(result['p99'])} ms，"
+              f"失败 {result['errors']}，请求 {sum(result['requests'].values())} 次，服务端最大并发 {result['server_max_in_flight']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"性能退化：{regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
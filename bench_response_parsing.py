@@ -0,0 +1,100 @@
+import argparse
+import json
+import time
+from json_stream import json_loads, orjson
+from models import HouseholdValve, parse_response
+
+
+def build_page(rows):
+    """生成一页模拟的findHouseholdValve响应内容"""
+    valves = []
+    for i in range(rows):
+        valves.append({
+            'uniqueId': i,
+            'serialNo': str(24000000 + i),
+            'address': f'广安苑小区-{i % 30 + 1}#-一单元-{i % 2000 + 101}',
+            'stationBranchName': '广安苑换热站',
+            'stationBranchId': 12,
+            'type': '通断阀',
+            'unitName': '一单元',
+            'factoryId': 437,
+            'modelId': 88,
+            'netEquId': i % 500,
+            'collectorId': i % 500,
+            'port': 1,
+            'baudRate': '2400',
+            'checkBit': '偶校验',
+            'index': i % 64,
+            'caliber': 20,
+            'isReadCard': '不支持',
+            'isTemControl': '支持',
+            'isSettingTem': '支持',
+            'isTemRange': '不支持',
+            'isLockTem': '不支持',
+            'detailPosition': None,
+            'intermediatePath': '001-014-003',
+            'enabled': True,
+            'installDate': '2024-09-01',
+            'createDate': f'2024-09-01 08:{i // 60 % 60:02d}:{i % 60:02d}',
+            'memo': None,
+            'panelSerialNo': None,
+            'communicationType': 1,
+            'panelId': None,
+            'roomPanelId': None,
+            'identificationCode': None,
+            'equipmentUse': '调节阀',
+            'installSite': '户内',
+            'netEquName': f'采集器{i % 500}',
+            'roomType': '住宅'
+        })
+    return json.dumps({
+        'resultCode': 0,
+        'message': '成功',
+        'data': {'total': rows, 'data': valves}
+    }, ensure_ascii=False).encode('utf-8')
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应解析基准测试：原始字典 vs 校验模型 vs 免校验模型')
+    parser.add_argument('--rows', type=int, default=5000, help='每页记录数')
+    parser.add_argument('--repeat', type=int, default=10, help='重复次数，取最快一次')
+    args = parser.parse_args()
+
+    content = build_page(args.rows)
+
+    # 与客户端返回原始字典时的解码方式相同（已安装orjson时使用orjson）
+    def raw_dict():
+        result = json_loads(content)
+        for valve in result.get('data', {}).get('data'):
+            valve.get('serialNo'), valve.get('address'), valve.get('collectorId')
+
+    def validated():
+        result = parse_response(content, HouseholdValve)
+        for valve in result.data.data:
+            valve.serial_no, valve.address, valve.collector_id
+
+    def trusted():
+        result = parse_response(content, HouseholdValve, trusted=True)
+        for valve in result.data.data:
+            valve.serial_no, valve.address, valve.collector_id
+
+    print(f"每页 {args.rows} 条，响应 {len(content) / 1024:.0f} KB，取 {args.repeat} 次中最快一次，"
+          f"原始字典使用{'orjson' if orjson is not None else '标准库json'}解码")
+    baseline = None
+    for name, func in [('原始字典', raw_dict), ('校验模型', validated), ('免校验模型', trusted)]:
+        elapsed = best_of(args.repeat, func)
+        baseline = baseline or elapsed
+        print(f"  {name}: {elapsed * 1000:.1f} ms/页，{args.rows / elapsed:,.0f} 条/秒，相对原始字典 {elapsed / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
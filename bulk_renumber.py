@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import csv
+import sys
+import time
+from house_valve_client import HouseValveClient
+from valve_journal import ValveJournal
+
+
+CSV_FIELDS = ['query_serial_no', 'query_address', 'new_serial_no']
+RESULT_FIELDS = ['row', 'query_serial_no', 'query_address', 'new_serial_no', 'success', 'message', 'changes']
+
+
+class RateLimiter:
+    """按固定间隔放行的速率限制器"""
+
+    def __init__(self, rate):
+        """
+        :param rate: 每秒最多放行的次数，None或0表示不限制
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        """等待直到允许下一次执行"""
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_time > now:
+                await asyncio.sleep(self.next_time - now)
+                now = self.next_time
+            self.next_time = now + self.interval
+
+
+def read_renumber_csv(path):
+    """
+    读取阀号替换CSV文件
+
+    文件需包含表头 query_serial_no,query_address,new_serial_no
+
+    :param path: CSV文件路径
+    :return: 替换任务列表，每项为包含上述三个字段的字典
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing_fields = [field for field in CSV_FIELDS if field not in (reader.fieldnames or [])]
+        if missing_fields:
+            raise ValueError(f"CSV文件缺少字段：{missing_fields}")
+        return [
+            {field: (row[field] or '').strip() for field in CSV_FIELDS}
+            for row in reader
+        ]
+
+
+def group_conflicting_rows(rows):
+    """
+    将涉及相同阀号（旧阀号或新阀号）的任务分到同一组
+
+    同组任务按输入顺序依次执行，避免相互竞争；不同组之间可以并发执行。
+
+    :param rows: 替换任务列表
+    :return: 分组列表，每组为按输入顺序排列的 (行号, 任务) 元组列表
+    """
+    parent = {}
+
+    def find(serial_no):
+        parent.setdefault(serial_no, serial_no)
+        while parent[serial_no] != serial_no:
+            parent[serial_no] = parent[parent[serial_no]]
+            serial_no = parent[serial_no]
+        return serial_no
+
+    for row in rows:
+        parent[find(row['query_serial_no'])] = find(row['new_serial_no'])
+
+    groups = {}
+    for i, row in enumerate(rows):
+        groups.setdefault(find(row['query_serial_no']), []).append((i, row))
+    return list(groups.values())
+
+
+async def renumber_valves(client, rows, max_concurrency=5, rate=None, on_result=None, dry_run=False):
+    """
+    批量替换阀号
+
+    :param client: HouseValveClient实例
+    :param rows: 替换任务列表，每项包含query_serial_no、query_address、new_serial_no
+    :param max_concurrency: 同时执行的最大任务数，默认为5
+    :param rate: 每秒最多开始的任务数，默认为None表示不限制
+    :param on_result: 每个任务完成时的回调，参数为 (行号, 任务, 结果字典)
+    :param dry_run: 为True时只对比并返回每行需要修改的字段，不执行更新，默认为False
+    :return: 按输入顺序排列的结果字典列表，结果字典与update_valve_serial_no的返回值相同
+    """
+    results = [None] * len(rows)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    limiter = RateLimiter(rate)
+
+    async def run_group(group):
+        for i, row in group:
+            async with semaphore:
+                await limiter.wait()
+                result = await client.update_valve_serial_no(
+                    row['query_serial_no'],
+                    row['query_address'],
+                    row['new_serial_no'],
+                    dry_run=dry_run
+                )
+            results[i] = result
+            if on_result is not None:
+                on_result(i, row, result)
+
+    await asyncio.gather(*[run_group(group) for group in group_conflicting_rows(rows)])
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='批量替换户阀阀号')
+    parser.add_argument('input', help='替换任务CSV文件，表头为 query_serial_no,query_address,new_serial_no')
+    parser.add_argument('output', help='结果CSV文件，每个任务完成时写入一行')
+    parser.add_argument('--base-url', default='http://112.53.73.250:2288', help='接口地址')
+    parser.add_argument('--token', required=True, help='认证token')
+    parser.add_argument('--concurrency', type=int, default=5, help='同时执行的最大任务数')
+    parser.add_argument('--rate', type=float, default=None, help='每秒最多开始的任务数')
+    parser.add_argument('--dry-run', action='store_true', help='只输出每行需要修改的字段，不执行更新')
+    parser.add_argument('--journal', default=None, help='户阀修改日志文件，记录修改前镜像，可用valve_journal.py回滚')
+    args = parser.parse_args()
+
+    rows = read_renumber_csv(args.input)
+    print(f"共 {len(rows)} 个替换任务")
+
+    success_count = 0
+    skipped_count = 0
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+        def write_result(i, row, result):
+            nonlocal success_count, skipped_count
+            if result['success']:
+                success_count += 1
+            if result.get('skipped'):
+                skipped_count += 1
+            changes = result.get('changes') or {}
+            writer.writerow({
+                'row': i + 1,
+                **row,
+                'success': result['success'],
+                'message': result['message'],
+                'changes': '; '.join(f"{name}: {old} -> {new}" for name, (old, new) in changes.items())
+            })
+            f.flush()
+
+        journal = ValveJournal(args.journal) if args.journal else None
+        try:
+            async with HouseValveClient(base_url=args.base_url, token=args.token, journal=journal) as client:
+                await renumber_valves(client, rows, args.concurrency, args.rate, write_result, args.dry_run)
+        finally:
+            if journal is not None:
+                journal.close()
+                print(f"修改日志会话 {journal.session} 已写入 {args.journal}")
+
+    print(f"完成：成功 {success_count} 个（其中已是新阀号 {skipped_count} 个），失败 {len(rows) - success_count} 个，结果已写入 {args.output}")
+    return 0 if success_count == len(rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,234 @@
+import json
+import time
+import httpx
+
+
+# 延迟直方图的桶上界（秒），最后隐含+Inf桶
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class EndpointStats:
+    """单个接口的请求统计"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        # 状态码（字符串）或传输层异常类名到次数的映射
+        self.statuses = {}
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def observe(self, elapsed):
+        for i, bound in enumerate(self.buckets):
+            if elapsed <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.bucket_counts[i] += 1
+        self.latency_sum += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+
+    def quantile(self, q):
+        """
+        按直方图估算延迟分位数，桶内线性插值
+
+        :param q: 分位数，如0.95
+        :return: 延迟（秒），没有样本时返回None
+        """
+        count = sum(self.bucket_counts)
+        if not count:
+            return None
+
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                upper = self.buckets[i] if i < len(self.buckets) else self.latency_max
+                value = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(value, self.latency_max)
+            cumulative += bucket_count
+            if i < len(self.buckets):
+                lower = self.buckets[i]
+        return self.latency_max
+
+    def snapshot(self):
+        count = sum(self.bucket_counts)
+        return {
+            'requests': self.requests,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'statuses': dict(self.statuses),
+            'latency': {
+                'count': count,
+                'mean': self.latency_sum / count if count else None,
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+                'max': self.latency_max if count else None
+            }
+        }
+
+
+class RequestTrack:
+    """一次进行中的请求，由ClientMetrics.start创建"""
+    __slots__ = ('endpoint', 'request', 'started')
+
+    def __init__(self, endpoint, request, started):
+        self.endpoint = endpoint
+        self.request = request
+        self.started = started
+
+
+class ClientMetrics:
+    """
+    按接口统计请求数、延迟直方图、收发字节数、状态码分布和进行中的请求数
+
+    可导出为JSON快照或Prometheus文本格式，并支持请求前和响应后的回调。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, on_request=None, on_response=None):
+        """
+        :param buckets: 延迟直方图的桶上界（秒），默认为DEFAULT_BUCKETS
+        :param on_request: 请求发出前的回调，参数为 (接口名, httpx请求对象)
+        :param on_response: 请求结束后的回调，参数为 (接口名, httpx响应对象或None, 耗时秒数, 异常或None)
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.on_request = on_request
+        self.on_response = on_response
+        self.endpoints = {}
+
+    def endpoint(self, name):
+        """
+        :param name: 接口名，如findHouseholdValve
+        :return: 该接口的EndpointStats
+        """
+        stats = self.endpoints.get(name)
+        if stats is None:
+            stats = self.endpoints[name] = EndpointStats(self.buckets)
+        return stats
+
+    def start(self, endpoint, request):
+        """
+        记录请求开始
+
+        :param endpoint: 接口名
+        :param request: httpx请求对象
+        :return: RequestTrack，请求结束时传给finish
+        """
+        stats = self.endpoint(endpoint)
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        # GET接口的参数在查询字符串中，请求字节数按路径（含查询字符串）加请求体计算
+        stats.request_bytes += len(request.url.raw_path) + len(request.content)
+        if self.on_request is not None:
+            self.on_request(endpoint, request)
+        return RequestTrack(endpoint, request, time.monotonic())
+
+    def finish(self, track, response=None, error=None, elapsed=None):
+        """
+        记录请求结束
+
+        :param track: start返回的RequestTrack
+        :param response: httpx响应对象，请求失败时为None
+        :param error: 请求失败时的异常
+        :param elapsed: 耗时（秒），默认为None表示从start到现在
+        """
+        if elapsed is None:
+            elapsed = time.monotonic() - track.started
+        stats = self.endpoint(track.endpoint)
+        stats.in_flight -= 1
+        stats.observe(elapsed)
+
+        if response is not None:
+            status = str(response.status_code)
+            stats.response_bytes += _response_bytes(response)
+        else:
+            status = type(error).__name__ if error is not None else 'unknown'
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+        if self.on_response is not None:
+            self.on_response(track.endpoint, response, elapsed, error)
+
+    def snapshot(self):
+        """
+        :return: 以接口名为键的统计字典
+        """
+        return {name: stats.snapshot() for name, stats in sorted(self.endpoints.items())}
+
+    def to_json(self, **kwargs):
+        """
+        :return: JSON格式的统计快照
+        """
+        return json.dumps(self.snapshot(), ensure_ascii=False, **kwargs)
+
+    def to_prometheus(self, prefix='house_valve_client'):
+        """
+        导出为Prometheus文本格式
+
+        :param prefix: 指标名前缀，默认为house_valve_client
+        :return: Prometheus文本格式的字符串
+        """
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {metric_type}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+                lines.append(f'{prefix}_{name}{suffix}{{{label_text}}} {_format(value)}')
+
+        items = sorted(self.endpoints.items())
+        metric('requests_total', 'counter', 'Requests by endpoint and status', [
+            ('', (('endpoint', name), ('status', status)), count)
+            for name, stats in items for status, count in sorted(stats.statuses.items())
+        ])
+        metric('in_flight_requests', 'gauge', 'Requests currently in flight', [
+            ('', (('endpoint', name),), stats.in_flight) for name, stats in items
+        ])
+        metric('request_bytes_total', 'counter', 'Request path and body bytes sent', [
+            ('', (('endpoint', name),), stats.request_bytes) for name, stats in items
+        ])
+        metric('response_bytes_total', 'counter', 'Response body bytes received', [
+            ('', (('endpoint', name),), stats.response_bytes) for name, stats in items
+        ])
+
+        samples = []
+        for name, stats in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), stats.bucket_counts):
+                cumulative += count
+                samples.append(('_bucket', (('endpoint', name), ('le', _format(bound))), cumulative))
+            samples.append(('_sum', (('endpoint', name),), stats.latency_sum))
+            samples.append(('_count', (('endpoint', name),), cumulative))
+        metric('request_duration_seconds', 'histogram', 'Request latency in seconds', samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+def _response_bytes(response):
+    # 已读取的响应体优先按网络接收字节数计算，传输层直接给出内容（如MockTransport）时按内容长度计算
+    if response.num_bytes_downloaded:
+        return response.num_bytes_downloaded
+    try:
+        return len(response.content)
+    except httpx.ResponseNotRead:
+        return 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,228 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional
+from models import FindHouseholdMeterCurrentDataParams
+
+
+METER_ENDPOINT = 'findHouseholdMeterCurrentDataAdvanced'
+
+
+class CommStatusMonitor:
+    """
+    户阀抄通状态持续监控
+
+    阀号按batch_size分批，每个周期把各批次的查询均匀分布在interval内，并在各自的时间片内随机推迟，
+    避免所有查询集中在周期开始时发出。内存中保留每个阀号最近一次的状态（online、offline，
+    查询不到记录时为missing），只在状态变化时输出变化事件；查询失败的批次不改变状态。
+    客户端配置了read_cache时，其有效期应小于interval，否则会读到缓存的旧状态。
+    """
+
+    def __init__(self, client, serial_nos, interval=300.0, batch_size=500, jitter=0.5, max_concurrency=2,
+                 online_statuses=('正常',), on_transition=None, on_cycle=None,
+                 params: Optional[FindHouseholdMeterCurrentDataParams] = None, max_condition_length=3000,
+                 use_in=False, emit_initial=False, history=100, seed=None):
+        """
+        :param client: HouseValveClient实例
+        :param serial_nos: 要监控的阀号列表
+        :param interval: 每个周期的时长（秒），即每个阀号的查询间隔，默认为300
+        :param batch_size: 每批查询的阀号数量，默认为500
+        :param jitter: 每批在自己的时间片内随机推迟的最大比例（0~1），默认为0.5
+        :param max_concurrency: 同时查询的最大批数，默认为2
+        :param online_statuses: 视为在线的commStatus取值，默认为 ('正常',)
+        :param on_transition: 状态变化时的回调，参数为变化事件字典
+        :param on_cycle: 每个周期结束时的回调，参数为周期统计字典
+        :param params: 查询参数模型（serial_no会被忽略），默认为None
+        :param max_condition_length: 单个查询条件URL编码后的最大长度，默认为3000
+        :param use_in: 为True时使用IN条件，默认为False使用OR条件
+        :param emit_initial: 为True时第一次查询到的状态也作为变化事件输出（previous为None），默认为False
+        :param history: 保留最近多少个周期的统计，默认为100
+        :param seed: 抖动的随机数种子，默认为None
+        """
+        self.client = client
+        self.serial_nos = list(dict.fromkeys(str(serial_no) for serial_no in serial_nos))
+        self.batches = [
+            self.serial_nos[i:i + batch_size] for i in range(0, len(self.serial_nos), max(1, batch_size))
+        ]
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.max_concurrency = max_concurrency
+        self.online_statuses = set(online_statuses)
+        self.on_transition = on_transition
+        self.on_cycle = on_cycle
+        self.params = params
+        self.max_condition_length = max_condition_length
+        self.use_in = use_in
+        self.emit_initial = emit_initial
+        self.random = random.Random(seed)
+
+        # 阀号到 {'state', 'comm_status', 'since'} 的映射，since为进入该状态的时间（time.time）
+        self.states = {}
+        self.cycle = 0
+        self.transitions = 0
+        self.history = deque(maxlen=history)
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        """停止监控，未开始的批次不再查询，进行中的批次完成后run返回"""
+        self._stop.set()
+
+    async def _sleep(self, delay):
+        """
+        :param delay: 等待时间（秒）
+        :return: 等待期间是否调用了stop
+        """
+        if delay > 0:
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        return self._stop.is_set()
+
+    def _classify(self, record):
+        if record is None:
+            return 'missing'
+        return 'online' if record.get('commStatus') in self.online_statuses else 'offline'
+
+    def _update(self, serial_no, record, now):
+        """
+        更新单个阀号的状态
+
+        :return: 状态变化事件字典，状态未变化时返回None
+        """
+        state = self._classify(record)
+        comm_status = record.get('commStatus') if record else None
+        previous = self.states.get(serial_no)
+        if previous is not None and previous['state'] == state:
+            previous['comm_status'] = comm_status
+            return None
+
+        self.states[serial_no] = {'state': state, 'comm_status': comm_status, 'since': now}
+        if previous is None and not self.emit_initial:
+            return None
+        return {
+            'serial_no': serial_no,
+            'address': record.get('address') if record else None,
+            'previous': previous['state'] if previous else None,
+            'state': state,
+            'previous_comm_status': previous['comm_status'] if previous else None,
+            'comm_status': comm_status,
+            'previous_duration': now - previous['since'] if previous else None,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+            'cycle': self.cycle
+        }
+
+    def _meter_cost(self):
+        stats = self.client.metrics.snapshot().get(METER_ENDPOINT, {})
+        return {name: stats.get(name, 0) for name in ('requests', 'request_bytes', 'response_bytes')}
+
+    async def run_cycle(self):
+        """
+        执行一个周期：按时间片依次查询所有批次并输出状态变化
+
+        :return: 周期统计字典，包含周期序号、耗时、查询耗时之和、请求数、收发字节数、
+                 查询和失败的批数、各状态阀号数和状态变化数
+        """
+        self.cycle += 1
+        started = time.monotonic()
+        cost_before = self._meter_cost()
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        slot = self.interval / len(self.batches) if self.batches else 0.0
+        stats = {
+            'cycle': self.cycle,
+            'batches': 0,
+            'failed_batches': 0,
+            'polled': 0,
+            'failed': 0,
+            'transitions': 0,
+            'query_time': 0.0
+        }
+
+        async def poll(i, batch):
+            delay = (i + self.random.uniform(0, self.jitter)) * slot
+            if await self._sleep(delay - (time.monotonic() - started)):
+                return
+            async with semaphore:
+                query_started = time.monotonic()
+                result = await self.client.find_household_meter_current_data_batch(
+                    batch,
+                    self.params,
+                    max_condition_length=self.max_condition_length,
+                    max_concurrency=1,
+                    use_in=self.use_in
+                )
+                stats['query_time'] += time.monotonic() - query_started
+
+            stats['batches'] += 1
+            if not result['success']:
+                stats['failed_batches'] += 1
+            failed = set(result['failed'])
+            stats['failed'] += len(failed)
+            now = time.time()
+            for serial_no in batch:
+                if serial_no in failed:
+                    continue
+                stats['polled'] += 1
+                event = self._update(serial_no, result['records'].get(serial_no), now)
+                if event is not None:
+                    stats['transitions'] += 1
+                    self.transitions += 1
+                    if self.on_transition is not None:
+                        self.on_transition(event)
+
+        await asyncio.gather(*[poll(i, batch) for i, batch in enumerate(self.batches)])
+
+        cost_after = self._meter_cost()
+        stats['duration'] = time.monotonic() - started
+        stats.update({name: cost_after[name] - cost_before[name] for name in cost_after})
+        stats.update(self.counts())
+        self.history.append(stats)
+        if self.on_cycle is not None:
+            self.on_cycle(stats)
+        return stats
+
+    async def run(self, cycles=None):
+        """
+        持续监控，直到完成指定周期数或调用stop
+
+        上一周期超过interval时立即开始下一周期。
+
+        :param cycles: 执行的周期数，默认为None表示不限
+        :return: 最近的周期统计列表
+        """
+        last_cycle = None if cycles is None else self.cycle + cycles
+        next_start = time.monotonic()
+        while (last_cycle is None or self.cycle < last_cycle) and not self._stop.is_set():
+            await self.run_cycle()
+            if self.cycle == last_cycle:
+                break
+            next_start += self.interval
+            now = time.monotonic()
+            if next_start < now:
+                next_start = now
+            if await self._sleep(next_start - now):
+                break
+        return list(self.history)
+
+    def counts(self):
+        """
+        :return: 各状态的阀号数，包含online、offline、missing和尚未查询到的unknown
+        """
+        counts = {'online': 0, 'offline': 0, 'missing': 0}
+        for state in self.states.values():
+            counts[state['state']] += 1
+        counts['unknown'] = len(self.serial_nos) - len(self.states)
+        return counts
+
+    def stats(self):
+        """
+        :return: 监控统计字典，包含阀号数、各状态阀号数、已完成周期数、状态变化总数和最近一个周期的统计
+        """
+        return {
+            'valves': len(self.serial_nos),
+            **self.counts(),
+            'cycles': self.cycle,
+            'transitions': self.transitions,
+            'last_cycle': self.history[-1] if self.history else None
+        }
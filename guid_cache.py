@@ -0,0 +1,123 @@
+import sqlite3
+import time
+from typing import Optional
+
+
+class GuidCache:
+    """
+    采集器guid本地持久化缓存（SQLite）
+
+    以 base_url + serialNo 为键保存采集器guid，超过有效期的记录视为未命中。
+    """
+
+    def __init__(self, path='net_equ_guid_cache.db', ttl=7 * 24 * 3600):
+        """
+        :param path: SQLite数据库文件路径，默认为当前目录下的net_equ_guid_cache.db
+        :param ttl: 缓存有效期（秒），默认为7天
+        """
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS net_equ_guid ('
+            'base_url TEXT NOT NULL, '
+            'serial_no TEXT NOT NULL, '
+            'guid TEXT NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'PRIMARY KEY (base_url, serial_no))'
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get(self, base_url, serial_no) -> Optional[str]:
+        """
+        读取缓存的guid
+
+        :param base_url: 接口地址
+        :param serial_no: 采集器编号
+        :return: guid，未命中或已过期时返回None
+        """
+        row = self.conn.execute(
+            'SELECT guid, updated_at FROM net_equ_guid WHERE base_url = ? AND serial_no = ?',
+            (base_url, str(serial_no))
+        ).fetchone()
+
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0]
+
+    def set(self, base_url, serial_no, guid):
+        """
+        写入单个采集器的guid
+
+        :param base_url: 接口地址
+        :param serial_no: 采集器编号
+        :param guid: 采集器guid
+        """
+        self.set_many(base_url, [(serial_no, guid)])
+
+    def set_many(self, base_url, items):
+        """
+        批量写入采集器的guid
+
+        :param base_url: 接口地址
+        :param items: (serial_no, guid) 元组列表
+        """
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO net_equ_guid (base_url, serial_no, guid, updated_at) VALUES (?, ?, ?, ?)',
+            [(base_url, str(serial_no), guid, now) for serial_no, guid in items]
+        )
+        self.conn.commit()
+
+    def invalidate(self, base_url=None, serial_no=None):
+        """
+        删除缓存记录
+
+        :param base_url: 接口地址，默认为None表示所有地址
+        :param serial_no: 采集器编号，默认为None表示该地址下所有采集器
+        :return: 删除的记录数
+        """
+        conditions = []
+        args = []
+        if base_url is not None:
+            conditions.append('base_url = ?')
+            args.append(base_url)
+        if serial_no is not None:
+            conditions.append('serial_no = ?')
+            args.append(str(serial_no))
+
+        sql = 'DELETE FROM net_equ_guid'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        cursor = self.conn.execute(sql, args)
+        self.conn.commit()
+        return cursor.rowcount
+
+    def stats(self):
+        """
+        获取缓存命中统计
+
+        :return: 包含hits、misses和hit_ratio的字典
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
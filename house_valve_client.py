@@ -1,26 +1,132 @@
 import httpx
 import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
 from typing import Optional
+from urllib.parse import quote
 from models import (
     FindHouseholdValveParams,
     UpdateHouseholdValveParams,
     DeviceInfo,
     UpdateControlParams,
     FindNetEquipmentParams,
-    FindHouseholdMeterCurrentDataParams
+    FindHouseholdMeterCurrentDataParams,
+    HouseholdValve,
+    NetEquipment,
+    HouseholdMeterData,
+    parse_response
 )
+from guid_cache import GuidCache
+from read_cache import ReadCache, result_tags
+from valve_journal import ValveJournal
+from adaptive_limiter import AdaptiveLimiter
+from client_metrics import ClientMetrics
+from page_tuner import PageSizeTuner
+from json_stream import PageStreamDecoder, json_loads
+
+# 各接口的默认超时时间（秒），未列出的接口使用客户端的timeout参数
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    'findHouseholdValve': 30.0,
+    'findHouseholdMeterCurrentDataAdvanced': 30.0
+}
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """
+    共享连接池的传输层包装
+    
+    多个客户端共用同一个transport时，关闭单个客户端不会关闭底层连接池，
+    由创建transport的调用方负责关闭。
+    """
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+    
+    async def handle_async_request(self, request):
+        return await self.transport.handle_async_request(request)
+    
+    async def aclose(self):
+        pass
 
 class HouseValveClient:
-    def __init__(self, base_url, token):
+    def __init__(self, base_url, token, guid_cache: Optional[GuidCache] = None,
+                 max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0,
+                 http2=False, timeout=5.0, endpoint_timeouts: Optional[dict] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 adaptive_concurrency=True, limiter: Optional[AdaptiveLimiter] = None,
+                 single_flight=True, read_cache: Optional[ReadCache] = None,
+                 metrics: Optional[ClientMetrics] = None, journal: Optional[ValveJournal] = None,
+                 page_tuner: Optional[PageSizeTuner] = None):
+        """
+        :param base_url: 接口地址
+        :param token: 认证token
+        :param guid_cache: 可选的采集器guid本地缓存
+        :param max_connections: 连接池最大连接数，默认为100
+        :param max_keepalive_connections: 连接池最大保持连接数，默认为20
+        :param keepalive_expiry: 空闲连接保持时间（秒），默认为5.0
+        :param http2: 是否启用HTTP/2（需要安装httpx[http2]），默认为False
+        :param timeout: 默认请求超时时间（秒），默认为5.0
+        :param endpoint_timeouts: 按接口名覆盖超时时间，如 {'findHouseholdValve': 60.0}，
+                                  与DEFAULT_ENDPOINT_TIMEOUTS合并
+        :param transport: 共享的httpx传输层，传入时忽略连接池和http2参数，关闭客户端时不会关闭该传输层
+        :param adaptive_concurrency: 是否启用自适应并发限制，默认为True
+        :param limiter: 自定义或多个客户端共享的自适应并发限制器，默认为None表示按需新建
+        :param single_flight: 是否合并相同参数的并发查询，默认为True
+        :param read_cache: 可选的查询结果内存缓存，update_household_valve和update_control会使涉及的阀号失效
+        :param metrics: 自定义或多个客户端共享的请求统计（可设置on_request/on_response回调），默认为None表示新建
+        :param journal: 可选的户阀修改日志，update_household_valve写入前会追加修改前镜像，可用于回滚
+        :param page_tuner: 可选的每页大小调整器，自动翻页查询且未显式指定page_size时按接口自动调整每页大小
+        """
         self.base_url = base_url
         self.token = token
+        # 可选的采集器guid本地缓存
+        self.guid_cache = guid_cache
         self.headers = {
             'Authorization': f'Bearer {self.token}',
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
+        self.timeout = timeout
+        self.endpoint_timeouts = {**DEFAULT_ENDPOINT_TIMEOUTS, **(endpoint_timeouts or {})}
+        
+        # 所有请求共用的自适应并发限制器，可通过limiter.limit查看当前并发上限
+        if limiter is None and adaptive_concurrency:
+            limiter = AdaptiveLimiter()
+        self.limiter = limiter
+        
+        # 合并相同参数的并发查询，coalesced_requests为被合并（未实际发送）的查询次数
+        self.single_flight = single_flight
+        self._in_flight = {}
+        self.coalesced_requests = 0
+        
+        # 可选的查询结果内存缓存，可通过read_cache.stats()查看命中率和淘汰数
+        self.read_cache = read_cache
+        
+        # 按接口统计请求数、延迟、收发字节数和状态码，可通过metrics.to_json()或metrics.to_prometheus()导出
+        self.metrics = metrics if metrics is not None else ClientMetrics()
+        
+        # 可选的户阀修改日志（追加写），回滚见valve_journal.py
+        self.journal = journal
+        # 可选的每页大小调整器，可通过page_tuner.stats()查看各接口当前的每页大小
+        self.page_tuner = page_tuner
+        
         # 创建httpx异步客户端
-        self.client = httpx.AsyncClient(headers=self.headers)
+        if transport is not None:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=timeout,
+                transport=_SharedTransport(transport)
+            )
+        else:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=timeout,
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry
+                )
+            )
     
     async def __aenter__(self):
         return self
@@ -29,21 +135,157 @@ class HouseValveClient:
         # 关闭httpx客户端
         await self.client.aclose()
     
-    async def find_household_valve(self, params: Optional[FindHouseholdValveParams] = None):
+    async def _send(self, method, url, **kwargs):
         """
-        根据户阀编号查询户阀信息
+        发送请求，按接口名应用超时配置，受自适应并发限制器约束并记录请求统计
         
-        :param params: 查询参数模型，默认为None
-        :return: 户阀信息列表
+        :param method: 请求方法
+        :param url: 请求地址
+        :return: httpx响应对象
         """
-        url = f'{self.base_url}/v4.0/maintain/houseValve/findHouseholdValve'
+        endpoint = url.rsplit('/', 1)[-1]
+        timeout = self.endpoint_timeouts.get(endpoint, self.timeout)
+        request = self.client.build_request(method, url, timeout=timeout, **kwargs)
         
-        # 如果没有提供参数，使用默认参数
-        if params is None:
-            params = FindHouseholdValveParams()
+        slot = self.limiter.slot() if self.limiter is not None else nullcontext()
+        async with slot as started:
+            track = self.metrics.start(endpoint, request)
+            try:
+                response = await self.client.send(request)
+            except BaseException as e:
+                self.metrics.finish(track, error=e)
+                # 超时、连接失败等视为服务端过载信号
+                if self.limiter is not None and isinstance(e, httpx.TransportError):
+                    self.limiter.record(started, False)
+                raise
+            self.metrics.finish(track, response)
+            if self.limiter is not None:
+                self.limiter.record(started, response.status_code != 429 and response.status_code < 500)
+            return response
+    
+    @asynccontextmanager
+    async def _send_stream(self, method, url, **kwargs):
+        """
+        以流式方式发送请求，响应体在退出上下文前按需读取
+        
+        自适应并发名额只在收到响应头之前占用：调用方读取响应体的过程中（如逐条处理流式记录时）
+        可能发起其他请求，若一直占用名额，限制器收缩到1后这些请求会永远等待。
+        进行中计数在整个读取过程中保持，延迟按收到响应头的时间记录，响应字节数在读取结束后记录。
+        
+        :param method: 请求方法
+        :param url: 请求地址
+        :return: 未读取响应体的httpx响应对象
+        """
+        endpoint = url.rsplit('/', 1)[-1]
+        timeout = self.endpoint_timeouts.get(endpoint, self.timeout)
+        request = self.client.build_request(method, url, timeout=timeout, **kwargs)
         
+        slot = self.limiter.slot() if self.limiter is not None else nullcontext()
+        async with slot as started:
+            track = self.metrics.start(endpoint, request)
+            try:
+                response = await self.client.send(request, stream=True)
+            except BaseException as e:
+                self.metrics.finish(track, error=e)
+                if self.limiter is not None and isinstance(e, httpx.TransportError):
+                    self.limiter.record(started, False)
+                raise
+            elapsed = time.monotonic() - track.started
+            if self.limiter is not None:
+                self.limiter.record(started, response.status_code != 429 and response.status_code < 500)
+        
+        try:
+            yield response
+        finally:
+            await response.aclose()
+            self.metrics.finish(track, response, elapsed=elapsed)
+    
+    async def _get_page(self, url, api_params, model, typed, trusted, serial_no=None):
+        """
+        发送分页查询请求并解码响应
+        
+        启用single_flight或read_cache时，相同接口和参数的查询共用同一个解码结果，
+        调用方不应修改返回的字典。
+        
+        :param url: 查询地址
+        :param api_params: 接口参数字典
+        :param model: typed为True时使用的记录模型
+        :param typed: 是否返回ApiResponse[model]
+        :param trusted: typed为True时是否跳过校验
+        :param serial_no: 查询的阀号，用于结果为空时也能按该阀号失效缓存，默认为None
+        :return: 响应字典或ApiResponse，请求失败时返回None
+        """
+        async def fetch():
+            try:
+                response = await self._send('GET', url, params=api_params)
+                response.raise_for_status()  # 抛出HTTP错误
+                if typed:
+                    return parse_response(response.content, model, trusted)
+                return json_loads(response.content)
+            except httpx.RequestError as e:
+                print(f"请求失败: {e}")
+                return None
+        
+        key = (url, tuple(sorted((name, str(value)) for name, value in api_params.items())), typed, trusted)
+        cache = self.read_cache
+        generation = None
+        if cache is not None:
+            hit, result = cache.get(key)
+            if hit:
+                return result
+            generation = cache.generation
+        
+        if not self.single_flight:
+            result = await fetch()
+        else:
+            task = self._in_flight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fetch())
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._flight_done(key, done))
+            else:
+                self.coalesced_requests += 1
+            # shield保证某个调用方被取消时不影响共用同一请求的其他调用方
+            result = await asyncio.shield(task)
+        
+        if cache is not None and result is not None:
+            result_code = result.get('resultCode') if isinstance(result, dict) else result.result_code
+            if result_code == 0:
+                tags = result_tags(result)
+                if serial_no:
+                    tags.add(str(serial_no))
+                cache.set(key, result, tags, generation)
+        return result
+    
+    def _flight_done(self, key, task):
+        """
+        合并查询的共享请求结束时调用
+        
+        :param key: 查询键
+        :param task: 共享请求任务
+        """
+        if self._in_flight.get(key) is task:
+            self._in_flight.pop(key)
+        # 所有等待方都已取消时没有人读取异常，在此读取，避免"Task exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+    
+    def _invalidate_reads(self, tags):
+        """
+        写入后使涉及的查询结果失效
+        
+        已发起的相同查询不再被后续调用合并，保证写入后的查询能读到新数据。
+        
+        :param tags: 阀号和 ('unique_id', uniqueId) 元组的可迭代对象
+        """
+        self._in_flight.clear()
+        if self.read_cache is not None:
+            self.read_cache.invalidate(tags)
+    
+    @staticmethod
+    def _household_valve_api_params(params: FindHouseholdValveParams):
         # 将Pydantic模型转换为字典，并转换键名（下划线转驼峰）
-        api_params = {
+        return {
             'pageIndex': params.page_index,
             'pageSize': params.page_size,
             'sortName': params.sort_name,
@@ -64,21 +306,77 @@ class HouseValveClient:
             'installSite': params.install_site,
             'equipmentUse': params.equipment_use
         }
+    
+    @staticmethod
+    def _net_equipment_api_params(params: FindNetEquipmentParams):
+        # 将Pydantic模型转换为字典，并转换键名（下划线转驼峰）
+        return {
+            'equipmentTypeId': params.equipment_type_id,
+            'factoryId': params.factory_id,
+            'modelId': params.model_id,
+            'meterNo': params.meter_no,
+            'serialNo': params.serial_no,
+            'installType': params.install_type,
+            'treeId': params.tree_id,
+            'treeLevel': params.tree_level,
+            'parentLevelId': params.parent_level_id,
+            'pageIndex': params.page_index,
+            'pageSize': params.page_size,
+            'sortName': params.sort_name,
+            'sortType': params.sort_type
+        }
+    
+    async def find_household_valve(self, params: Optional[FindHouseholdValveParams] = None, typed=False, trusted=False):
+        """
+        根据户阀编号查询户阀信息
         
-        try:
-            response = await self.client.get(url, params=api_params)
-            response.raise_for_status()  # 抛出HTTP错误
-            return response.json()
-        except httpx.RequestError as e:
-            print(f"请求失败: {e}")
+        :param params: 查询参数模型，默认为None
+        :param typed: 为True时返回ApiResponse[HouseholdValve]，默认为False返回字典
+        :param trusted: typed为True时是否跳过校验，默认为False
+        :return: 户阀信息列表
+        """
+        url = f'{self.base_url}/v4.0/maintain/houseValve/findHouseholdValve'
+        
+        # 如果没有提供参数，使用默认参数
+        if params is None:
+            params = FindHouseholdValveParams()
+        
+        api_params = self._household_valve_api_params(params)
+        
+        return await self._get_page(url, api_params, HouseholdValve, typed, trusted, params.serial_no)
+    
+    async def find_valve_by_unique_id(self, unique_id, serial_no):
+        """
+        按阀号查询并返回uniqueId匹配的户阀
+        
+        :param unique_id: 户阀唯一ID
+        :param serial_no: 户阀当前的阀号
+        :return: 户阀信息字典，未找到或查询失败时返回None
+        """
+        if unique_id is None or not serial_no:
+            return None
+        search_result = await self.find_household_valve(FindHouseholdValveParams(serial_no=str(serial_no)))
+        if not (search_result and search_result.get('resultCode') == 0):
             return None
+        for valve in search_result.get('data', {}).get('data') or []:
+            if str(valve.get('uniqueId')) == str(unique_id):
+                return valve
+        return None
     
-    async def update_household_valve(self, params: UpdateHouseholdValveParams):
+    async def update_household_valve(self, params: UpdateHouseholdValveParams, pre_image=None, current_serial_no=None):
         """
         更新户阀信息
         
+        配置了journal时，请求发出前先将修改前镜像追加到日志，请求结束后记录结果。
+        未传入pre_image时按户阀当前的阀号查询修改前镜像，查询不到时不发送更新请求，
+        避免写入无法回滚的修改。
+        
         :param params: 更新参数模型
+        :param pre_image: 修改前的户阀信息字典（或ValveRecord），默认为None表示按当前阀号查询
+        :param current_serial_no: 户阀当前的阀号，修改阀号且未传入pre_image时必须提供，
+                                  默认为None表示与params.serial_no相同
         :return: 更新结果
+        :raises ValueError: 配置了journal但查询不到修改前镜像时
         """
         url = f'{self.base_url}/v4.0/maintain/houseValve/updateHouseholdValve'
         
@@ -119,13 +417,75 @@ class HouseValveClient:
             'installSite': params.install_site
         }
         
+        if pre_image is not None and not isinstance(pre_image, dict):
+            pre_image = pre_image.to_dict()
+        
+        seq = None
+        if self.journal is not None:
+            if pre_image is None:
+                # 修改阀号时按新阀号查不到记录，必须按当前阀号查询
+                pre_image = await self.find_valve_by_unique_id(params.unique_id, current_serial_no or params.serial_no)
+            if pre_image is None:
+                raise ValueError(
+                    f"未找到uniqueId为'{params.unique_id}'的户阀修改前镜像，"
+                    f"修改阀号时请传入pre_image或current_serial_no"
+                )
+            if not isinstance(pre_image, dict):
+                pre_image = pre_image.to_dict()
+            seq = self.journal.append(pre_image, data)
+            # 修改前镜像落盘后才发出更新请求，outcome记录随之后的fsync或关闭日志时落盘
+            await self.journal.sync()
+        
+        update_result = None
         try:
-            response = await self.client.put(url, json=data)
+            response = await self._send('PUT', url, json=data)
             response.raise_for_status()  # 抛出HTTP错误
-            return response.json()
+            update_result = response.json()
+            return update_result
         except httpx.RequestError as e:
             print(f"请求失败: {e}")
             return None
+        finally:
+            if seq is not None:
+                self.journal.mark(
+                    seq,
+                    bool(update_result) and update_result.get('resultCode') == 0,
+                    update_result.get('message') if update_result else None
+                )
+            # 修改阀号时旧阀号的缓存结果（如抄通状态）同样失效
+            tags = [params.serial_no]
+            if current_serial_no:
+                tags.append(str(current_serial_no))
+            if pre_image is not None and pre_image.get('serialNo'):
+                tags.append(str(pre_image['serialNo']))
+            if params.unique_id is not None:
+                tags.append(('unique_id', str(params.unique_id)))
+            self._invalidate_reads(tags)
+    
+    async def update_household_valve_if_changed(self, current_valve, changes, dry_run=False):
+        """
+        对比目标状态与当前户阀记录，只在有变化时更新
+        
+        :param current_valve: 查询到的户阀信息字典（或ValveRecord）
+        :param changes: 要修改的字段，键为UpdateHouseholdValveParams的字段名，如 {'serial_no': '25249815'}
+        :param dry_run: 为True时只返回需要修改的字段，不执行更新，默认为False
+        :return: 结果字典，包含changes（{字段名: (当前值, 目标值)}）、skipped（是否跳过更新）和update_result
+        """
+        current_params = UpdateHouseholdValveParams.from_valve(current_valve)
+        target_params = UpdateHouseholdValveParams.from_valve(current_valve, **changes)
+        
+        result = {
+            'changes': current_params.diff(target_params),
+            'skipped': True,
+            'update_result': None
+        }
+        
+        if dry_run or not result['changes']:
+            return result
+        
+        result['skipped'] = False
+        result['update_result'] = await self.update_household_valve(target_params, pre_image=current_valve)
+        return result
     
     async def update_control(self, params: UpdateControlParams):
         """
@@ -145,25 +505,243 @@ class HouseValveClient:
             })
         
         try:
-            response = await self.client.post(url, json=device_list)
+            response = await self._send('POST', url, json=device_list)
             response.raise_for_status()
             return response.json()
         except httpx.RequestError as e:
             print(f"请求失败: {e}")
             return None
+        finally:
+            self._invalidate_reads([device.serial_no for device in params.devices])
+    
+    async def update_control_chunked(self, params: UpdateControlParams, chunk_size=50, max_concurrency=4,
+                                     retries=1, retry_delay=1.0, on_chunk=None):
+        """
+        分批并发下发档案，仅重试失败的批次
+        
+        :param params: 下发档案参数模型
+        :param chunk_size: 每批设备数量，默认为50
+        :param max_concurrency: 同时下发的最大批数，默认为4
+        :param retries: 每个失败批次的最大重试次数，默认为1
+        :param retry_delay: 重试前等待的秒数，默认为1.0
+        :param on_chunk: 每批下发完成（含重试）时的回调，参数为该批的结果字典
+        :return: 下发结果字典，包含成功状态、消息、每批结果和下发失败的设备编号列表
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'chunks': [],
+            'failed_devices': []
+        }
+        
+        devices = params.devices
+        chunk_size = max(1, chunk_size)
+        chunks = [devices[i:i + chunk_size] for i in range(0, len(devices), chunk_size)]
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def push_chunk(index, chunk):
+            chunk_result = {
+                'index': index,
+                'devices': [device.serial_no for device in chunk],
+                'success': False,
+                'attempts': 0,
+                'update_result': None,
+                'error': None
+            }
+            while chunk_result['attempts'] <= retries:
+                if chunk_result['attempts'] > 0:
+                    await asyncio.sleep(retry_delay)
+                chunk_result['attempts'] += 1
+                try:
+                    async with semaphore:
+                        update_result = await self.update_control(UpdateControlParams(devices=chunk))
+                except Exception as e:
+                    chunk_result['error'] = str(e)
+                    continue
+                chunk_result['update_result'] = update_result
+                if update_result and update_result.get('resultCode') == 0:
+                    chunk_result['success'] = True
+                    chunk_result['error'] = None
+                    break
+                chunk_result['error'] = update_result.get('message', '未知错误') if update_result else 'API调用失败'
+            if on_chunk is not None:
+                on_chunk(chunk_result)
+            return chunk_result
+        
+        result['chunks'] = await asyncio.gather(*[
+            push_chunk(index, chunk) for index, chunk in enumerate(chunks)
+        ])
+        
+        for chunk_result in result['chunks']:
+            if not chunk_result['success']:
+                result['failed_devices'].extend(chunk_result['devices'])
+        
+        failed_chunks = [chunk_result['index'] for chunk_result in result['chunks'] if not chunk_result['success']]
+        if failed_chunks:
+            result['message'] = f"{len(chunks)}批中{len(failed_chunks)}批下发失败：批次{failed_chunks}"
+        else:
+            result['success'] = True
+            result['message'] = f"{len(chunks)}批全部下发成功"
+        
+        return result
+    
+    async def _find_guid_by_serial_no(self, serial_no, semaphore):
+        """
+        根据采集器编号查询单个采集器的guid
+        
+        :param serial_no: 采集器编号
+        :param semaphore: 限制并发查询数量的信号量
+        :return: 设备详情字典，包含serial_no、guid、found，失败时包含reason
+        """
+        # 根据serialNo查询采集器信息
+        # 使用Pydantic模型调用find_net_equipment
+        find_params = FindNetEquipmentParams(
+            serial_no=serial_no,
+            page_size=1
+        )
+        try:
+            async with semaphore:
+                net_equ_result = await self.find_net_equipment(find_params)
+        except httpx.HTTPError as e:
+            # 单个采集器查询出现5xx等HTTP错误时只影响该设备，不中断整批下发
+            print(f"请求失败: {e}")
+            net_equ_result = None
+        
+        if not (net_equ_result and net_equ_result.get('resultCode') == 0):
+            return {
+                'serial_no': serial_no,
+                'guid': None,
+                'found': False,
+                'reason': '查询失败'
+            }
+        
+        data = net_equ_result.get('data', {})
+        equ_list = data.get('data', [])
+        if not equ_list:
+            return {
+                'serial_no': serial_no,
+                'guid': None,
+                'found': False,
+                'reason': '未找到采集器信息'
+            }
+        
+        # 获取第一个匹配的采集器信息
+        guid = equ_list[0].get('guid')
+        if not guid:
+            return {
+                'serial_no': serial_no,
+                'guid': None,
+                'found': False,
+                'reason': '未找到guid'
+            }
+        
+        return {
+            'serial_no': serial_no,
+            'guid': guid,
+            'found': True
+        }
+    
+    async def build_net_equipment_index(self, params: Optional[FindNetEquipmentParams] = None):
+        """
+        分页扫描采集器列表，构建serialNo到guid的索引
+        
+        :param params: 扫描范围参数模型（可指定tree_id、factory_id、page_size等），默认为None表示扫描全部采集器
+        :return: serialNo到guid的字典，任一页查询失败时返回None
+        """
+        index = {}
+        try:
+            async for equ_info in self.iter_net_equipment(params):
+                index[str(equ_info.get('serialNo'))] = equ_info.get('guid')
+        except (RuntimeError, httpx.HTTPError) as e:
+            print(f"扫描采集器失败: {e}")
+            return None
+        
+        return index
+    
+    async def _resolve_guids(self, serial_no_list, max_concurrency, resolver, scan_threshold, scan_params):
+        """
+        查询采集器编号列表对应的guid
+        
+        :param serial_no_list: 采集器编号列表
+        :param max_concurrency: 并发查询guid的最大数量
+        :param resolver: guid查询方式，'lookup'、'scan'或'auto'
+        :param scan_threshold: 'auto'模式下切换为扫描的列表数量阈值
+        :param scan_params: 扫描范围参数模型
+        :return: (实际使用的查询方式, 按输入顺序排列的设备详情列表)
+        """
+        if resolver == 'auto':
+            resolver = 'scan' if len(serial_no_list) > scan_threshold else 'lookup'
+        
+        guid_index = None
+        if resolver == 'scan':
+            guid_index = await self.build_net_equipment_index(scan_params)
+        
+        if guid_index is None:
+            # 逐个并发查询（扫描失败时也回退到此方式），gather按输入顺序返回结果
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+            device_info = await asyncio.gather(*[
+                self._find_guid_by_serial_no(serial_no, semaphore)
+                for serial_no in serial_no_list
+            ])
+            return 'lookup', device_info
+        
+        # 使用扫描得到的索引匹配guid
+        device_info = []
+        for serial_no in serial_no_list:
+            key = str(serial_no)
+            if key not in guid_index:
+                device_info.append({
+                    'serial_no': serial_no,
+                    'guid': None,
+                    'found': False,
+                    'reason': '未找到采集器信息'
+                })
+            elif not guid_index[key]:
+                device_info.append({
+                    'serial_no': serial_no,
+                    'guid': None,
+                    'found': False,
+                    'reason': '未找到guid'
+                })
+            else:
+                device_info.append({
+                    'serial_no': serial_no,
+                    'guid': guid_index[key],
+                    'found': True
+                })
+        return 'scan', device_info
     
-    async def update_control_by_serial_no(self, serial_no_list):
+    async def update_control_by_serial_no(self, serial_no_list, max_concurrency=10, resolver='auto',
+                                          scan_threshold=200,
+                                          scan_params: Optional[FindNetEquipmentParams] = None,
+                                          chunk_size=None, chunk_concurrency=4, chunk_retries=1, on_device=None):
         """
         根据采集器编号列表下发档案（自动查询guid）
         
+        配置了guid_cache时先读取本地缓存，只对未命中或已过期的采集器调用接口查询，
+        查询到的guid会写回缓存。
+        
         :param serial_no_list: 采集器编号列表，格式为 ['serial_no1', 'serial_no2', ...]
-        :return: 更新结果，包含成功状态、消息和更新结果
+        :param max_concurrency: 并发查询guid的最大数量，默认为10
+        :param resolver: guid查询方式，'lookup'为逐个查询，'scan'为分页扫描构建索引，
+                         'auto'为待查询数量超过scan_threshold时使用'scan'，默认为'auto'
+        :param scan_threshold: 'auto'模式下切换为扫描的列表数量阈值，默认为200
+        :param scan_params: 扫描范围参数模型（可指定tree_id、factory_id），默认为None表示扫描全部采集器
+        :param chunk_size: 分批下发时每批设备数量，默认为None表示一次下发全部设备
+        :param chunk_concurrency: 分批下发时同时下发的最大批数，默认为4
+        :param chunk_retries: 分批下发时每个失败批次的最大重试次数，默认为1
+        :param on_device: 每个设备结果确定时的回调（未找到guid的设备在查询完成后，其余设备在所在批次下发后），
+                          参数为device_info中的设备字典
+        :return: 更新结果，包含成功状态、消息和更新结果；分批下发时update_result为update_control_chunked的结果，
+                 device_info中找到guid的设备包含pushed字段
         """
         result = {
             'success': False,
             'message': '',
             'update_result': None,
-            'device_info': []
+            'device_info': [],
+            'resolver': None,
+            'cache': None
         }
         
         if not serial_no_list:
@@ -171,62 +749,59 @@ class HouseValveClient:
             return result
         
         try:
-            # 1. 遍历采集器编号，查询每个采集器的guid
-            device_list = []
-            missing_devices = []
+            # 1. 查询每个采集器的guid，优先使用本地缓存
+            device_info = [None] * len(serial_no_list)
+            pending = []
+            for i, serial_no in enumerate(serial_no_list):
+                guid = None
+                if self.guid_cache is not None:
+                    guid = self.guid_cache.get(self.base_url, serial_no)
+                if guid:
+                    device_info[i] = {
+                        'serial_no': serial_no,
+                        'guid': guid,
+                        'found': True,
+                        'cached': True
+                    }
+                else:
+                    pending.append(i)
+            
+            if self.guid_cache is not None:
+                result['cache'] = {
+                    'hits': len(serial_no_list) - len(pending),
+                    'misses': len(pending)
+                }
             
-            for serial_no in serial_no_list:
-                # 根据serialNo查询采集器信息
-                # 使用Pydantic模型调用find_net_equipment
-                find_params = FindNetEquipmentParams(
-                    serial_no=serial_no,
-                    page_size=1
+            if pending:
+                result['resolver'], resolved = await self._resolve_guids(
+                    [serial_no_list[i] for i in pending],
+                    max_concurrency, resolver, scan_threshold, scan_params
                 )
-                net_equ_result = await self.find_net_equipment(find_params)
+                for i, device in zip(pending, resolved):
+                    device_info[i] = device
                 
-                if net_equ_result and net_equ_result.get('resultCode') == 0:
-                    data = net_equ_result.get('data', {})
-                    equ_list = data.get('data', [])
-                    
-                    if equ_list:
-                        # 获取第一个匹配的采集器信息
-                        equ_info = equ_list[0]
-                        guid = equ_info.get('guid')
-                        
-                        if guid:
-                            device_list.append({
-                                'serialNo': serial_no,
-                                'guid': guid
-                            })
-                            result['device_info'].append({
-                                'serial_no': serial_no,
-                                'guid': guid,
-                                'found': True
-                            })
-                        else:
-                            missing_devices.append(serial_no)
-                            result['device_info'].append({
-                                'serial_no': serial_no,
-                                'guid': None,
-                                'found': False,
-                                'reason': '未找到guid'
-                            })
-                    else:
-                        missing_devices.append(serial_no)
-                        result['device_info'].append({
-                            'serial_no': serial_no,
-                            'guid': None,
-                            'found': False,
-                            'reason': '未找到采集器信息'
-                        })
-                else:
-                    missing_devices.append(serial_no)
-                    result['device_info'].append({
-                        'serial_no': serial_no,
-                        'guid': None,
-                        'found': False,
-                        'reason': '查询失败'
+                if self.guid_cache is not None:
+                    self.guid_cache.set_many(
+                        self.base_url,
+                        [(device['serial_no'], device['guid']) for device in resolved if device['found']]
+                    )
+            else:
+                result['resolver'] = 'cache'
+            
+            result['device_info'] = device_info
+            
+            device_list = []
+            missing_devices = []
+            for device in result['device_info']:
+                if device['found']:
+                    device_list.append({
+                        'serialNo': device['serial_no'],
+                        'guid': device['guid']
                     })
+                else:
+                    missing_devices.append(device['serial_no'])
+                    if on_device is not None:
+                        on_device(device)
             
             if missing_devices:
                 result['message'] = f"部分采集器查询失败：{missing_devices}"
@@ -242,10 +817,48 @@ class HouseValveClient:
                 # 创建UpdateControlParams对象
                 control_params = UpdateControlParams(devices=device_info_list)
                 
-                update_result = await self.update_control(control_params)
+                if chunk_size:
+                    # 分批下发，每批完成时记录该批设备的下发结果
+                    found_devices = {}
+                    for device in result['device_info']:
+                        if device['found']:
+                            found_devices.setdefault(device['serial_no'], []).append(device)
+                    
+                    def mark_chunk(chunk_result):
+                        for serial_no in chunk_result['devices']:
+                            for device in found_devices.get(serial_no, ()):
+                                device['pushed'] = chunk_result['success']
+                                if on_device is not None:
+                                    on_device(device)
+                    
+                    update_result = await self.update_control_chunked(
+                        control_params, chunk_size, chunk_concurrency, chunk_retries, on_chunk=mark_chunk
+                    )
+                    update_ok = update_result['success']
+                    
+                    if not update_ok:
+                        result['message'] = f"部分设备下发失败：{update_result['failed_devices']}"
+                        if missing_devices:
+                            result['message'] += f"，部分设备查询失败：{missing_devices}"
+                else:
+                    try:
+                        update_result = await self.update_control(control_params)
+                    except httpx.HTTPError as e:
+                        # 5xx等错误也要逐个回调设备结果，不能落到外层的异常处理
+                        print(f"请求失败: {e}")
+                        update_result = None
+                    update_ok = bool(update_result and update_result.get('resultCode') == 0)
+                    if not update_ok:
+                        result['message'] = f"设备下发失败：{[device['serialNo'] for device in device_list]}"
+                        if missing_devices:
+                            result['message'] += f"，部分设备查询失败：{missing_devices}"
+                    if on_device is not None:
+                        for device in result['device_info']:
+                            if device['found']:
+                                on_device({**device, 'pushed': update_ok})
                 result['update_result'] = update_result
                 
-                if update_result and update_result.get('resultCode') == 0:
+                if update_ok:
                     result['success'] = True
                     if missing_devices:
                         result['message'] = f"部分设备下发成功，部分设备查询失败：{missing_devices}"
@@ -253,17 +866,19 @@ class HouseValveClient:
                         result['message'] = "所有设备下发成功"
             else:
                 result['message'] = "没有找到有效的设备信息，无法下发档案"
-                
+        
         except Exception as e:
             result['message'] = f"处理失败：{str(e)}"
-            
+        
         return result
     
-    async def find_net_equipment(self, params: Optional[FindNetEquipmentParams] = None):
+    async def find_net_equipment(self, params: Optional[FindNetEquipmentParams] = None, typed=False, trusted=False):
         """
         根据采集器编号查询采集器信息
         
         :param params: 查询参数模型，默认为None
+        :param typed: 为True时返回ApiResponse[NetEquipment]，默认为False返回字典
+        :param trusted: typed为True时是否跳过校验，默认为False
         :return: 采集器信息列表
         """
         url = f'{self.base_url}/v4.0/maintain/netEquManage/findNetEqu'
@@ -272,44 +887,214 @@ class HouseValveClient:
         if params is None:
             params = FindNetEquipmentParams()
         
-        # 将Pydantic模型转换为字典，并转换键名（下划线转驼峰）
-        api_params = {
-            'equipmentTypeId': params.equipment_type_id,
-            'factoryId': params.factory_id,
-            'modelId': params.model_id,
-            'meterNo': params.meter_no,
-            'serialNo': params.serial_no,
-            'installType': params.install_type,
-            'treeId': params.tree_id,
-            'treeLevel': params.tree_level,
-            'parentLevelId': params.parent_level_id,
-            'pageIndex': params.page_index,
-            'pageSize': params.page_size,
-            'sortName': params.sort_name,
-            'sortType': params.sort_type
-        }
+        api_params = self._net_equipment_api_params(params)
+        
+        return await self._get_page(url, api_params, NetEquipment, typed, trusted, params.serial_no)
+    
+    def _initial_page(self, endpoint, params):
+        """
+        :param endpoint: 接口名
+        :param params: 查询参数模型
+        :return: (起始偏移量, 首页每页大小, 是否自动调整每页大小)
+        """
+        offset = (params.page_index - 1) * params.page_size
+        if self.page_tuner is None or 'page_size' in params.model_fields_set:
+            return offset, params.page_size, False
+        page_size = self.page_tuner.page_size(self.base_url, endpoint, offset)
+        if page_size is None:
+            return offset, params.page_size, False
+        return offset, page_size, True
+    
+    async def _iter_pages(self, find_page, params, endpoint):
+        """
+        自动翻页查询，逐条返回记录
+        
+        根据返回的total判断是否还有下一页，并在调用方处理当前页时预取下一页，
+        内存中最多同时保留两页数据。配置了page_tuner且params未显式指定page_size时，
+        每页大小按接口自动调整，请求失败时缩小每页大小后重试。
+        
+        :param find_page: 单页查询方法，如find_household_valve
+        :param params: 查询参数模型，从params.page_index开始翻页
+        :param endpoint: 接口名，用于按接口调整每页大小
+        :return: 异步生成器，逐条返回记录
+        """
+        offset, page_size, tuned = self._initial_page(endpoint, params)
+        timeout = self.endpoint_timeouts.get(endpoint, self.timeout)
+        fetched = 0
+        retries = 0
+        
+        async def fetch(offset, page_size):
+            started = time.monotonic()
+            try:
+                page_result = await find_page(params.model_copy(update={
+                    'page_index': offset // page_size + 1,
+                    'page_size': page_size
+                }))
+            except httpx.HTTPStatusError as e:
+                # 5xx等HTTP错误与超时、连接失败一样视为请求失败
+                print(f"请求失败: {e}")
+                page_result = None
+            return page_size, page_result, time.monotonic() - started
+        
+        next_page = asyncio.ensure_future(fetch(offset, page_size))
         
         try:
-            response = await self.client.get(url, params=api_params)
-            response.raise_for_status()
-            return response.json()
-        except httpx.RequestError as e:
-            print(f"请求失败: {e}")
-            return None
+            while next_page is not None:
+                page_size, page_result, elapsed = await next_page
+                next_page = None
+                page_index = offset // page_size + 1
+                
+                records = []
+                if page_result and page_result.get('resultCode') == 0:
+                    data = page_result.get('data', {})
+                    records = data.get('data') or []
+                if tuned:
+                    self.page_tuner.record(self.base_url, endpoint, page_size, len(records), elapsed,
+                                           ok=page_result is not None, timeout=timeout)
+                    # 超时、连接失败等请求失败时缩小每页大小后重试
+                    if page_result is None and retries < self.page_tuner.retries:
+                        retry_size = self.page_tuner.page_size(self.base_url, endpoint, offset)
+                        if retry_size < page_size:
+                            retries += 1
+                            next_page = asyncio.ensure_future(fetch(offset, retry_size))
+                            continue
+                
+                if not (page_result and page_result.get('resultCode') == 0):
+                    message = page_result.get('message', '未知错误') if page_result else 'API调用失败'
+                    raise RuntimeError(f"第{page_index}页查询失败：{message}")
+                
+                retries = 0
+                fetched += len(records)
+                offset += page_size
+                
+                # 本页非空且未取完total条记录时，预取下一页
+                if records and fetched < data.get('total', 0):
+                    if tuned:
+                        page_size = self.page_tuner.page_size(self.base_url, endpoint, offset)
+                    next_page = asyncio.ensure_future(fetch(offset, page_size))
+                
+                for record in records:
+                    yield record
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+    
+    async def _iter_pages_streamed(self, url, params, to_api_params):
+        """
+        自动翻页查询，边接收响应边解析，逐条返回记录
+        
+        不整页解码响应，内存中只保留一个网络数据块和正在解析的记录；不预取下一页。
+        配置了page_tuner且params未显式指定page_size时，每页大小按接口自动调整，
+        耗时不计入调用方处理记录的时间；请求在返回第一条记录前失败时缩小每页大小后重试。
+        
+        :param url: 查询地址
+        :param params: 查询参数模型，从params.page_index开始翻页
+        :param to_api_params: 将参数模型转换为接口参数的方法
+        :return: 异步生成器，逐条返回记录
+        """
+        endpoint = url.rsplit('/', 1)[-1]
+        offset, page_size, tuned = self._initial_page(endpoint, params)
+        timeout = self.endpoint_timeouts.get(endpoint, self.timeout)
+        fetched = 0
+        retries = 0
+        
+        while True:
+            page_index = offset // page_size + 1
+            page_params = params.model_copy(update={'page_index': page_index, 'page_size': page_size})
+            decoder = PageStreamDecoder()
+            page_count = 0
+            started = time.monotonic()
+            paused = 0.0
+            
+            try:
+                async with self._send_stream('GET', url, params=to_api_params(page_params)) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        for record in decoder.feed(chunk):
+                            page_count += 1
+                            yielded = time.monotonic()
+                            yield record
+                            paused += time.monotonic() - yielded
+                    for record in decoder.feed(b'', eof=True):
+                        page_count += 1
+                        yield record
+            except (httpx.HTTPError, ValueError) as e:
+                # 与整页解码时一样，请求失败和响应格式错误统一抛出RuntimeError
+                if tuned and isinstance(e, httpx.HTTPError):
+                    self.page_tuner.record(self.base_url, endpoint, page_size, page_count,
+                                           time.monotonic() - started - paused, ok=False, timeout=timeout)
+                    retry_size = self.page_tuner.page_size(self.base_url, endpoint, offset)
+                    if not page_count and retries < self.page_tuner.retries and retry_size < page_size:
+                        retries += 1
+                        page_size = retry_size
+                        continue
+                raise RuntimeError(f"第{page_index}页查询失败：{e}") from e
+            
+            if decoder.meta.get('resultCode') != 0:
+                raise RuntimeError(f"第{page_index}页查询失败：{decoder.meta.get('message', '未知错误')}")
+            
+            if tuned:
+                self.page_tuner.record(self.base_url, endpoint, page_size, page_count,
+                                       time.monotonic() - started - paused, timeout=timeout)
+            retries = 0
+            fetched += page_count
+            offset += page_size
+            data = decoder.meta.get('data') or {}
+            if not page_count or fetched >= data.get('total', 0):
+                break
+            if tuned:
+                page_size = self.page_tuner.page_size(self.base_url, endpoint, offset)
+    
+    def iter_household_valves(self, params: Optional[FindHouseholdValveParams] = None, stream=False):
+        """
+        自动翻页查询户阀信息，逐条返回
+        
+        :param params: 查询参数模型，默认为None
+        :param stream: 为True时边接收边解析响应，降低大页查询的内存峰值，默认为False
+        :return: 异步生成器，逐条返回户阀信息字典
+        """
+        if params is None:
+            params = FindHouseholdValveParams()
+        if stream:
+            url = f'{self.base_url}/v4.0/maintain/houseValve/findHouseholdValve'
+            return self._iter_pages_streamed(url, params, self._household_valve_api_params)
+        return self._iter_pages(self.find_household_valve, params, 'findHouseholdValve')
+    
+    def iter_net_equipment(self, params: Optional[FindNetEquipmentParams] = None, stream=False):
+        """
+        自动翻页查询采集器信息，逐条返回
+        
+        :param params: 查询参数模型，默认为None
+        :param stream: 为True时边接收边解析响应，降低大页查询的内存峰值，默认为False
+        :return: 异步生成器，逐条返回采集器信息字典
+        """
+        if params is None:
+            params = FindNetEquipmentParams()
+        if stream:
+            url = f'{self.base_url}/v4.0/maintain/netEquManage/findNetEqu'
+            return self._iter_pages_streamed(url, params, self._net_equipment_api_params)
+        return self._iter_pages(self.find_net_equipment, params, 'findNetEqu')
     
-    async def find_household_meter_current_data(self, params: FindHouseholdMeterCurrentDataParams):
+    async def find_household_meter_current_data(self, params: FindHouseholdMeterCurrentDataParams,
+                                                advance_condition=None, advance_name=None, typed=False, trusted=False):
         """
         根据阀号查询户阀抄通状态
         
         :param params: 查询参数模型
+        :param advance_condition: 自定义查询条件，默认为None表示按params.serial_no查询
+        :param advance_name: 自定义查询条件名称，默认为None表示按params.serial_no生成
+        :param typed: 为True时返回ApiResponse[HouseholdMeterData]，默认为False返回字典
+        :param trusted: typed为True时是否跳过校验，默认为False
         :return: 户阀抄通状态信息
         """
         url = f'{self.base_url}/v4.0/meter/heatMonitor/findHouseholdMeterCurrentDataAdvanced'
         
         # 构建advanceCondition和advanceName参数
         # 注意：不要手动URL编码，让httpx自动处理
-        advance_condition = f"((oc_v.serialNo='{params.serial_no}'))"
-        advance_name = f"(户阀编号='{params.serial_no}')"
+        if advance_condition is None:
+            advance_condition = f"((oc_v.serialNo='{params.serial_no}'))"
+        if advance_name is None:
+            advance_name = f"(户阀编号='{params.serial_no}')"
         
         # 构建完整的API参数
         api_params = {
@@ -330,26 +1115,163 @@ class HouseValveClient:
             'pageIndex': params.page_index
         }
         
-        try:
-            response = await self.client.get(url, params=api_params)
-            response.raise_for_status()
-            return response.json()
-        except httpx.RequestError as e:
-            print(f"请求失败: {e}")
+        return await self._get_page(url, api_params, HouseholdMeterData, typed, trusted, params.serial_no)
+    
+    @staticmethod
+    def _chunk_serial_conditions(serial_no_list, max_condition_length, use_in):
+        """
+        将阀号列表打包为多个查询条件，每个条件URL编码后的长度不超过max_condition_length
+        
+        :param serial_no_list: 阀号列表（已去重）
+        :param max_condition_length: 单个条件URL编码后的最大长度
+        :param use_in: 为True时使用IN条件，否则使用OR条件
+        :return: (阀号子列表, advanceCondition, advanceName) 元组列表
+        """
+        if use_in:
+            prefix, term, separator, suffix = "((oc_v.serialNo in (", "'{}'", ",", ")))"
+        else:
+            prefix, term, separator, suffix = "((", "(oc_v.serialNo='{}')", " or ", "))"
+        
+        base_length = len(quote(prefix + suffix))
+        separator_length = len(quote(separator))
+        
+        chunks = []
+        chunk = []
+        length = base_length
+        for serial_no in serial_no_list:
+            term_length = len(quote(term.format(serial_no)))
+            if chunk and length + separator_length + term_length > max_condition_length:
+                chunks.append(chunk)
+                chunk = []
+                length = base_length
+            length += term_length + (separator_length if chunk else 0)
+            chunk.append(serial_no)
+        if chunk:
+            chunks.append(chunk)
+        
+        return [
+            (
+                chunk,
+                prefix + separator.join(term.format(serial_no) for serial_no in chunk) + suffix,
+                f"(户阀编号批量查询{len(chunk)}个)"
+            )
+            for chunk in chunks
+        ]
+    
+    async def find_household_meter_current_data_batch(self, serial_no_list,
+                                                      params: Optional[FindHouseholdMeterCurrentDataParams] = None,
+                                                      max_condition_length=3000, max_concurrency=5, use_in=False,
+                                                      on_chunk=None):
+        """
+        批量查询多个阀号的户阀抄通状态
+        
+        阀号按URL长度限制打包为OR/IN条件分批查询，各批并发执行并自动翻页。
+        
+        :param serial_no_list: 阀号列表
+        :param params: 查询参数模型（serial_no会被忽略），默认为None
+        :param max_condition_length: 单个advanceCondition URL编码后的最大长度，默认为3000
+        :param max_concurrency: 并发查询的最大批数，默认为5
+        :param use_in: 为True时使用IN条件，默认为False使用OR条件
+        :param on_chunk: 每批查询完成时的回调，参数为 (该批阀号列表, 记录列表, 错误信息或None)
+        :return: 查询结果字典，包含成功状态、消息、阀号到记录的映射、无记录阀号列表和查询失败阀号列表
+        """
+        result = {
+            'success': False,
+            'message': '',
+            'records': {},
+            'missing': [],
+            'failed': []
+        }
+        
+        # 统一为字符串并去重，保持输入顺序
+        serial_nos = list(dict.fromkeys(str(serial_no) for serial_no in serial_no_list))
+        if not serial_nos:
+            result['message'] = "阀号列表不能为空"
+            return result
+        
+        if params is None:
+            params = FindHouseholdMeterCurrentDataParams(serial_no='')
+        params = params.model_copy(update={'serial_no': '', 'page_index': 1})
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def query_chunk(chunk, advance_condition, advance_name):
+            async def find_page(page_params):
+                return await self.find_household_meter_current_data(page_params, advance_condition, advance_name)
+            
+            async with semaphore:
+                try:
+                    chunk_result = chunk, [record async for record in self._iter_pages(find_page, params, 'findHouseholdMeterCurrentDataAdvanced')], None
+                except Exception as e:
+                    chunk_result = chunk, [], str(e)
+            if on_chunk is not None:
+                on_chunk(*chunk_result)
+            return chunk_result
+        
+        chunk_results = await asyncio.gather(*[
+            query_chunk(*chunk_condition)
+            for chunk_condition in self._chunk_serial_conditions(serial_nos, max_condition_length, use_in)
+        ])
+        
+        errors = []
+        for chunk, records, error in chunk_results:
+            if error is not None:
+                result['failed'].extend(chunk)
+                errors.append(error)
+                continue
+            for record in records:
+                result['records'][str(record.get('serialNo'))] = record
+        
+        failed = set(result['failed'])
+        result['missing'] = [
+            serial_no for serial_no in serial_nos
+            if serial_no not in result['records'] and serial_no not in failed
+        ]
+        
+        if errors:
+            result['message'] = f"部分批次查询失败：{errors}"
+        else:
+            result['success'] = True
+            result['message'] = f"查询到{len(result['records'])}个阀号的记录，{len(result['missing'])}个阀号无记录"
+        
+        return result
+    
+    async def _find_valve_by_address(self, serial_no, address):
+        """
+        按阀号查询户阀，并按地址匹配
+        
+        :param serial_no: 阀号
+        :param address: 户阀地址
+        :return: 匹配的户阀信息字典，查询失败或未匹配时返回None
+        """
+        search_result = await self.find_household_valve(FindHouseholdValveParams(
+            serial_no=serial_no,
+            page_size=20,
+            tree_id='',
+            tree_level=0
+        ))
+        if not (search_result and search_result.get('resultCode') == 0):
             return None
+        for valve in search_result.get('data', {}).get('data') or []:
+            if valve.get('address') == address:
+                return valve
+        return None
     
-    async def update_valve_serial_no(self, query_serial_no, query_address, new_serial_no):
+    async def update_valve_serial_no(self, query_serial_no, query_address, new_serial_no, dry_run=False):
         """
         根据查询的阀号和地址，更新阀号为新的阀号
         
         :param query_serial_no: 查询用的阀号
         :param query_address: 查询用的地址
         :param new_serial_no: 更新后的新阀号
-        :return: 更新结果字典，包含成功状态、更新结果和验证结果
+        :param dry_run: 为True时只对比并返回需要修改的字段，不执行更新，默认为False
+        :return: 更新结果字典，包含成功状态、是否已是新阀号而跳过、修改的字段、更新结果和验证结果
         """
         result = {
             'success': False,
             'message': '',
+            'skipped': False,
+            'changes': None,
             'update_result': None,
             'verify_result': None
         }
@@ -372,12 +1294,8 @@ class HouseValveClient:
                 result['message'] = f"查询失败：API返回错误 - {search_result.get('message', '未知错误')}"
                 return result
             
-            if not search_result.get('data', {}).get('data'):
-                result['message'] = f"查询失败：未找到serialNo为'{query_serial_no}'的户阀信息"
-                return result
-            
             # 2. 从查询结果中通过address找到唯一匹配的数据
-            valve_list = search_result['data']['data']
+            valve_list = search_result.get('data', {}).get('data') or []
             matched_valve = None
             
             for valve in valve_list:
@@ -386,60 +1304,38 @@ class HouseValveClient:
                     break
             
             if not matched_valve:
-                result['message'] = f"未找到address为'{query_address}'的户阀信息"
+                # 重复执行同一批替换任务时，已执行过的行按旧阀号查不到，改按新阀号和地址确认
+                if new_serial_no != query_serial_no and await self._find_valve_by_address(new_serial_no, query_address):
+                    result['success'] = True
+                    result['skipped'] = True
+                    result['message'] = f"阀号已是'{new_serial_no}'，无需更新"
+                elif not valve_list:
+                    result['message'] = f"查询失败：未找到serialNo为'{query_serial_no}'的户阀信息"
+                else:
+                    result['message'] = f"未找到address为'{query_address}'的户阀信息"
                 return result
             
-            # 3. 构建基础更新数据
-            base_update_data = {
-                "station_branch_name": matched_valve.get('stationBranchName', ''),
-                "station_branch_id": matched_valve.get('stationBranchId'),
-                "serial_no": matched_valve.get('serialNo'),
-                "type_valve": matched_valve.get('type'),
-                "unit_id": matched_valve.get('unitName'),
-                "factory_id": matched_valve.get('factoryId'),
-                "model_id": matched_valve.get('modelId'),
-                "net_equ_id": matched_valve.get('netEquId'),
-                "collector_id": matched_valve.get('collectorId'),
-                "port": matched_valve.get('port'),
-                "baud_rate": matched_valve.get('baudRate'),
-                "check_bit": matched_valve.get('checkBit'),
-                "index": matched_valve.get('index'),
-                "caliber": matched_valve.get('caliber'),
-                "is_read_card": matched_valve.get('isReadCard') == '支持',
-                "is_tem_control": matched_valve.get('isTemControl') == '支持',
-                "is_setting_tem": matched_valve.get('isSettingTem') == '支持',
-                "is_tem_range": matched_valve.get('isTemRange') == '支持',
-                "is_lock_tem": matched_valve.get('isLockTem') == '支持',
-                "detail_position": matched_valve.get('detailPosition'),
-                "intermediate_path": matched_valve.get('intermediatePath'),
-                "enabled": matched_valve.get('enabled', True),
-                "install_date": matched_valve.get('installDate'),
-                "create_date": matched_valve.get('createDate'),
-                "memo": matched_valve.get('memo'),
-                "unique_id": matched_valve.get('uniqueId'),
-                "panel_serial_no": matched_valve.get('panelSerialNo'),
-                "communication_type": matched_valve.get('communicationType', 1),
-                "panel_id": matched_valve.get('panelId'),
-                "room_panel_id": matched_valve.get('roomPanelId'),
-                "identification_code": matched_valve.get('identificationCode'),
-                "equipment_use": matched_valve.get('equipmentUse', '调节阀'),
-                "install_site": matched_valve.get('installSite')
-            }
-            
-            # 4. 设置更新的新阀号
-            update_changes = {
-                "serial_no": new_serial_no
-            }
+            # 3. 对比当前记录与目标阀号，有变化时才执行更新
+            change_result = await self.update_household_valve_if_changed(
+                matched_valve,
+                {"serial_no": new_serial_no},
+                dry_run=dry_run
+            )
+            result['changes'] = change_result['changes']
+            result['update_result'] = change_result['update_result']
             
-            # 5. 组合最终的更新数据
-            final_update_data = {**base_update_data, **update_changes}
+            if dry_run:
+                result['success'] = True
+                result['message'] = f"试运行：需要修改的字段 {list(change_result['changes'])}" if change_result['changes'] else "试运行：无需更新"
+                return result
             
-            # 6. 执行更新操作
-            # 使用Pydantic模型调用update_household_valve
-            update_params = UpdateHouseholdValveParams(**final_update_data)
-            update_result = await self.update_household_valve(update_params)
-            result['update_result'] = update_result
+            if change_result['skipped']:
+                result['success'] = True
+                result['skipped'] = True
+                result['message'] = f"阀号已是'{new_serial_no}'，无需更新"
+                return result
             
+            update_result = change_result['update_result']
             if not update_result:
                 result['message'] = "更新失败：API调用失败"
                 return result
@@ -448,8 +1344,8 @@ class HouseValveClient:
                 result['message'] = f"更新失败：API返回错误 - {update_result.get('message', '未知错误')}"
                 return result
             
-            # 7. 验证更新结果 - 使用更新后的serialNo查询
-            updated_serial_no = final_update_data['serial_no']
+            # 4. 验证更新结果 - 使用更新后的serialNo查询
+            updated_serial_no = new_serial_no
             # 使用Pydantic模型调用find_household_valve
             verify_params = FindHouseholdValveParams(serial_no=updated_serial_no)
             verify_result = await self.find_household_valve(verify_params)
@@ -470,10 +1366,10 @@ class HouseValveClient:
                     result['message'] = f"验证失败：未找到更新后的阀号或serialNo不匹配"
             else:
                 result['message'] = f"验证失败：使用更新后的serialNo '{updated_serial_no}' 查询不到数据"
-                
+        
         except Exception as e:
             result['message'] = f"处理失败：{str(e)}"
-            
+        
         return result
 
 # 示例用法
@@ -0,0 +1,155 @@
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 整页解码时优先使用orjson（已安装时），否则使用标准库json
+json_loads = orjson.loads if orjson is not None else json.loads
+
+_NEED_MORE = object()
+_WHITESPACE = ' \t\r\n'
+_DELIMITERS = ',}]'
+
+
+class PageStreamDecoder:
+    """
+    分页响应的增量JSON解析器
+
+    逐块输入形如 {"resultCode": 0, "data": {"total": N, "data": [...]}} 的响应内容，
+    data.data数组中的记录每解析完一条就返回，其余字段保存在meta中。
+    每条记录由标准库json的C扫描器解析，缓冲区中只保留未解析完的部分。
+    """
+
+    def __init__(self, records_path=('data', 'data')):
+        """
+        :param records_path: 记录数组在响应中的字段路径，默认为 ('data', 'data')
+        """
+        self.records_path = records_path
+        self.meta = {}
+        self.done = False
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._parser = self._parse()
+
+    def feed(self, chunk, eof=False):
+        """
+        输入一块响应内容
+
+        :param chunk: 响应内容块（bytes或str）
+        :param eof: 是否为最后一块
+        :return: 本次解析出的完整记录列表
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._text_decoder.decode(chunk, final=eof)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        self._eof = eof
+
+        records = []
+        while not self.done:
+            try:
+                item = next(self._parser)
+            except StopIteration:
+                self.done = True
+                break
+            if item is _NEED_MORE:
+                if eof:
+                    raise ValueError("响应内容不完整")
+                break
+            records.append(item)
+        return records
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            yield _NEED_MORE
+
+    def _expect(self, char):
+        actual = yield from self._peek()
+        if actual != char:
+            raise ValueError(f"响应格式错误：应为'{char}'，实际为'{actual}'")
+        self._pos += 1
+
+    def _value(self):
+        yield from self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                yield _NEED_MORE
+                continue
+            # 数字和true/false/null可能在块边界处被截断（如 "12." 或 "1e" 会被解析为12和1），
+            # 后面必须是结构分隔符才能确定已完整
+            if not self._eof and not isinstance(value, (dict, list, str)):
+                next_pos = end
+                while next_pos < len(self._buffer) and self._buffer[next_pos] in _WHITESPACE:
+                    next_pos += 1
+                if next_pos == len(self._buffer) or self._buffer[next_pos] not in _DELIMITERS:
+                    yield _NEED_MORE
+                    continue
+            self._pos = end
+            return value
+
+    def _set_meta(self, path, value):
+        target = self.meta
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+
+    def _parse(self):
+        yield from self._object(())
+        self._buffer = ''
+        self._pos = 0
+
+    def _object(self, path):
+        yield from self._expect('{')
+        if (yield from self._peek()) == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = yield from self._value()
+            yield from self._expect(':')
+            key_path = path + (key,)
+            char = yield from self._peek()
+
+            if key_path == self.records_path and char == '[':
+                yield from self._array()
+            elif key_path == self.records_path[:len(key_path)] and char == '{':
+                yield from self._object(key_path)
+            else:
+                self._set_meta(key_path, (yield from self._value()))
+
+            char = yield from self._peek()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"响应格式错误：对象中出现'{char}'")
+
+    def _array(self):
+        yield from self._expect('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield (yield from self._value())
+            char = yield from self._peek()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"响应格式错误：数组中出现'{char}'")
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import random
+import re
+import httpx
+
+
+class MockValveServer:
+    """
+    户阀平台接口的本地模拟服务（基于httpx.MockTransport）
+
+    实现findHouseholdValve、updateHouseholdValve、findNetEqu、updateControl和
+    findHouseholdMeterCurrentDataAdvanced五个接口，使用按规模生成的模拟数据，
+    可注入延迟、HTTP 500错误和超时，用于在不访问生产服务器的情况下测试和压测客户端。
+    """
+
+    def __init__(self, valve_count=10000, net_equipment_count=500, station_count=20,
+                 latency=0.02, latency_jitter=0.0, error_rate=0.0, timeout_rate=0.0,
+                 offline_rate=0.05, seed=0, record_latency=0.0):
+        """
+        :param valve_count: 户阀数量，默认为10000
+        :param net_equipment_count: 采集器数量，默认为500
+        :param station_count: 换热站数量，组织树为 001 → 换热站(001xxx) → 楼栋(001xxxyyy)，默认为20
+        :param latency: 每个请求的基础延迟（秒），默认为0.02
+        :param latency_jitter: 在基础延迟上随机增加的最大延迟（秒），默认为0
+        :param error_rate: 返回HTTP 500的概率，默认为0
+        :param timeout_rate: 抛出httpx.ReadTimeout的概率，默认为0
+        :param offline_rate: 户阀抄通状态为离线的比例，默认为0.05
+        :param seed: 随机数种子，默认为0
+        :param record_latency: 查询接口每返回一条记录增加的延迟（秒），用于模拟大页查询变慢，默认为0
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.record_latency = record_latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.random = random.Random(seed)
+
+        self.net_equipment = [
+            {'uniqueId': i + 1, 'serialNo': str(25000000 + i), 'guid': f'NEQ-{i:06d}'}
+            for i in range(net_equipment_count)
+        ]
+        self.valves = [self._build_valve(i, net_equipment_count, station_count) for i in range(valve_count)]
+        self.comm_status = {
+            valve['serialNo']: '离线' if self.random.random() < offline_rate else '正常'
+            for valve in self.valves
+        }
+
+        # 组织树节点编号到户阀列表的缓存，户阀被修改时清空
+        self._tree_index = {}
+
+        # 按条件注入的HTTP错误，见add_fault
+        self.faults = []
+
+        # 接口名到调用次数的映射
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @staticmethod
+    def _build_valve(i, net_equipment_count, station_count):
+        station = i % station_count + 1
+        building = i // 200 % 30 + 1
+        collector = i % net_equipment_count + 1 if net_equipment_count else None
+        return {
+            'uniqueId': i + 1,
+            'serialNo': str(24000000 + i),
+            'address': f'小区{station}-{building}#-一单元-{i % 200 + 101}',
+            'stationBranchName': f'换热站{station}',
+            'stationBranchId': station,
+            'type': '通断阀',
+            'unitName': '一单元',
+            'factoryId': 437,
+            'modelId': 88,
+            'netEquId': collector,
+            'collectorId': collector,
+            'port': 1,
+            'baudRate': '2400',
+            'checkBit': '偶校验',
+            'index': i % 64,
+            'caliber': 20,
+            'isReadCard': '不支持',
+            'isTemControl': '支持',
+            'isSettingTem': '支持',
+            'isTemRange': '不支持',
+            'isLockTem': '不支持',
+            'detailPosition': None,
+            'intermediatePath': f'001-{station:03d}-{building:03d}',
+            'enabled': True,
+            'installDate': '2024-09-01',
+            'createDate': f'2024-09-{i // 86400 % 28 + 1:02d} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}',
+            'memo': None,
+            'panelSerialNo': None,
+            'communicationType': 1,
+            'panelId': None,
+            'roomPanelId': None,
+            'identificationCode': None,
+            'equipmentUse': '调节阀',
+            'installSite': '户内'
+        }
+
+    def transport(self):
+        """
+        :return: 可传给HouseValveClient(transport=...)的httpx.MockTransport
+        """
+        return httpx.MockTransport(self.handler)
+
+    def add_fault(self, endpoint, status=500, times=None, when=None):
+        """
+        对匹配的请求返回指定的HTTP错误
+
+        :param endpoint: 接口名，如findNetEqu
+        :param status: 返回的HTTP状态码，默认为500
+        :param times: 最多注入的次数，默认为None表示不限
+        :param when: 额外的匹配条件，参数为httpx请求对象，返回True时注入，默认为None表示该接口的所有请求
+        """
+        self.faults.append({'endpoint': endpoint, 'status': status, 'times': times, 'when': when})
+
+    def _fault(self, endpoint, request):
+        for fault in self.faults:
+            if fault['endpoint'] != endpoint or fault['times'] == 0:
+                continue
+            if fault['when'] is not None and not fault['when'](request):
+                continue
+            if fault['times'] is not None:
+                fault['times'] -= 1
+            return httpx.Response(fault['status'], json={'resultCode': fault['status'], 'message': '模拟注入错误'})
+        return None
+
+    def client_kwargs(self):
+        """
+        :return: 创建指向本模拟服务的HouseValveClient所需的参数
+        """
+        return {'base_url': 'http://mock', 'token': 'mock-token', 'transport': self.transport()}
+
+    async def handler(self, request):
+        endpoint = request.url.path.rsplit('/', 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.latency + self.random.random() * self.latency_jitter
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.random.random() < self.timeout_rate:
+                raise httpx.ReadTimeout('模拟超时', request=request)
+            if self.random.random() < self.error_rate:
+                return httpx.Response(500, json={'resultCode': 500, 'message': '模拟服务端错误'})
+            fault = self._fault(endpoint, request)
+            if fault is not None:
+                return fault
+
+            route = {
+                'findHouseholdValve': self._find_household_valve,
+                'updateHouseholdValve': self._update_household_valve,
+                'findNetEqu': self._find_net_equipment,
+                'updateControl': self._update_control,
+                'findHouseholdMeterCurrentDataAdvanced': self._find_meter_data
+            }.get(endpoint)
+            if route is None:
+                return httpx.Response(404, json={'resultCode': 404, 'message': f'未知接口{endpoint}'})
+            body = route(request)
+            data = body.get('data')
+            records = data.get('data') if isinstance(data, dict) else None
+            if self.record_latency and records:
+                await asyncio.sleep(self.record_latency * len(records))
+            return httpx.Response(200, json=body)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _page(rows, params):
+        page_size = int(params.get('pageSize') or 10)
+        page_index = int(params.get('pageIndex') or 1)
+        sort_name = params.get('sortName')
+        if sort_name:
+            rows = sorted(rows, key=lambda row: str(row.get(sort_name) or ''), reverse=params.get('sortType') == 'desc')
+        start = (page_index - 1) * page_size
+        return {
+            'resultCode': 0,
+            'message': '成功',
+            'data': {'total': len(rows), 'data': rows[start:start + page_size]}
+        }
+
+    def _find_household_valve(self, request):
+        params = request.url.params
+        rows = self.valves
+        tree_id = params.get('treeId')
+        if tree_id and tree_id != '001':
+            # 按组织树节点过滤，节点编号为各级3位编码的拼接
+            if tree_id not in self._tree_index:
+                self._tree_index[tree_id] = [
+                    valve for valve in rows if (valve['intermediatePath'] or '').replace('-', '').startswith(tree_id)
+                ]
+            rows = self._tree_index[tree_id]
+        if params.get('serialNo'):
+            rows = [valve for valve in rows if valve['serialNo'] == params['serialNo']]
+        return self._page(rows, params)
+
+    def _find_net_equipment(self, request):
+        params = request.url.params
+        rows = self.net_equipment
+        if params.get('serialNo'):
+            rows = [equipment for equipment in rows if equipment['serialNo'] == params['serialNo']]
+        return self._page(rows, params)
+
+    def _find_meter_data(self, request):
+        params = request.url.params
+        serial_nos = set(re.findall(r"'([^']*)'", params.get('advanceCondition', '')))
+        rows = [
+            {'serialNo': valve['serialNo'], 'address': valve['address'], 'commStatus': self.comm_status.get(valve['serialNo'])}
+            for valve in self.valves if valve['serialNo'] in serial_nos
+        ]
+        return self._page(rows, params)
+
+    def _update_household_valve(self, request):
+        body = json.loads(request.content)
+        self._tree_index.clear()
+        for valve in self.valves:
+            if valve['uniqueId'] == body.get('uniqueId'):
+                if body.get('serialNo') != valve['serialNo']:
+                    self.comm_status[body.get('serialNo')] = self.comm_status.pop(valve['serialNo'], None)
+                for key, value in body.items():
+                    if key in valve and not key.startswith('is'):
+                        valve[key] = value
+                return {'resultCode': 0, 'message': '修改成功'}
+        return {'resultCode': 1, 'message': '户阀不存在'}
+
+    def _update_control(self, request):
+        devices = json.loads(request.content)
+        return {'resultCode': 0, 'message': f'下发成功{len(devices)}个'}
@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from collections.abc import Sequence
+from typing import Optional, Generic, TypeVar
+from json_stream import json_loads
 
 
 class FindHouseholdValveParams(BaseModel):
@@ -61,6 +63,54 @@ class UpdateHouseholdValveParams(BaseModel):
     equipment_use: str = Field(default="调节阀", description="设备用途")
     install_site: Optional[str] = Field(default=None, description="安装位置")
 
+    @classmethod
+    def from_valve(cls, valve, **changes):
+        """根据查询到的户阀信息构建更新参数，changes中的字段覆盖原值"""
+        data = {
+            "station_branch_name": valve.get('stationBranchName', ''),
+            "station_branch_id": valve.get('stationBranchId'),
+            "serial_no": valve.get('serialNo'),
+            "type_valve": valve.get('type'),
+            "unit_id": valve.get('unitName'),
+            "factory_id": valve.get('factoryId'),
+            "model_id": valve.get('modelId'),
+            "net_equ_id": valve.get('netEquId'),
+            "collector_id": valve.get('collectorId'),
+            "port": valve.get('port'),
+            "baud_rate": valve.get('baudRate'),
+            "check_bit": valve.get('checkBit'),
+            "index": valve.get('index'),
+            "caliber": valve.get('caliber'),
+            "is_read_card": valve.get('isReadCard') == '支持',
+            "is_tem_control": valve.get('isTemControl') == '支持',
+            "is_setting_tem": valve.get('isSettingTem') == '支持',
+            "is_tem_range": valve.get('isTemRange') == '支持',
+            "is_lock_tem": valve.get('isLockTem') == '支持',
+            "detail_position": valve.get('detailPosition'),
+            "intermediate_path": valve.get('intermediatePath'),
+            "enabled": valve.get('enabled', True),
+            "install_date": valve.get('installDate'),
+            "create_date": valve.get('createDate'),
+            "memo": valve.get('memo'),
+            "unique_id": valve.get('uniqueId'),
+            "panel_serial_no": valve.get('panelSerialNo'),
+            "communication_type": valve.get('communicationType', 1),
+            "panel_id": valve.get('panelId'),
+            "room_panel_id": valve.get('roomPanelId'),
+            "identification_code": valve.get('identificationCode'),
+            "equipment_use": valve.get('equipmentUse', '调节阀'),
+            "install_site": valve.get('installSite')
+        }
+        return cls(**{**data, **changes})
+
+    def diff(self, other: "UpdateHouseholdValveParams") -> dict:
+        """对比两组更新参数，返回有变化的字段：{字段名: (当前值, 目标值)}"""
+        return {
+            name: (getattr(self, name), getattr(other, name))
+            for name in type(self).model_fields
+            if getattr(self, name) != getattr(other, name)
+        }
+
 
 class DeviceInfo(BaseModel):
     """设备信息"""
@@ -106,3 +156,173 @@ class FindHouseholdMeterCurrentDataParams(BaseModel):
     save: bool = Field(default=False, description="是否保存查询")
     save_name: str = Field(default="", description="保存名称")
     build_and_floors: str = Field(default="", description="楼栋和楼层")
+
+
+class HouseholdValve(BaseModel):
+    """户阀信息（findHouseholdValve返回记录）"""
+    model_config = ConfigDict(populate_by_name=True, extra='allow', coerce_numbers_to_str=True)
+
+    unique_id: Optional[int] = Field(default=None, alias='uniqueId', description="唯一ID")
+    serial_no: Optional[str] = Field(default=None, alias='serialNo', description="户阀编号")
+    address: Optional[str] = Field(default=None, alias='address', description="地址")
+    station_branch_name: Optional[str] = Field(default=None, alias='stationBranchName', description="站点分支名称")
+    station_branch_id: Optional[int] = Field(default=None, alias='stationBranchId', description="站点分支ID")
+    type_valve: Optional[str] = Field(default=None, alias='type', description="阀门类型")
+    unit_name: Optional[str] = Field(default=None, alias='unitName', description="单元名称")
+    factory_id: Optional[int] = Field(default=None, alias='factoryId', description="厂家ID")
+    model_id: Optional[int] = Field(default=None, alias='modelId', description="型号ID")
+    net_equ_id: Optional[int] = Field(default=None, alias='netEquId', description="网络设备ID")
+    collector_id: Optional[int] = Field(default=None, alias='collectorId', description="采集器ID")
+    port: Optional[int] = Field(default=None, alias='port', description="端口")
+    baud_rate: Optional[str] = Field(default=None, alias='baudRate', description="波特率")
+    check_bit: Optional[str] = Field(default=None, alias='checkBit', description="校验位")
+    index: Optional[int] = Field(default=None, alias='index', description="索引")
+    caliber: Optional[int] = Field(default=None, alias='caliber', description="口径")
+    is_read_card: Optional[str] = Field(default=None, alias='isReadCard', description="是否支持读卡")
+    is_tem_control: Optional[str] = Field(default=None, alias='isTemControl', description="是否支持温度控制")
+    is_setting_tem: Optional[str] = Field(default=None, alias='isSettingTem', description="是否支持设置温度")
+    is_tem_range: Optional[str] = Field(default=None, alias='isTemRange', description="是否支持温度范围")
+    is_lock_tem: Optional[str] = Field(default=None, alias='isLockTem', description="是否支持锁定温度")
+    detail_position: Optional[str] = Field(default=None, alias='detailPosition', description="详细位置")
+    intermediate_path: Optional[str] = Field(default=None, alias='intermediatePath', description="中间路径")
+    enabled: Optional[bool] = Field(default=None, alias='enabled', description="是否启用")
+    install_date: Optional[str] = Field(default=None, alias='installDate', description="安装日期")
+    create_date: Optional[str] = Field(default=None, alias='createDate', description="创建日期")
+    memo: Optional[str] = Field(default=None, alias='memo', description="备注")
+    panel_serial_no: Optional[str] = Field(default=None, alias='panelSerialNo', description="面板序列号")
+    communication_type: Optional[int] = Field(default=None, alias='communicationType', description="通信类型")
+    panel_id: Optional[int] = Field(default=None, alias='panelId', description="面板ID")
+    room_panel_id: Optional[int] = Field(default=None, alias='roomPanelId', description="房间面板ID")
+    identification_code: Optional[str] = Field(default=None, alias='identificationCode', description="识别码")
+    equipment_use: Optional[str] = Field(default=None, alias='equipmentUse', description="设备用途")
+    install_site: Optional[str] = Field(default=None, alias='installSite', description="安装位置")
+
+
+class NetEquipment(BaseModel):
+    """采集器信息（findNetEqu返回记录）"""
+    model_config = ConfigDict(populate_by_name=True, extra='allow', coerce_numbers_to_str=True)
+
+    serial_no: Optional[str] = Field(default=None, alias='serialNo', description="采集器编号")
+    guid: Optional[str] = Field(default=None, alias='guid', description="采集器GUID")
+
+
+class HouseholdMeterData(BaseModel):
+    """户阀抄通状态（findHouseholdMeterCurrentDataAdvanced返回记录）"""
+    model_config = ConfigDict(populate_by_name=True, extra='allow', coerce_numbers_to_str=True)
+
+    serial_no: Optional[str] = Field(default=None, alias='serialNo', description="户阀编号")
+    comm_status: Optional[str] = Field(default=None, alias='commStatus', description="抄通状态")
+
+
+RecordT = TypeVar('RecordT')
+
+
+class PageData(BaseModel, Generic[RecordT]):
+    """分页数据"""
+    total: int = Field(default=0, description="总记录数")
+    data: list[RecordT] = Field(default_factory=list, description="本页记录")
+
+
+class ApiResponse(BaseModel, Generic[RecordT]):
+    """分页查询接口的响应"""
+    model_config = ConfigDict(populate_by_name=True, extra='allow')
+
+    result_code: Optional[int] = Field(default=None, alias='resultCode', description="结果代码，0为成功")
+    message: Optional[str] = Field(default=None, description="结果消息")
+    data: Optional[PageData[RecordT]] = Field(default=None, description="分页数据")
+
+
+class TrustedRecord:
+    """
+    免校验的惰性记录
+
+    直接包装接口返回的字典，不做类型转换。每个模型生成一个子类（见for_model），
+    模型字段名为只读属性，读取时直接取对应的驼峰字段。
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @classmethod
+    def for_model(cls, model):
+        """
+        :param model: 记录模型，如HouseholdValve
+        :return: 该模型的TrustedRecord子类
+        """
+        namespace = {'__slots__': ()}
+        for name, field in model.model_fields.items():
+            alias = field.alias or name
+            namespace[name] = property(lambda self, alias=alias: self.raw.get(alias))
+        return type(f'Trusted{model.__name__}', (cls,), namespace)
+
+    def model_dump(self, by_alias=True):
+        """返回原始字典（驼峰字段名）"""
+        return self.raw
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class TrustedRecordList(Sequence):
+    """免校验的记录列表，按下标访问或遍历时才包装为TrustedRecord"""
+    __slots__ = ('raw', 'record_class')
+
+    def __init__(self, raw, record_class):
+        self.raw = raw
+        self.record_class = record_class
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TrustedRecordList(self.raw[index], self.record_class)
+        return self.record_class(self.raw[index])
+
+    def __iter__(self):
+        return map(self.record_class, self.raw)
+
+    def __repr__(self):
+        return f"TrustedRecordList({len(self.raw)} records)"
+
+
+_RESPONSE_ADAPTERS = {}
+_TRUSTED_CLASSES = {}
+
+
+def parse_response(content, model, trusted=False):
+    """
+    将分页查询接口的响应内容解析为ApiResponse[model]
+
+    校验模式逐条校验并转换类型，耗时约为解码为原始字典的2.5倍；免校验模式与原始字典相当
+    （见bench_response_parsing.py）。
+
+    :param content: 响应内容（bytes或str）
+    :param model: 记录模型，如HouseholdValve
+    :param trusted: 为True时跳过校验，记录为访问时才包装的TrustedRecord，适合5000条的大页
+    :return: ApiResponse实例
+    """
+    if not trusted:
+        adapter = _RESPONSE_ADAPTERS.get(model)
+        if adapter is None:
+            adapter = _RESPONSE_ADAPTERS[model] = TypeAdapter(ApiResponse[model])
+        return adapter.validate_json(content)
+
+    record_class = _TRUSTED_CLASSES.get(model)
+    if record_class is None:
+        record_class = _TRUSTED_CLASSES[model] = TrustedRecord.for_model(model)
+
+    raw = json_loads(content)
+    page = raw.get('data') or {}
+    data = None
+    if isinstance(page, dict):
+        data = PageData.model_construct(
+            total=page.get('total', 0),
+            data=TrustedRecordList(page.get('data') or [], record_class)
+        )
+    return ApiResponse.model_construct(
+        result_code=raw.get('resultCode'),
+        message=raw.get('message'),
+        data=data
+    )
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+from typing import Optional
+from pydantic import BaseModel, Field
+from house_valve_client import HouseValveClient
+
+
+class SiteConfig(BaseModel):
+    """站点配置"""
+    name: str = Field(..., description="站点名称，用于标记结果")
+    base_url: str = Field(..., description="该站点v4.0接口地址")
+    token: str = Field(..., description="该站点认证token")
+    max_concurrency: Optional[int] = Field(default=None, description="该站点同时执行的最大操作数，默认使用协调器的设置")
+    client_options: dict = Field(default_factory=dict, description="传给HouseValveClient的其他参数，如timeout")
+
+
+def load_sites(path):
+    """
+    读取站点清单
+
+    文件为JSON数组，每项包含name、base_url、token，可选max_concurrency和client_options。
+
+    :param path: 站点清单文件路径
+    :return: SiteConfig列表
+    """
+    with open(path, encoding='utf-8') as f:
+        sites = [SiteConfig(**item) for item in json.load(f)]
+    names = [site.name for site in sites]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"站点名称重复：{duplicates}")
+    return sites
+
+
+class MultiSiteCoordinator:
+    """
+    多站点并发协调器
+
+    为每个站点打开一个独立连接池的HouseValveClient（各自的自适应并发限制器），
+    并为每个站点设置独立的操作并发上限，慢站点不会占用其他站点的并发名额。
+    所有站点的结果合并返回，每条结果带有site字段。
+    """
+
+    def __init__(self, sites, max_concurrency_per_site=4, site_timeout=None, client_kwargs=None):
+        """
+        :param sites: SiteConfig列表
+        :param max_concurrency_per_site: 每个站点同时执行的最大操作数，站点配置了max_concurrency时以站点为准，默认为4
+        :param site_timeout: 单个站点全部操作的超时时间（秒），超时的站点其余操作记为失败，默认为None表示不限
+        :param client_kwargs: 传给所有站点HouseValveClient的公共参数
+        """
+        self.sites = list(sites)
+        self.max_concurrency_per_site = max_concurrency_per_site
+        self.site_timeout = site_timeout
+        self.client_kwargs = client_kwargs or {}
+        self.clients = {}
+        self.semaphores = {}
+
+    async def __aenter__(self):
+        for site in self.sites:
+            self.clients[site.name] = HouseValveClient(
+                base_url=site.base_url,
+                token=site.token,
+                **{**self.client_kwargs, **site.client_options}
+            )
+            self.semaphores[site.name] = asyncio.Semaphore(max(1, site.max_concurrency or self.max_concurrency_per_site))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.gather(*[client.__aexit__(exc_type, exc_val, exc_tb) for client in self.clients.values()])
+        self.clients.clear()
+
+    async def _run_site(self, site, operation, items, on_result):
+        client = self.clients[site.name]
+        semaphore = self.semaphores[site.name]
+        results = [None] * len(items)
+
+        def finish(i, success, result=None, error=None, elapsed=0.0):
+            results[i] = {
+                'site': site.name,
+                'item': items[i],
+                'success': success,
+                'result': result,
+                'error': error,
+                'elapsed': elapsed
+            }
+            if on_result is not None:
+                on_result(results[i])
+
+        async def run_item(i, item):
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    result = await operation(client, site, item)
+                except Exception as e:
+                    finish(i, False, error=f"{type(e).__name__}: {e}", elapsed=time.monotonic() - started)
+                    return
+                success = result.get('success', True) if isinstance(result, dict) else result is not None
+                finish(i, success, result, elapsed=time.monotonic() - started)
+
+        tasks = [asyncio.ensure_future(run_item(i, item)) for i, item in enumerate(items)]
+        if not tasks:
+            return results
+        done, pending = await asyncio.wait(tasks, timeout=self.site_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            for i, result in enumerate(results):
+                if result is None:
+                    finish(i, False, error=f"站点超时（{self.site_timeout}秒）")
+        return results
+
+    async def map(self, operation, items, on_result=None):
+        """
+        在所有站点上对每个条目执行操作
+
+        :param operation: 异步函数 operation(client, site, item)，返回结果（字典中的success字段作为成功状态）
+        :param items: 所有站点共用的条目列表，或站点名称到条目列表的字典
+        :param on_result: 每个操作完成时的回调，参数为结果字典
+        :return: 按站点顺序合并的结果列表，每项包含site、item、success、result、error和elapsed
+        """
+        if isinstance(items, dict):
+            unknown = sorted(set(items) - {site.name for site in self.sites})
+            if unknown:
+                raise ValueError(f"未知站点：{unknown}")
+            items_by_site = {site.name: list(items.get(site.name, ())) for site in self.sites}
+        else:
+            items = list(items)
+            items_by_site = {site.name: items for site in self.sites}
+
+        site_results = await asyncio.gather(*[
+            self._run_site(site, operation, items_by_site[site.name], on_result) for site in self.sites
+        ])
+        return [result for results in site_results for result in results]
+
+    async def run(self, operation, on_result=None):
+        """
+        在每个站点上执行一次操作
+
+        :param operation: 异步函数 operation(client, site)
+        :param on_result: 每个站点完成时的回调，参数为结果字典
+        :return: 按站点顺序排列的结果列表，格式与map相同（item为None）
+        """
+        async def run_once(client, site, _):
+            return await operation(client, site)
+
+        return await self.map(run_once, [None], on_result)
+
+    def stats(self):
+        """
+        :return: 站点名称到该站点请求统计快照的字典
+        """
+        return {name: client.metrics.snapshot() for name, client in self.clients.items()}
@@ -0,0 +1,169 @@
+import sqlite3
+import time
+
+
+class PageSizeTuner:
+    """
+    分页查询每页大小的自动调整器，按接口地址和接口名分别调整并持久化（SQLite）
+
+    每页大小取 min_size * 2^k 阶梯上的值，翻页过程中改变每页大小时，新的大小能整除已读取的记录数，
+    保证 page_index 换算出的偏移量连续。每读完一整页，按平滑后的每条记录耗时估算在目标耗时内
+    能读取的记录数：估算值达到上一阶时每页大小增加一阶（逐步探测），低于当前大小时降到估算值以下；
+    请求失败（超时、连接失败、5xx等）时立即降一阶。调整结果写入数据库，下次运行从该值开始。
+    """
+
+    def __init__(self, path='page_size_tuning.db', min_size=100, max_size=10000, initial_size=800,
+                 target_page_time=2.0, timeout_fraction=0.25, smoothing=0.3, max_error_rate=0.05, retries=2):
+        """
+        :param path: SQLite数据库文件路径，默认为当前目录下的page_size_tuning.db，':memory:'表示不持久化
+        :param min_size: 每页大小下限，默认为100
+        :param max_size: 每页大小上限，向下取到阶梯上的值，默认为10000（即6400）
+        :param initial_size: 没有历史记录时的初始每页大小，向下取到阶梯上的值，默认为800
+        :param target_page_time: 单页请求的目标耗时（秒），默认为2.0
+        :param timeout_fraction: 单页目标耗时不超过接口超时时间的比例，默认为0.25
+        :param smoothing: 每条记录耗时和错误率的指数平滑系数，默认为0.3
+        :param max_error_rate: 平滑后的错误率超过该值时不再增大每页大小，默认为0.05
+        :param retries: 单页请求失败时缩小每页大小后重试的最大次数，默认为2
+        """
+        self.path = path
+        self.min_size = min_size
+        self.sizes = [min_size]
+        while self.sizes[-1] * 2 <= max_size:
+            self.sizes.append(self.sizes[-1] * 2)
+        self.initial_size = self._snap(initial_size)
+        self.target_page_time = target_page_time
+        self.timeout_fraction = timeout_fraction
+        self.smoothing = smoothing
+        self.max_error_rate = max_error_rate
+        self.retries = retries
+
+        self._states = {}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS page_size ('
+            'base_url TEXT NOT NULL, '
+            'endpoint TEXT NOT NULL, '
+            'page_size INTEGER NOT NULL, '
+            'record_time REAL, '
+            'error_rate REAL NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'PRIMARY KEY (base_url, endpoint))'
+        )
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _snap(self, size):
+        """返回不超过size的最大阶梯值，小于下限时返回下限"""
+        return max([s for s in self.sizes if s <= size] or [self.min_size])
+
+    def _state(self, base_url, endpoint):
+        key = (base_url, endpoint)
+        state = self._states.get(key)
+        if state is None:
+            row = self.conn.execute(
+                'SELECT page_size, record_time, error_rate FROM page_size WHERE base_url = ? AND endpoint = ?',
+                key
+            ).fetchone()
+            state = {
+                'page_size': self._snap(row[0]) if row else self.initial_size,
+                'record_time': row[1] if row else None,
+                'error_rate': row[2] if row else 0.0,
+                'pages': 0,
+                'errors': 0,
+                'increases': 0,
+                'decreases': 0
+            }
+            self._states[key] = state
+        return state
+
+    def _save(self, base_url, endpoint, state):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO page_size (base_url, endpoint, page_size, record_time, error_rate, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (base_url, endpoint, state['page_size'], state['record_time'], state['error_rate'], time.time())
+        )
+        self.conn.commit()
+
+    def page_size(self, base_url, endpoint, offset=0):
+        """
+        获取从offset开始读取时使用的每页大小
+
+        :param base_url: 接口地址
+        :param endpoint: 接口名，如findHouseholdValve
+        :param offset: 已跳过的记录数，默认为0
+        :return: 不超过当前调整值且能整除offset的阶梯值，offset不是min_size的整数倍时返回None
+        """
+        if offset % self.min_size:
+            return None
+        size = self._state(base_url, endpoint)['page_size']
+        while offset % size:
+            size //= 2
+        return size
+
+    def record(self, base_url, endpoint, page_size, records, elapsed, ok=True, timeout=None):
+        """
+        记录一页请求的结果并调整每页大小
+
+        :param base_url: 接口地址
+        :param endpoint: 接口名
+        :param page_size: 该页请求的每页大小
+        :param records: 该页返回的记录数，不足page_size的最后一页只更新错误率
+        :param elapsed: 该页请求耗时（秒）
+        :param ok: 请求是否成功
+        :param timeout: 该接口的超时时间（秒），用于限制单页目标耗时，默认为None表示不限
+        """
+        state = self._state(base_url, endpoint)
+        state['error_rate'] += self.smoothing * ((0.0 if ok else 1.0) - state['error_rate'])
+        current = state['page_size']
+
+        if not ok:
+            state['errors'] += 1
+            # 同一时刻多个在途请求失败时只按失败的那一页降一阶
+            if page_size <= current:
+                state['page_size'] = self._snap(max(self.min_size, page_size // 2))
+        else:
+            state['pages'] += 1
+            if records >= page_size > 0 and elapsed > 0:
+                record_time = elapsed / records
+                if state['record_time'] is None:
+                    state['record_time'] = record_time
+                else:
+                    state['record_time'] += self.smoothing * (record_time - state['record_time'])
+
+                target = self.target_page_time
+                if timeout:
+                    target = min(target, timeout * self.timeout_fraction)
+                estimate = target / state['record_time']
+                index = self.sizes.index(current)
+                if estimate < current:
+                    state['page_size'] = self._snap(estimate)
+                elif (page_size == current and index + 1 < len(self.sizes)
+                      and estimate >= self.sizes[index + 1] and state['error_rate'] <= self.max_error_rate):
+                    state['page_size'] = self.sizes[index + 1]
+
+        if state['page_size'] > current:
+            state['increases'] += 1
+        elif state['page_size'] < current:
+            state['decreases'] += 1
+        self._save(base_url, endpoint, state)
+
+    def stats(self):
+        """
+        获取本次运行的调整统计
+
+        :return: 接口地址到 {接口名: 统计字典} 的字典，统计包含当前每页大小、平滑后的每条记录耗时、
+                 错误率、成功页数、失败次数、增大和减小次数
+        """
+        result = {}
+        for (base_url, endpoint), state in self._states.items():
+            result.setdefault(base_url, {})[endpoint] = dict(state)
+        return result
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
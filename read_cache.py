@@ -0,0 +1,146 @@
+import time
+from collections import OrderedDict
+
+
+class ReadCache:
+    """
+    查询结果内存缓存（LRU + TTL）
+
+    以接口地址和查询参数为键缓存find_*接口的结果，每条缓存记录关联查询的阀号、
+    结果中记录的serialNo和uniqueId，更新接口写入时按这些值失效对应的缓存。
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        """
+        :param max_entries: 最多缓存的查询结果数，超出时淘汰最久未使用的记录，默认为1024
+        :param ttl: 缓存有效期（秒），默认为30秒
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        # 阀号/uniqueId到缓存键的反向索引
+        self.tag_index = {}
+        # 每次失效时递增，用于丢弃失效前发起、失效后才返回的查询结果
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        读取缓存的查询结果
+
+        :param key: 缓存键
+        :return: (是否命中, 查询结果)
+        """
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() > entry[0]:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[2]
+
+    def set(self, key, value, tags, generation=None):
+        """
+        写入查询结果
+
+        :param key: 缓存键
+        :param value: 查询结果
+        :param tags: 关联的阀号和 ('unique_id', uniqueId) 元组集合
+        :param generation: 发起查询时的generation，期间发生过失效时不写入，默认为None表示不检查
+        """
+        if generation is not None and generation != self.generation:
+            return
+        if key in self.entries:
+            self._remove(key)
+
+        tags = frozenset(tags)
+        self.entries[key] = (time.monotonic() + self.ttl, tags, value)
+        for tag in tags:
+            self.tag_index.setdefault(tag, set()).add(key)
+
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        _, tags, _ = self.entries.pop(key)
+        for tag in tags:
+            keys = self.tag_index.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.tag_index[tag]
+
+    def invalidate(self, tags):
+        """
+        删除与任一阀号或uniqueId关联的缓存记录
+
+        :param tags: 阀号和 ('unique_id', uniqueId) 元组的可迭代对象
+        :return: 删除的记录数
+        """
+        self.generation += 1
+        keys = set()
+        for tag in tags:
+            keys.update(self.tag_index.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        self.generation += 1
+        self.entries.clear()
+        self.tag_index.clear()
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        :return: 包含size、hits、misses、hit_ratio、evictions和invalidations的字典
+        """
+        total = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+def result_tags(result):
+    """
+    提取查询结果中记录的serialNo和uniqueId
+
+    :param result: find_*接口返回的字典或ApiResponse
+    :return: 阀号和 ('unique_id', uniqueId) 元组的集合
+    """
+    tags = set()
+    if isinstance(result, dict):
+        records = (result.get('data') or {}).get('data') or []
+        for record in records:
+            if record.get('serialNo') is not None:
+                tags.add(str(record['serialNo']))
+            if record.get('uniqueId') is not None:
+                tags.add(('unique_id', str(record['uniqueId'])))
+    elif result is not None and result.data is not None:
+        for record in result.data.data:
+            serial_no = getattr(record, 'serial_no', None)
+            unique_id = getattr(record, 'unique_id', None)
+            if serial_no is not None:
+                tags.add(str(serial_no))
+            if unique_id is not None:
+                tags.add(('unique_id', str(unique_id)))
+    return tags
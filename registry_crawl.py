@@ -0,0 +1,179 @@
+import asyncio
+import time
+from typing import Optional
+from models import FindHouseholdValveParams
+
+
+class RegistryCrawler:
+    """
+    按组织树分区并行扫描户阀档案
+
+    组织树节点编号为各级3位编码的拼接（如 001 → 001014），下级节点的parent_level_id为
+    "{上级tree_level}-{上级tree_id}"（如 tree_id='001014', tree_level=2, parent_level_id='1-001'）。
+    记录数超过split_threshold的节点会探测其下级节点并拆分为多个分区，各分区并发翻页扫描，
+    结果按uniqueId去重。下级节点记录数之和小于上级节点时（有记录直接挂在上级节点或探测不完整），
+    不拆分该节点，保证结果完整。
+    """
+
+    def __init__(self, client, params: Optional[FindHouseholdValveParams] = None, max_concurrency=8,
+                 split_threshold=20000, max_depth=3, probe_gap=20, probe_concurrency=20):
+        """
+        :param client: HouseValveClient实例
+        :param params: 根节点查询参数模型，默认为None表示 tree_id='001', tree_level=1
+        :param max_concurrency: 同时扫描的最大分区数，默认为8
+        :param split_threshold: 记录数超过该值的节点才拆分，默认为20000
+        :param max_depth: 相对根节点最多向下拆分的层数，默认为3
+        :param probe_gap: 探测下级节点时，连续多少个编码无记录后停止，默认为20
+        :param probe_concurrency: 探测下级节点时的并发数，默认为20
+        """
+        self.client = client
+        self.params = params or FindHouseholdValveParams()
+        self.max_concurrency = max_concurrency
+        self.split_threshold = split_threshold
+        self.max_depth = max_depth
+        self.probe_gap = probe_gap
+        self.probe_concurrency = probe_concurrency
+
+        self.root_total = None
+        self.partitions = []
+        self.probes = 0
+        self.records = 0
+        self.duplicates = 0
+        self.elapsed = 0.0
+
+    def _node_params(self, tree_id, tree_level, parent_level_id):
+        # 不覆盖page_size，未显式指定时由客户端的page_tuner调整
+        return self.params.model_copy(update={
+            'tree_id': tree_id,
+            'tree_level': tree_level,
+            'parent_level_id': parent_level_id,
+            'page_index': 1
+        })
+
+    async def _count(self, params):
+        self.probes += 1
+        result = await self.client.find_household_valve(params.model_copy(update={'page_index': 1, 'page_size': 1}))
+        if not (result and result.get('resultCode') == 0):
+            raise RuntimeError(f"节点{params.tree_id}查询失败：{result.get('message') if result else 'API调用失败'}")
+        return result.get('data', {}).get('total') or 0
+
+    async def _children(self, params):
+        """
+        探测节点的下级节点
+
+        :param params: 节点查询参数
+        :return: (下级节点参数, 记录数) 列表
+        """
+        children = []
+        semaphore = asyncio.Semaphore(max(1, self.probe_concurrency))
+        code = 1
+        last_hit = 0
+
+        async def probe(child_code):
+            child = self._node_params(
+                f'{params.tree_id}{child_code:03d}',
+                params.tree_level + 1,
+                f'{params.tree_level}-{params.tree_id}'
+            )
+            async with semaphore:
+                return child, await self._count(child)
+
+        # 每次探测probe_concurrency个编码，直到连续probe_gap个编码无记录
+        while code <= 999 and code - last_hit <= self.probe_gap:
+            codes = range(code, min(code + self.probe_concurrency, 1000))
+            for child_code, (child, total) in zip(codes, await asyncio.gather(*[probe(c) for c in codes])):
+                if total:
+                    children.append((child, total))
+                    last_hit = child_code
+            code = codes[-1] + 1
+        return children
+
+    async def plan(self):
+        """
+        从根节点开始拆分分区
+
+        :return: 分区列表，每项为 (查询参数, 记录数)
+        """
+        self.root_total = await self._count(self.params)
+        partitions = []
+
+        async def split(params, total, depth):
+            if total <= self.split_threshold or depth >= self.max_depth:
+                partitions.append((params, total))
+                return
+            children = await self._children(params)
+            if not children or sum(child_total for _, child_total in children) < total:
+                partitions.append((params, total))
+                return
+            await asyncio.gather(*[split(child, child_total, depth + 1) for child, child_total in children])
+
+        await split(self.params, self.root_total, 0)
+        self.partitions = partitions
+        return partitions
+
+    async def iter_valves(self):
+        """
+        并发扫描所有分区，逐条返回按uniqueId去重后的户阀
+
+        :return: 异步生成器，逐条返回户阀信息字典
+        """
+        started = time.monotonic()
+        if not self.partitions:
+            await self.plan()
+
+        queue = asyncio.Queue(maxsize=self.params.page_size * 2)
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        done = object()
+
+        async def scan(params):
+            # 被取消时（调用方提前结束或其他分区出错）不再向队列写入，避免队列已满时阻塞在put上
+            valves = self.client.iter_household_valves(params)
+            try:
+                async with semaphore:
+                    async for valve in valves:
+                        await queue.put(valve)
+            except Exception as e:
+                await queue.put(e)
+                return
+            finally:
+                await valves.aclose()
+            await queue.put(done)
+
+        tasks = [asyncio.ensure_future(scan(params)) for params, _ in self.partitions]
+        seen = set()
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                unique_id = item.get('uniqueId')
+                if unique_id is not None:
+                    if unique_id in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(unique_id)
+                self.records += 1
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.elapsed = time.monotonic() - started
+
+    def stats(self):
+        """
+        :return: 扫描统计字典，包含根节点记录数、分区数、探测次数、去重后记录数和重复记录数
+        """
+        return {
+            'root_total': self.root_total,
+            'partitions': len(self.partitions),
+            'probes': self.probes,
+            'records': self.records,
+            'duplicates': self.duplicates,
+            'missing': max(0, (self.root_total or 0) - self.records),
+            'elapsed': self.elapsed
+        }
@@ -0,0 +1,489 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from typing import Optional
+from house_valve_client import HouseValveClient
+from models import FindHouseholdValveParams, FindNetEquipmentParams, FindHouseholdMeterCurrentDataParams
+from page_tuner import PageSizeTuner
+from registry_crawl import RegistryCrawler
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshot_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS household_valve (
+    unique_id TEXT PRIMARY KEY,
+    serial_no TEXT,
+    address TEXT,
+    collector_id TEXT,
+    net_equ_id TEXT,
+    create_date TEXT,
+    content_hash TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_valve_serial_no ON household_valve (serial_no);
+CREATE INDEX IF NOT EXISTS idx_valve_address ON household_valve (address);
+CREATE INDEX IF NOT EXISTS idx_valve_collector_id ON household_valve (collector_id);
+CREATE INDEX IF NOT EXISTS idx_valve_net_equ_id ON household_valve (net_equ_id);
+CREATE INDEX IF NOT EXISTS idx_valve_create_date ON household_valve (create_date);
+CREATE TABLE IF NOT EXISTS net_equipment (
+    serial_no TEXT PRIMARY KEY,
+    guid TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meter_status (
+    serial_no TEXT PRIMARY KEY,
+    comm_status TEXT,
+    data TEXT NOT NULL
+);
+'''
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _content_hash(data):
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False, sort_keys=True)
+
+
+class RegistrySnapshot:
+    """
+    户阀档案本地快照（SQLite）
+
+    户阀、采集器和抄通状态各存一张表，常用查询字段建索引，完整记录以JSON保存在data列。
+    """
+
+    def __init__(self, path='registry_snapshot.db'):
+        """
+        :param path: SQLite数据库文件路径，默认为当前目录下的registry_snapshot.db
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # 兼容没有content_hash列的旧快照文件
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(household_valve)')]
+        if columns and 'content_hash' not in columns:
+            self.conn.execute('ALTER TABLE household_valve ADD COLUMN content_hash TEXT')
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO snapshot_meta (key, value) VALUES (?, ?)', (key, _text(value)))
+
+    def get_meta(self, key):
+        """
+        读取快照元数据
+
+        :param key: 元数据键，如exported_at、base_url
+        :return: 元数据值，不存在时返回None
+        """
+        row = self.conn.execute('SELECT value FROM snapshot_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def write_valves(self, valves):
+        """
+        写入一批户阀记录
+
+        :param valves: 户阀信息字典列表
+        """
+        rows = []
+        for valve in valves:
+            data = _dump(valve)
+            rows.append((
+                _text(valve.get('uniqueId')),
+                _text(valve.get('serialNo')),
+                valve.get('address'),
+                _text(valve.get('collectorId')),
+                _text(valve.get('netEquId')),
+                valve.get('createDate'),
+                _content_hash(data),
+                data
+            ))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO household_valve '
+            '(unique_id, serial_no, address, collector_id, net_equ_id, create_date, content_hash, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        self.conn.commit()
+
+    def write_net_equipment(self, equipments):
+        """
+        写入一批采集器记录
+
+        :param equipments: 采集器信息字典列表
+        """
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO net_equipment (serial_no, guid, data) VALUES (?, ?, ?)',
+            [
+                (_text(equ.get('serialNo')), equ.get('guid'), _dump(equ))
+                for equ in equipments
+            ]
+        )
+        self.conn.commit()
+
+    def write_meter_status(self, records):
+        """
+        写入一批抄通状态记录
+
+        :param records: 抄通状态信息字典列表
+        """
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO meter_status (serial_no, comm_status, data) VALUES (?, ?, ?)',
+            [
+                (_text(record.get('serialNo')), _text(record.get('commStatus')), _dump(record))
+                for record in records
+            ]
+        )
+        self.conn.commit()
+
+    async def _export_records(self, records, write, batch_size):
+        count = 0
+        batch = []
+        try:
+            async for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    write(batch)
+                    count += len(batch)
+                    batch = []
+        finally:
+            # 写入失败时立即关闭数据源，并行扫描时由此取消各分区任务
+            await records.aclose()
+        if batch:
+            write(batch)
+            count += len(batch)
+        return count
+
+    async def export(self, client: HouseValveClient, params: Optional[FindHouseholdValveParams] = None,
+                     include_net_equipment=False, include_meter_status=False,
+                     meter_params: Optional[FindHouseholdMeterCurrentDataParams] = None,
+                     meter_batch_size=2000, crawl_concurrency=None):
+        """
+        从接口导出户阀档案到本地快照，每收到一页即写入，不在内存中缓存全部数据
+
+        :param client: HouseValveClient实例
+        :param params: 户阀查询参数模型，默认为None表示导出全部户阀
+        :param include_net_equipment: 是否同时导出采集器，默认为False
+        :param include_meter_status: 是否同时导出抄通状态，默认为False
+        :param meter_params: 抄通状态查询参数模型，默认为None
+        :param meter_batch_size: 每次批量查询抄通状态的阀号数量，默认为2000
+        :param crawl_concurrency: 按组织树分区并行扫描户阀时的最大分区并发数，默认为None表示顺序翻页
+        :return: 导出统计字典，包含各表写入的记录数和耗时；并行扫描时crawl为RegistryCrawler的统计
+        """
+        if params is None:
+            params = FindHouseholdValveParams()
+
+        started = time.monotonic()
+        stats = {'valves': 0, 'net_equipment': 0, 'meter_status': 0, 'meter_missing': 0, 'elapsed': 0.0}
+        fresh = self.valve_count() == 0
+
+        if crawl_concurrency:
+            crawler = RegistryCrawler(client, params, max_concurrency=crawl_concurrency)
+            stats['valves'] = await self._export_records(crawler.iter_valves(), self.write_valves, params.page_size)
+            stats['crawl'] = crawler.stats()
+        else:
+            stats['valves'] = await self._export_records(
+                client.iter_household_valves(params), self.write_valves, params.page_size
+            )
+
+        if include_net_equipment:
+            equ_params = FindNetEquipmentParams()
+            stats['net_equipment'] = await self._export_records(
+                client.iter_net_equipment(equ_params), self.write_net_equipment, equ_params.page_size
+            )
+
+        if include_meter_status:
+            all_serial_nos = [
+                row[0] for row in
+                self.conn.execute('SELECT DISTINCT serial_no FROM household_valve WHERE serial_no IS NOT NULL')
+            ]
+            for i in range(0, len(all_serial_nos), meter_batch_size):
+                serial_nos = all_serial_nos[i:i + meter_batch_size]
+                meter_result = await client.find_household_meter_current_data_batch(serial_nos, meter_params)
+                if meter_result['failed']:
+                    raise RuntimeError(f"抄通状态查询失败：{meter_result['message']}")
+                self.write_meter_status(list(meter_result['records'].values()))
+                stats['meter_status'] += len(meter_result['records'])
+                stats['meter_missing'] += len(meter_result['missing'])
+
+        self._set_meta('base_url', client.base_url)
+        self._set_meta('exported_at', time.strftime('%Y-%m-%d %H:%M:%S'))
+        self._set_meta('high_water_create_date', self._max_create_date())
+        if fresh:
+            # 导出到空快照时结果与服务端一致，可作为一次完整校验
+            self._set_meta('last_checksum_at', time.time())
+        self.conn.commit()
+
+        stats['elapsed'] = time.monotonic() - started
+        return stats
+
+    def valve_count(self):
+        """
+        :return: 快照中的户阀记录数
+        """
+        return self.conn.execute('SELECT COUNT(*) FROM household_valve').fetchone()[0]
+
+    def _max_create_date(self):
+        return self.conn.execute('SELECT MAX(create_date) FROM household_valve').fetchone()[0]
+
+    def _local_hashes(self, unique_ids):
+        hashes = {}
+        unique_ids = list(unique_ids)
+        # 分批查询，避免超过SQLite参数个数限制
+        for i in range(0, len(unique_ids), 500):
+            batch = unique_ids[i:i + 500]
+            placeholders = ','.join('?' * len(batch))
+            hashes.update(self.conn.execute(
+                f'SELECT unique_id, content_hash FROM household_valve WHERE unique_id IN ({placeholders})', batch
+            ).fetchall())
+        return hashes
+
+    def _apply_changes(self, valves, local_hashes, stats):
+        changed = []
+        for valve in valves:
+            unique_id = _text(valve.get('uniqueId'))
+            local_hash = local_hashes.get(unique_id)
+            if local_hash is None:
+                stats['inserted'] += 1
+            elif local_hash != _content_hash(_dump(valve)):
+                stats['updated'] += 1
+            else:
+                stats['unchanged'] += 1
+                continue
+            changed.append(valve)
+        if changed:
+            self.write_valves(changed)
+
+    async def _sync_delta(self, client, params, high_water, sort_name, sort_type, stats):
+        """
+        按创建日期倒序翻页，取到早于高水位的记录后停止
+
+        :return: 服务端返回的户阀总数，查询失败时抛出RuntimeError
+        """
+        page_index = 1
+        fetched = 0
+        total = 0
+        while True:
+            page_params = params.model_copy(update={
+                'page_index': page_index,
+                'sort_name': sort_name,
+                'sort_type': sort_type
+            })
+            page_result = await client.find_household_valve(page_params)
+            if not (page_result and page_result.get('resultCode') == 0):
+                message = page_result.get('message', '未知错误') if page_result else 'API调用失败'
+                raise RuntimeError(f"第{page_index}页查询失败：{message}")
+
+            data = page_result.get('data', {})
+            valves = data.get('data') or []
+            total = data.get('total', 0)
+            stats['pages'] += 1
+            stats['fetched'] += len(valves)
+            fetched += len(valves)
+
+            # 与高水位同一时刻的记录也要比对，因此只跳过严格早于高水位的记录
+            newer = [valve for valve in valves if (valve.get('createDate') or '') >= high_water]
+            self._apply_changes(newer, self._local_hashes(_text(valve.get('uniqueId')) for valve in newer), stats)
+
+            if len(newer) < len(valves) or not valves or fetched >= total:
+                return total
+            page_index += 1
+
+    async def _sync_checksum(self, client, params, stats):
+        """全量比对内容hash，写入新增和变更的记录，删除服务端已不存在的记录"""
+        local_hashes = dict(self.conn.execute('SELECT unique_id, content_hash FROM household_valve'))
+        seen = set()
+        batch = []
+        async for valve in client.iter_household_valves(params.model_copy(update={'page_index': 1})):
+            stats['fetched'] += 1
+            seen.add(_text(valve.get('uniqueId')))
+            batch.append(valve)
+            if len(batch) >= params.page_size:
+                self._apply_changes(batch, local_hashes, stats)
+                batch = []
+        self._apply_changes(batch, local_hashes, stats)
+
+        # 完整扫描成功后才删除，扫描中途失败会抛出异常而不会误删
+        deleted = [unique_id for unique_id in local_hashes if unique_id not in seen]
+        for i in range(0, len(deleted), 500):
+            batch_ids = deleted[i:i + 500]
+            placeholders = ','.join('?' * len(batch_ids))
+            self.conn.execute(f'DELETE FROM household_valve WHERE unique_id IN ({placeholders})', batch_ids)
+        stats['deleted'] = len(deleted)
+        self._set_meta('last_checksum_at', time.time())
+
+    async def sync(self, client: HouseValveClient, params: Optional[FindHouseholdValveParams] = None,
+                   sort_name='createDate', sort_type='desc', checksum_interval=7 * 24 * 3600,
+                   force_checksum=False):
+        """
+        增量同步户阀档案
+
+        平时按createDate倒序只拉取高水位之后的记录，按内容hash判断新增和变更；
+        距上次完整校验超过checksum_interval、本地记录数与服务端total不一致或尚无高水位时，
+        执行一次全量hash比对以同步变更和删除。快照的范围应与params的查询范围一致。
+
+        :param client: HouseValveClient实例
+        :param params: 户阀查询参数模型，默认为None表示全部户阀
+        :param sort_name: 创建日期的排序字段名，默认为createDate
+        :param sort_type: 倒序排序类型，默认为desc
+        :param checksum_interval: 完整校验的间隔秒数，默认为7天
+        :param force_checksum: 是否强制执行完整校验，默认为False
+        :return: 同步统计字典，包含模式、拉取/新增/变更/未变/删除记录数、页数和耗时
+        """
+        if params is None:
+            params = FindHouseholdValveParams()
+
+        started = time.monotonic()
+        stats = {'mode': 'delta', 'fetched': 0, 'pages': 0, 'inserted': 0, 'updated': 0,
+                 'unchanged': 0, 'deleted': 0, 'elapsed': 0.0}
+
+        high_water = self.get_meta('high_water_create_date')
+        last_checksum = float(self.get_meta('last_checksum_at') or 0)
+
+        need_checksum = force_checksum or high_water is None or time.time() - last_checksum >= checksum_interval
+        if not need_checksum:
+            total = await self._sync_delta(client, params, high_water, sort_name, sort_type, stats)
+            # 数量对不上说明有删除或高水位之前的新增，转为完整校验
+            need_checksum = self.valve_count() != total
+
+        if need_checksum:
+            stats['mode'] = 'checksum' if stats['pages'] == 0 else 'delta+checksum'
+            await self._sync_checksum(client, params, stats)
+
+        self._set_meta('base_url', client.base_url)
+        self._set_meta('synced_at', time.strftime('%Y-%m-%d %H:%M:%S'))
+        self._set_meta('high_water_create_date', self._max_create_date())
+        self.conn.commit()
+
+        stats['elapsed'] = time.monotonic() - started
+        return stats
+
+    def _query_valves(self, column, value):
+        rows = self.conn.execute(
+            f'SELECT data FROM household_valve WHERE {column} = ?', (_text(value),)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def valves_by_serial_no(self, serial_no):
+        """
+        :param serial_no: 户阀编号
+        :return: 户阀信息字典列表
+        """
+        return self._query_valves('serial_no', serial_no)
+
+    def valves_by_address(self, address):
+        """
+        :param address: 户阀地址，如 广安苑小区-1#-一单元-2302
+        :return: 户阀信息字典列表
+        """
+        return self._query_valves('address', address)
+
+    def valves_by_collector(self, collector_id):
+        """
+        :param collector_id: 采集器ID（collectorId）
+        :return: 户阀信息字典列表
+        """
+        return self._query_valves('collector_id', collector_id)
+
+    def valves_by_net_equ(self, net_equ_id):
+        """
+        :param net_equ_id: 网络设备ID（netEquId）
+        :return: 户阀信息字典列表
+        """
+        return self._query_valves('net_equ_id', net_equ_id)
+
+    def net_equipment_by_serial_no(self, serial_no):
+        """
+        :param serial_no: 采集器编号
+        :return: 采集器信息字典，不存在时返回None
+        """
+        row = self.conn.execute('SELECT data FROM net_equipment WHERE serial_no = ?', (_text(serial_no),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def meter_status_by_serial_no(self, serial_no):
+        """
+        :param serial_no: 户阀编号
+        :return: 抄通状态信息字典，不存在时返回None
+        """
+        row = self.conn.execute('SELECT data FROM meter_status WHERE serial_no = ?', (_text(serial_no),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_valves(self):
+        """
+        :return: 生成器，逐条返回快照中的户阀信息字典
+        """
+        for row in self.conn.execute('SELECT data FROM household_valve'):
+            yield json.loads(row[0])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='导出或增量同步户阀档案本地快照')
+    parser.add_argument('output', help='快照SQLite文件路径')
+    parser.add_argument('--base-url', default='http://112.53.73.250:2288', help='接口地址')
+    parser.add_argument('--token', required=True, help='认证token')
+    parser.add_argument('--page-size', type=int, default=None,
+                        help='户阀每页数量，默认为5000；使用--page-tuning时不指定则自动调整')
+    parser.add_argument('--page-tuning', default=None,
+                        help='每页大小调整记录文件（SQLite），指定时按接口自动调整每页大小并保存供下次使用')
+    parser.add_argument('--net-equipment', action='store_true', help='同时导出采集器')
+    parser.add_argument('--meter-status', action='store_true', help='同时导出抄通状态')
+    parser.add_argument('--sync', action='store_true', help='对已有快照做增量同步，而不是全量导出')
+    parser.add_argument('--checksum', action='store_true', help='增量同步时强制执行完整校验')
+    parser.add_argument('--crawl-concurrency', type=int, default=None,
+                        help='全量导出时按组织树分区并行扫描的最大分区并发数，默认顺序翻页')
+    args = parser.parse_args()
+
+    params = FindHouseholdValveParams(**({'page_size': args.page_size} if args.page_size else {}))
+    page_tuner = PageSizeTuner(args.page_tuning) if args.page_tuning else None
+    try:
+        async with HouseValveClient(base_url=args.base_url, token=args.token, page_tuner=page_tuner) as client:
+            with RegistrySnapshot(args.output) as snapshot:
+                if args.sync:
+                    stats = await snapshot.sync(
+                        client,
+                        params,
+                        force_checksum=args.checksum
+                    )
+                    print(f"同步完成（{stats['mode']}）：拉取 {stats['fetched']} 条，新增 {stats['inserted']} 条，"
+                          f"变更 {stats['updated']} 条，删除 {stats['deleted']} 条，耗时 {stats['elapsed']:.1f} 秒")
+                    return 0
+
+                stats = await snapshot.export(
+                    client,
+                    params,
+                    include_net_equipment=args.net_equipment,
+                    include_meter_status=args.meter_status,
+                    crawl_concurrency=args.crawl_concurrency
+                )
+    finally:
+        if page_tuner is not None:
+            page_tuner.close()
+
+    print(f"导出完成：户阀 {stats['valves']} 条，采集器 {stats['net_equipment']} 条，"
+          f"抄通状态 {stats['meter_status']} 条，耗时 {stats['elapsed']:.1f} 秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from adaptive_limiter import AdaptiveLimiter
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+
+
+def test_errors_from_one_batch_of_requests_halve_the_limit_once():
+    limiter = AdaptiveLimiter(initial_limit=16, min_limit=2)
+    started = time.monotonic()
+    for _ in range(8):
+        limiter.record(started, False)
+    assert limiter.limit == 8
+    assert (limiter.errors, limiter.decreases) == (8, 1)
+
+    for _ in range(3):
+        limiter.record(time.monotonic(), False)
+    assert limiter.limit == 2
+
+
+def test_limit_grows_after_a_window_of_fast_requests():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=5, window=5)
+    for _ in range(15):
+        limiter.record(time.monotonic(), True)
+    assert limiter.limit == 5
+    assert limiter.increases == 1
+
+
+def test_client_backs_off_on_5xx_and_recovers():
+    server = MockValveServer(valve_count=50, latency=0.01)
+    server.add_fault('findHouseholdValve', status=503, times=8)
+    limiter = AdaptiveLimiter(initial_limit=16, min_limit=1, max_limit=16, window=10)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), limiter=limiter) as client:
+            async def find(valve):
+                try:
+                    return await client.find_household_valve(FindHouseholdValveParams(serial_no=valve['serialNo']))
+                except Exception:
+                    return None
+
+            failed = await asyncio.gather(*[find(valve) for valve in server.valves[:8]])
+            after_errors = limiter.limit
+            for _ in range(3):
+                await asyncio.gather(*[find(valve) for valve in server.valves[:10]])
+            return failed, after_errors
+
+    failed, after_errors = asyncio.run(run())
+    assert failed == [None] * 8
+    assert limiter.errors == 8
+    assert after_errors == 8
+    assert server.max_in_flight <= 16
+    assert limiter.limit > after_errors
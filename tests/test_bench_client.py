@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from bench_client import bench_scan
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_failed_scan_is_counted_as_error(stream):
+    server = MockValveServer(valve_count=300, latency=0, error_rate=0.3, seed=1)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await bench_scan(client, 50, stream)
+
+    result = asyncio.run(run())
+    assert result['errors'] == 1
+    assert result['ops'] < 300
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_scan_counts_every_record(stream):
+    server = MockValveServer(valve_count=300, latency=0)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await bench_scan(client, 50, stream)
+
+    result = asyncio.run(run())
+    assert result['errors'] == 0
+    assert result['ops'] == 300
+    assert result['scenario'] == ('full_scan_stream' if stream else 'full_scan')
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from bulk_renumber import group_conflicting_rows, read_renumber_csv, renumber_valves
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+
+def _row(query_serial_no, query_address, new_serial_no):
+    return {'query_serial_no': query_serial_no, 'query_address': query_address, 'new_serial_no': new_serial_no}
+
+
+def _renumber(server, rows, **kwargs):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await renumber_valves(client, rows, max_concurrency=4, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_rows_sharing_a_serial_no_are_grouped_in_input_order():
+    rows = [_row('1', 'a', '2'), _row('5', 'e', '6'), _row('2', 'b', '3'), _row('7', 'f', '1')]
+    groups = group_conflicting_rows(rows)
+    assert sorted([i for i, _ in group] for group in groups) == [[0, 2, 3], [1]]
+
+
+def test_chained_renumber_runs_in_order():
+    server = MockValveServer(valve_count=10, latency=0)
+    first, second = server.valves[0], server.valves[1]
+    old_first, old_second = first['serialNo'], second['serialNo']
+    # 第一行腾出的阀号由第二行使用，必须按输入顺序执行
+    rows = [
+        _row(old_second, second['address'], '88000001'),
+        _row(old_first, first['address'], old_second)
+    ]
+    rows += [_row(valve['serialNo'], valve['address'], str(int(valve['serialNo']) + 60000000))
+             for valve in server.valves[2:]]
+
+    results = _renumber(server, rows)
+    assert all(result['success'] for result in results), [result['message'] for result in results]
+    assert (first['serialNo'], second['serialNo']) == (old_second, '88000001')
+    assert server.calls['updateHouseholdValve'] == 10
+
+
+def test_dry_run_reports_changes_without_updating():
+    server = MockValveServer(valve_count=3, latency=0)
+    valve = server.valves[0]
+
+    results = _renumber(server, [_row(valve['serialNo'], valve['address'], '88000001')], dry_run=True)
+    assert results[0]['success']
+    assert results[0]['changes'] == {'serial_no': (valve['serialNo'], '88000001')}
+    assert 'updateHouseholdValve' not in server.calls
+    assert valve['serialNo'] != '88000001'
+
+
+def test_csv_without_required_columns_is_rejected(tmp_path):
+    path = tmp_path / 'rows.csv'
+    path.write_text('query_serial_no,new_serial_no\n1,2\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='query_address'):
+        read_renumber_csv(str(path))
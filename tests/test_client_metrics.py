@@ -0,0 +1,41 @@
+import asyncio
+from client_metrics import EndpointStats
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+
+
+def test_requests_are_counted_by_endpoint_and_status():
+    server = MockValveServer(valve_count=10, latency=0)
+    server.add_fault('findHouseholdValve', status=503, times=2)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            for valve in server.valves[:7]:
+                try:
+                    await client.find_household_valve(FindHouseholdValveParams(serial_no=valve['serialNo']))
+                except Exception:
+                    pass
+            return client.metrics
+
+    metrics = asyncio.run(run())
+    stats = metrics.snapshot()['findHouseholdValve']
+    assert stats['requests'] == 7
+    assert stats['statuses'] == {'503': 2, '200': 5}
+    assert stats['in_flight'] == 0
+    assert stats['latency']['count'] == 7
+    assert stats['request_bytes'] > 0 and stats['response_bytes'] > 0
+
+    text = metrics.to_prometheus()
+    assert 'house_valve_client_requests_total{endpoint="findHouseholdValve",status="503"} 2' in text
+    assert 'house_valve_client_request_duration_seconds_count{endpoint="findHouseholdValve"} 7' in text
+    assert 'house_valve_client_request_duration_seconds_bucket{endpoint="findHouseholdValve",le="+Inf"} 7' in text
+
+
+def test_quantile_interpolates_within_bucket():
+    stats = EndpointStats((0.1, 1.0))
+    for elapsed in (0.05, 0.05, 0.5, 0.5):
+        stats.observe(elapsed)
+    assert stats.quantile(0.5) == 0.1
+    assert 0.1 < stats.quantile(0.95) <= 0.5
+    assert EndpointStats((0.1,)).quantile(0.5) is None
@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+from client_metrics import ClientMetrics
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams, FindNetEquipmentParams
+
+
+def test_endpoint_timeouts_override_the_client_timeout():
+    server = MockValveServer(valve_count=5, net_equipment_count=5, latency=0)
+    timeouts = {}
+    metrics = ClientMetrics(on_request=lambda endpoint, request: timeouts.setdefault(
+        endpoint, request.extensions['timeout']['read']
+    ))
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), timeout=2.0, metrics=metrics,
+                                    endpoint_timeouts={'findNetEqu': 7.5}) as client:
+            await client.find_household_valve(FindHouseholdValveParams(serial_no='24000000'))
+            await client.find_net_equipment(FindNetEquipmentParams(serial_no='25000000'))
+            await client.find_household_meter_current_data_batch(['24000000'])
+
+    asyncio.run(run())
+    assert timeouts == {
+        'findHouseholdValve': 30.0,
+        'findNetEqu': 7.5,
+        'findHouseholdMeterCurrentDataAdvanced': 30.0
+    }
+
+
+def test_shared_transport_outlives_each_client():
+    server = MockValveServer(valve_count=5, latency=0)
+    closed = []
+
+    class TrackedTransport(httpx.MockTransport):
+        async def aclose(self):
+            closed.append(True)
+
+    transport = TrackedTransport(server.handler)
+
+    async def run():
+        results = []
+        for _ in range(2):
+            async with HouseValveClient('http://mock', 'token', transport=transport) as client:
+                result = await client.find_household_valve(FindHouseholdValveParams(serial_no='24000001'))
+                results.append(len(result['data']['data']))
+        return results
+
+    assert asyncio.run(run()) == [1, 1]
+    assert closed == []
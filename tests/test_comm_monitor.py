@@ -0,0 +1,41 @@
+import asyncio
+from comm_monitor import CommStatusMonitor
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+
+def test_monitor_emits_only_transitions():
+    server = MockValveServer(valve_count=300, latency=0, seed=1)
+    serial_nos = [valve['serialNo'] for valve in server.valves]
+    events = []
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            monitor = CommStatusMonitor(client, serial_nos, interval=0.05, batch_size=100, on_transition=events.append)
+            first = await monitor.run_cycle()
+            server.comm_status[serial_nos[0]] = '离线' if server.comm_status[serial_nos[0]] == '正常' else '正常'
+            await monitor.run(cycles=2)
+            return first, list(monitor.history)
+
+    first, cycles = asyncio.run(run())
+    assert first['transitions'] == 0
+    assert first['unknown'] == 0 and first['requests'] > 0
+    assert [event['serial_no'] for event in events] == [serial_nos[0]]
+    assert [cycle['transitions'] for cycle in cycles] == [0, 1, 0]
+
+
+def test_failed_batches_do_not_change_state():
+    server = MockValveServer(valve_count=100, latency=0)
+    server.add_fault('findHouseholdMeterCurrentDataAdvanced', status=500)
+    events = []
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            monitor = CommStatusMonitor(client, [valve['serialNo'] for valve in server.valves], interval=0.01,
+                                        batch_size=50, on_transition=events.append, emit_initial=True)
+            return await monitor.run_cycle()
+
+    stats = asyncio.run(run())
+    assert stats['failed_batches'] == 2
+    assert stats['unknown'] == 100
+    assert events == []
@@ -0,0 +1,48 @@
+import asyncio
+import time
+from guid_cache import GuidCache
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+
+def _push(server, cache, serial_nos):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), guid_cache=cache) as client:
+            return await client.update_control_by_serial_no(serial_nos, resolver='lookup', chunk_size=None)
+
+    return asyncio.run(run())
+
+
+def test_second_push_reads_guids_from_cache(tmp_path):
+    server = MockValveServer(valve_count=0, net_equipment_count=10, latency=0)
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment[:5]]
+
+    with GuidCache(str(tmp_path / 'guid.db')) as cache:
+        first = _push(server, cache, serial_nos)
+        assert first['success'], first['message']
+        assert first['cache'] == {'hits': 0, 'misses': 5}
+        assert first['resolver'] == 'lookup'
+        lookups = server.calls['findNetEqu']
+
+        second = _push(server, cache, serial_nos + ['29999999'])
+        assert second['cache'] == {'hits': 5, 'misses': 1}
+        assert server.calls['findNetEqu'] == lookups + 1
+        assert [device['cached'] for device in second['device_info'][:5]] == [True] * 5
+        assert [device['guid'] for device in second['device_info'][:5]] == [
+            equipment['guid'] for equipment in server.net_equipment[:5]
+        ]
+
+        third = _push(server, cache, serial_nos)
+        assert third['resolver'] == 'cache'
+        assert server.calls['findNetEqu'] == lookups + 1
+        assert (cache.hits, cache.misses) == (10, 6)
+
+
+def test_expired_guid_is_a_miss(tmp_path):
+    with GuidCache(str(tmp_path / 'guid.db'), ttl=0.01) as cache:
+        cache.set('http://mock', '25000000', 'NEQ-000000')
+        assert cache.get('http://mock', '25000000') == 'NEQ-000000'
+        assert cache.get('http://other', '25000000') is None
+        time.sleep(0.02)
+        assert cache.get('http://mock', '25000000') is None
+        assert (cache.hits, cache.misses) == (1, 2)
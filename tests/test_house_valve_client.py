@@ -0,0 +1,98 @@
+import asyncio
+import gc
+import httpx
+import pytest
+from adaptive_limiter import AdaptiveLimiter
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+
+
+def test_requests_inside_streamed_scan_do_not_wait_for_the_scan():
+    server = MockValveServer(valve_count=500, latency=0)
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), limiter=limiter) as client:
+            found = 0
+            params = FindHouseholdValveParams(page_size=100)
+            async for valve in client.iter_household_valves(params, stream=True):
+                if valve['uniqueId'] % 100 == 1:
+                    result = await asyncio.wait_for(
+                        client.find_household_valve(FindHouseholdValveParams(serial_no=valve['serialNo'])), 5
+                    )
+                    found += len(result['data']['data'])
+            return found
+
+    assert asyncio.run(run()) == 5
+
+
+def _stream_all(server, stream, **client_kwargs):
+    async def run():
+        async with HouseValveClient(**{**server.client_kwargs(), **client_kwargs}) as client:
+            params = FindHouseholdValveParams(page_size=20)
+            return [valve async for valve in client.iter_household_valves(params, stream=stream)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_page_5xx_raises_runtime_error(stream):
+    server = MockValveServer(valve_count=50, latency=0)
+    server.add_fault('findHouseholdValve', status=500, when=lambda request: request.url.params['pageIndex'] == '2')
+    with pytest.raises(RuntimeError, match='第2页查询失败'):
+        _stream_all(server, stream)
+
+
+def test_malformed_streamed_page_raises_runtime_error():
+    server = MockValveServer(valve_count=50, latency=0)
+
+    def handler(request):
+        return httpx.Response(200, content=b'{"resultCode": 0, "data": {"total": 50, "data": [{"a": 1}, {')
+
+    with pytest.raises(RuntimeError, match='第1页查询失败'):
+        _stream_all(server, True, transport=httpx.MockTransport(handler))
+
+
+def test_renumber_rerun_reports_applied_rows_as_skipped():
+    server = MockValveServer(valve_count=50, latency=0)
+    valve = server.valves[0]
+    old_serial_no, address, new_serial_no = valve['serialNo'], valve['address'], '88000001'
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            first = await client.update_valve_serial_no(old_serial_no, address, new_serial_no)
+            again = await client.update_valve_serial_no(old_serial_no, address, new_serial_no)
+            missing = await client.update_valve_serial_no('87000000', address, '87000001')
+            return first, again, missing
+
+    first, again, missing = asyncio.run(run())
+    assert first['success'] and not first['skipped'], first['message']
+    assert again['success'] and again['skipped'], again['message']
+    assert again['update_result'] is None
+    assert not missing['success']
+    assert server.calls.get('updateHouseholdValve') == 1
+
+
+def test_single_flight_error_is_retrieved_when_all_waiters_cancel():
+    server = MockValveServer(valve_count=10, latency=0.05)
+    server.add_fault('findHouseholdValve', status=500)
+    unhandled = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda _, context: unhandled.append(context))
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            params = FindHouseholdValveParams(serial_no='24000000')
+            waiters = [asyncio.ensure_future(client.find_household_valve(params)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            # 等共享请求以500结束
+            await asyncio.sleep(0.1)
+            gc.collect()
+            return client.coalesced_requests
+
+    assert asyncio.run(run()) == 1
+    assert unhandled == []
@@ -0,0 +1,63 @@
+import json
+import pytest
+from json_stream import PageStreamDecoder
+
+
+BODY = json.dumps({
+    'resultCode': 0,
+    'message': '成功',
+    'data': {
+        'total': 12345,
+        'ratio': -0.125,
+        'big': 1.5e10,
+        'data': [
+            {'uniqueId': 1, 'serialNo': '24000001', 'address': '小区1-1#-一单元-101', 'flow': 12.5},
+            {'uniqueId': 2, 'serialNo': '24000002', 'address': None, 'flow': 0}
+        ],
+        'pageIndex': 1
+    },
+    'extra': 12.5,
+    'enabled': True,
+    'empty': None
+}, ensure_ascii=False).encode('utf-8')
+
+
+def _decode(chunks):
+    decoder = PageStreamDecoder()
+    records = []
+    for i, chunk in enumerate(chunks):
+        records.extend(decoder.feed(chunk, eof=i == len(chunks) - 1))
+    return decoder, records
+
+
+def _expected():
+    expected = json.loads(BODY)
+    records = expected['data'].pop('data')
+    return expected, records
+
+
+def test_decode_byte_by_byte():
+    decoder, records = _decode([BODY[i:i + 1] for i in range(len(BODY))])
+    meta, expected_records = _expected()
+    assert records == expected_records
+    assert decoder.meta == meta
+
+
+@pytest.mark.parametrize('split', range(1, len(BODY)))
+def test_decode_split_at_every_position(split):
+    decoder, records = _decode([BODY[:split], BODY[split:]])
+    meta, expected_records = _expected()
+    assert records == expected_records
+    assert decoder.meta == meta
+
+
+def test_number_split_before_fraction_and_exponent():
+    for body in (b'{"resultCode":0,"extra":12.5}', b'{"resultCode":0,"extra":1e3}'):
+        for split in range(1, len(body)):
+            decoder, _ = _decode([body[:split], body[split:]])
+            assert decoder.meta == json.loads(body)
+
+
+def test_truncated_response_raises():
+    with pytest.raises(ValueError):
+        _decode([BODY[:len(BODY) // 2]])
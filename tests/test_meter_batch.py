@@ -0,0 +1,45 @@
+import asyncio
+from urllib.parse import quote
+from client_metrics import ClientMetrics
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+METER_ENDPOINT = 'findHouseholdMeterCurrentDataAdvanced'
+
+
+def _query(server, serial_nos, metrics=None, **kwargs):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), metrics=metrics) as client:
+            return await client.find_household_meter_current_data_batch(serial_nos, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_serial_nos_are_split_by_condition_length():
+    server = MockValveServer(valve_count=300, latency=0)
+    conditions = []
+    metrics = ClientMetrics(on_request=lambda endpoint, request: conditions.append(
+        request.url.params['advanceCondition']
+    ))
+    serial_nos = [valve['serialNo'] for valve in server.valves] + ['29999998', '29999999']
+
+    result = _query(server, serial_nos, metrics, max_condition_length=600)
+    assert result['success'], result['message']
+    assert len(result['records']) == 300
+    assert result['missing'] == ['29999998', '29999999']
+    assert result['failed'] == []
+    assert len(conditions) == server.calls[METER_ENDPOINT] > 1
+    assert all(len(quote(condition)) <= 600 for condition in conditions)
+
+
+def test_failed_chunk_does_not_hide_other_chunks():
+    server = MockValveServer(valve_count=300, latency=0)
+    server.add_fault(METER_ENDPOINT, when=lambda request: '24000150' in request.url.params['advanceCondition'])
+    serial_nos = [valve['serialNo'] for valve in server.valves]
+
+    result = _query(server, serial_nos, max_condition_length=600, use_in=True)
+    assert not result['success']
+    assert '24000150' in result['failed']
+    assert 0 < len(result['failed']) < 300
+    assert len(result['records']) + len(result['failed']) == 300
+    assert result['missing'] == []
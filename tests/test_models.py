@@ -0,0 +1,32 @@
+import pytest
+from bench_response_parsing import build_page
+from models import HouseholdValve, NetEquipment, TrustedRecord, parse_response
+
+
+def test_trusted_records_read_fields_by_model_name():
+    response = parse_response(build_page(10), HouseholdValve, trusted=True)
+    assert response.result_code == 0
+    assert response.data.total == 10
+
+    records = response.data.data
+    assert len(records) == 10
+    assert isinstance(records[3], TrustedRecord)
+    assert records[3].serial_no == '24000003'
+    assert records[3].collector_id == 3
+    assert records[3].memo is None
+    assert [record.unique_id for record in records[2:5]] == [2, 3, 4]
+    assert records[-1].model_dump()['serialNo'] == '24000009'
+
+
+def test_trusted_record_rejects_unknown_fields():
+    record = parse_response(build_page(1), NetEquipment, trusted=True).data.data[0]
+    assert record.serial_no == '24000000'
+    with pytest.raises(AttributeError):
+        record.address
+
+
+def test_validated_and_trusted_records_agree():
+    content = build_page(20)
+    validated = parse_response(content, HouseholdValve).data.data
+    trusted = parse_response(content, HouseholdValve, trusted=True).data.data
+    assert [(v.serial_no, v.address) for v in validated] == [(t.serial_no, t.address) for t in trusted]
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from page_tuner import PageSizeTuner
+
+
+def _scan(server, tuner, stream=False):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), page_tuner=tuner) as client:
+            return [valve['uniqueId'] async for valve in client.iter_household_valves(stream=stream)]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_tuner_retries_smaller_page_on_5xx(stream):
+    server = MockValveServer(valve_count=3000, latency=0)
+    server.add_fault('findHouseholdValve', status=503, times=1,
+                     when=lambda request: request.url.params.get('pageIndex') != '1')
+    tuner = PageSizeTuner(':memory:', min_size=100, initial_size=800)
+
+    unique_ids = _scan(server, tuner, stream)
+
+    assert unique_ids == [valve['uniqueId'] for valve in server.valves]
+    stats = tuner.stats()['http://mock']['findHouseholdValve']
+    assert stats['errors'] == 1
+    assert stats['decreases'] >= 1
+
+
+def test_tuned_page_size_is_persisted(tmp_path):
+    path = str(tmp_path / 'tuning.db')
+    server = MockValveServer(valve_count=5000, latency=0.01, record_latency=0.0001)
+    with PageSizeTuner(path, target_page_time=0.2, initial_size=100) as tuner:
+        assert len(_scan(server, tuner)) == 5000
+        tuned = tuner.page_size('http://mock', 'findHouseholdValve')
+    assert tuned > 100
+
+    with PageSizeTuner(path, target_page_time=0.2, initial_size=100) as tuner:
+        assert tuner.page_size('http://mock', 'findHouseholdValve') == tuned
+
+
+def test_page_size_keeps_offsets_aligned():
+    tuner = PageSizeTuner(':memory:', min_size=100, max_size=1600, initial_size=1600)
+    assert tuner.page_size('http://mock', 'findHouseholdValve', offset=0) == 1600
+    assert tuner.page_size('http://mock', 'findHouseholdValve', offset=800) == 800
+    assert tuner.page_size('http://mock', 'findHouseholdValve', offset=300) == 100
+    assert tuner.page_size('http://mock', 'findHouseholdValve', offset=150) is None
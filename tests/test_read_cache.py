@@ -0,0 +1,70 @@
+import asyncio
+import time
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+from read_cache import ReadCache
+
+
+def test_cached_lookup_is_invalidated_by_renumber():
+    server = MockValveServer(valve_count=20, latency=0)
+    valve = server.valves[0]
+    old_serial_no, address, new_serial_no = valve['serialNo'], valve['address'], '88000001'
+    cache = ReadCache()
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), read_cache=cache) as client:
+            async def find(serial_no):
+                result = await client.find_household_valve(FindHouseholdValveParams(serial_no=serial_no))
+                return result['data']['data']
+
+            assert len(await find(old_serial_no)) == 1
+            assert await find(new_serial_no) == []
+            # 两次查询都命中缓存，不发请求
+            assert len(await find(old_serial_no)) == 1
+            assert await find(new_serial_no) == []
+            lookups = server.calls['findHouseholdValve']
+
+            result = await client.update_valve_serial_no(old_serial_no, address, new_serial_no)
+            assert result['success'], result['message']
+            return lookups, await find(old_serial_no), await find(new_serial_no)
+
+    lookups, by_old, by_new = asyncio.run(run())
+    assert lookups == 2
+    assert by_old == []
+    assert [valve['address'] for valve in by_new] == [address]
+    assert cache.stats()['invalidations'] > 0
+
+
+def test_cached_meter_status_of_old_serial_is_invalidated_by_renumber():
+    server = MockValveServer(valve_count=20, latency=0)
+    valve = server.valves[0]
+    old_serial_no, address, new_serial_no = valve['serialNo'], valve['address'], '88000001'
+    cache = ReadCache()
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), read_cache=cache) as client:
+            async def meter_status(serial_no):
+                result = await client.find_household_meter_current_data_batch([serial_no])
+                return result['records'], result['missing']
+
+            assert old_serial_no in (await meter_status(old_serial_no))[0]
+            assert old_serial_no in (await meter_status(old_serial_no))[0]
+            lookups = server.calls['findHouseholdMeterCurrentDataAdvanced']
+
+            result = await client.update_valve_serial_no(old_serial_no, address, new_serial_no)
+            assert result['success'], result['message']
+            return lookups, await meter_status(old_serial_no)
+
+    lookups, (records, missing) = asyncio.run(run())
+    assert lookups == 1
+    assert records == {}
+    assert missing == [old_serial_no]
+
+
+def test_cache_expires_after_ttl():
+    cache = ReadCache(ttl=0.01)
+    cache.set('key', {'resultCode': 0}, {'24000000'}, cache.generation)
+    assert cache.get('key') == (True, {'resultCode': 0})
+    time.sleep(0.02)
+    assert cache.get('key') == (False, None)
@@ -0,0 +1,59 @@
+import asyncio
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+from registry_crawl import RegistryCrawler
+
+
+def test_crawl_returns_every_valve_once():
+    server = MockValveServer(valve_count=3000, latency=0)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            crawler = RegistryCrawler(client, FindHouseholdValveParams(page_size=100), split_threshold=200)
+            return [valve['uniqueId'] async for valve in crawler.iter_valves()], crawler.stats()
+
+    unique_ids, stats = asyncio.run(run())
+    assert sorted(unique_ids) == sorted(valve['uniqueId'] for valve in server.valves)
+    assert stats['partitions'] > 1
+    assert stats['missing'] == 0
+
+
+def test_crawl_early_close_does_not_hang():
+    server = MockValveServer(valve_count=3000, latency=0)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            crawler = RegistryCrawler(client, FindHouseholdValveParams(page_size=100), split_threshold=200)
+            valves = crawler.iter_valves()
+            count = 0
+            async for _ in valves:
+                count += 1
+                if count == 5:
+                    break
+            # 分区任务写满队列后阻塞在put上，关闭时必须能取消
+            await asyncio.wait_for(valves.aclose(), 5)
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            return count, pending
+
+    count, pending = asyncio.run(run())
+    assert count == 5
+    assert pending == []
+
+
+def test_crawl_partition_error_is_raised():
+    server = MockValveServer(valve_count=3000, latency=0)
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            crawler = RegistryCrawler(client, FindHouseholdValveParams(page_size=100), split_threshold=200)
+            await crawler.plan()
+            server.error_rate = 1.0
+            try:
+                async for _ in crawler.iter_valves():
+                    pass
+            except Exception as e:
+                return e
+
+    error = asyncio.run(asyncio.wait_for(run(), 10))
+    assert error is not None
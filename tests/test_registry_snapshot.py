@@ -0,0 +1,95 @@
+import asyncio
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import FindHouseholdValveParams
+from registry_snapshot import RegistrySnapshot
+
+
+def _sync(server, snapshot, **kwargs):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await snapshot.sync(client, **kwargs)
+
+    return asyncio.run(run())
+
+
+def _export(server, snapshot, **kwargs):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await snapshot.export(client, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_export_answers_lookups_offline(tmp_path):
+    server = MockValveServer(valve_count=250, net_equipment_count=10, latency=0)
+    params = FindHouseholdValveParams(page_size=100)
+    with RegistrySnapshot(str(tmp_path / 'snapshot.db')) as snapshot:
+        stats = _export(server, snapshot, params=params, include_net_equipment=True, include_meter_status=True,
+                        meter_batch_size=100)
+        assert (stats['valves'], stats['net_equipment'], stats['meter_status']) == (250, 10, 250)
+        calls = dict(server.calls)
+
+        valve = server.valves[42]
+        assert snapshot.valves_by_serial_no(valve['serialNo']) == [valve]
+        assert snapshot.valves_by_address(valve['address']) == [valve]
+        assert len(snapshot.valves_by_collector(valve['collectorId'])) == 25
+        assert snapshot.net_equipment_by_serial_no('25000003')['guid'] == 'NEQ-000003'
+        assert snapshot.meter_status_by_serial_no(valve['serialNo'])['commStatus'] == \
+            server.comm_status[valve['serialNo']]
+        assert snapshot.net_equipment_by_serial_no('29999999') is None
+        assert sum(1 for _ in snapshot.iter_valves()) == 250
+        assert server.calls == calls
+
+
+def test_crawled_export_matches_paged_export(tmp_path):
+    server = MockValveServer(valve_count=600, net_equipment_count=10, latency=0)
+    params = FindHouseholdValveParams(page_size=100)
+    with RegistrySnapshot(str(tmp_path / 'paged.db')) as paged, \
+            RegistrySnapshot(str(tmp_path / 'crawled.db')) as crawled:
+        _export(server, paged, params=params)
+        stats = _export(server, crawled, params=params, crawl_concurrency=4)
+        assert stats['valves'] == 600
+        unique_ids = sorted(valve['uniqueId'] for valve in paged.iter_valves())
+        assert sorted(valve['uniqueId'] for valve in crawled.iter_valves()) == unique_ids
+
+
+def test_delta_sync_inserts_and_updates_recent_records(tmp_path):
+    server = MockValveServer(valve_count=100, net_equipment_count=10, latency=0)
+    with RegistrySnapshot(str(tmp_path / 'snapshot.db')) as snapshot:
+        assert _export(server, snapshot)['valves'] == 100
+
+        newest = max(server.valves, key=lambda valve: valve['createDate'])
+        newest['memo'] = '已更换'
+        server.valves.append({
+            **newest, 'uniqueId': 1001, 'serialNo': '24999999', 'memo': None, 'createDate': '2024-10-01 00:00:00'
+        })
+
+        stats = _sync(server, snapshot)
+        assert stats['mode'] == 'delta'
+        assert (stats['inserted'], stats['updated'], stats['deleted']) == (1, 1, 0)
+        assert stats['fetched'] == 101
+        assert snapshot.valve_count() == 101
+        assert snapshot.valves_by_serial_no('24999999')[0]['uniqueId'] == 1001
+        assert snapshot.valves_by_serial_no(newest['serialNo'])[0]['memo'] == '已更换'
+        assert snapshot.get_meta('high_water_create_date') == '2024-10-01 00:00:00'
+
+
+def test_delta_sync_falls_back_to_checksum_on_delete(tmp_path):
+    server = MockValveServer(valve_count=100, net_equipment_count=10, latency=0)
+    with RegistrySnapshot(str(tmp_path / 'snapshot.db')) as snapshot:
+        _export(server, snapshot)
+        removed = server.valves.pop(0)
+        # 高水位之前的变更只有完整校验能发现
+        server.valves[0]['memo'] = '已更换'
+
+        stats = _sync(server, snapshot)
+        assert stats['mode'] == 'delta+checksum'
+        assert (stats['inserted'], stats['updated'], stats['deleted']) == (0, 1, 1)
+        assert snapshot.valve_count() == 99
+        assert snapshot.valves_by_serial_no(removed['serialNo']) == []
+        assert snapshot.valves_by_serial_no(server.valves[0]['serialNo'])[0]['memo'] == '已更换'
+
+        stats = _sync(server, snapshot)
+        assert stats['mode'] == 'delta'
+        assert (stats['inserted'], stats['updated'], stats['deleted']) == (0, 0, 0)
@@ -0,0 +1,34 @@
+import asyncio
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+
+
+def test_scan_failure_on_5xx_falls_back_to_lookup():
+    server = MockValveServer(valve_count=0, net_equipment_count=50, latency=0)
+    # 只让分页扫描失败，按编号的单个查询正常返回
+    server.add_fault('findNetEqu', status=500, when=lambda request: not request.url.params.get('serialNo'))
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment[:10]]
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await client.update_control_by_serial_no(serial_nos, resolver='scan')
+
+    result = asyncio.run(run())
+    assert result['success'], result['message']
+    assert result['resolver'] == 'lookup'
+    assert all(device['found'] for device in result['device_info'])
+
+
+def test_lookup_5xx_only_fails_that_device():
+    server = MockValveServer(valve_count=0, net_equipment_count=50, latency=0)
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment[:10]]
+    server.add_fault('findNetEqu', status=500, when=lambda request: request.url.params.get('serialNo') == serial_nos[3])
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await client.update_control_by_serial_no(serial_nos, resolver='lookup')
+
+    result = asyncio.run(run())
+    assert [device['found'] for device in result['device_info']] == [i != 3 for i in range(10)]
+    assert result['device_info'][3]['reason'] == '查询失败'
+    assert server.calls['updateControl'] == 1
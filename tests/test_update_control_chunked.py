@@ -0,0 +1,51 @@
+import asyncio
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import DeviceInfo, UpdateControlParams
+
+
+def _fault_on(serial_no):
+    return lambda request: serial_no.encode() in request.content
+
+
+def test_failed_chunk_is_retried_once():
+    server = MockValveServer(valve_count=0, net_equipment_count=10, latency=0)
+    server.add_fault('updateControl', status=500, times=1, when=_fault_on('25000004'))
+    params = UpdateControlParams(devices=[
+        DeviceInfo(serial_no=equipment['serialNo'], guid=equipment['guid']) for equipment in server.net_equipment
+    ])
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await client.update_control_chunked(params, chunk_size=3, retries=1, retry_delay=0)
+
+    result = asyncio.run(run())
+    assert result['success'], result['message']
+    assert [chunk['attempts'] for chunk in result['chunks']] == [1, 2, 1, 1]
+    assert result['failed_devices'] == []
+    assert server.calls['updateControl'] == 5
+
+
+def test_device_accounting_with_a_failed_chunk():
+    server = MockValveServer(valve_count=0, net_equipment_count=10, latency=0)
+    server.add_fault('updateControl', status=500, when=_fault_on('25000007'))
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment] + ['29999999']
+    reported = []
+
+    async def run():
+        async with HouseValveClient(**server.client_kwargs()) as client:
+            return await client.update_control_by_serial_no(
+                serial_nos, resolver='lookup', chunk_size=3, chunk_retries=0, on_device=reported.append
+            )
+
+    result = asyncio.run(run())
+    assert not result['success']
+    failed_chunk = ['25000006', '25000007', '25000008']
+    assert result['update_result']['failed_devices'] == failed_chunk
+    devices = {device['serial_no']: device for device in result['device_info']}
+    assert not devices['29999999']['found']
+    assert [serial_no for serial_no, device in devices.items() if device.get('pushed')] == [
+        serial_no for serial_no in serial_nos[:10] if serial_no not in failed_chunk
+    ]
+    # 每个设备恰好回调一次
+    assert sorted(device['serial_no'] for device in reported) == sorted(serial_nos)
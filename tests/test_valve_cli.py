@@ -0,0 +1,75 @@
+import asyncio
+import json
+import valve_cli
+from mock_server import MockValveServer
+
+
+def _run_cli(server, tmp_path, *argv):
+    output = tmp_path / 'result.ndjson'
+    code = asyncio.run(valve_cli.main(
+        ['--token', 'test', '--output', str(output), *argv], client_kwargs=server.client_kwargs()
+    ))
+    with open(output, encoding='utf-8') as f:
+        return code, [json.loads(line) for line in f]
+
+
+def _input(tmp_path, serial_nos):
+    path = tmp_path / 'serial_nos.txt'
+    path.write_text('\n'.join(serial_nos), encoding='utf-8')
+    return str(path)
+
+
+def test_update_control_outputs_one_line_per_device(tmp_path):
+    server = MockValveServer(valve_count=0, net_equipment_count=10, latency=0)
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment]
+
+    code, lines = _run_cli(server, tmp_path, 'update-control', _input(tmp_path, serial_nos + ['29999999']),
+                           '--resolver', 'lookup', '--chunk-size', '4')
+    assert code == 1
+    assert sorted(line['serial_no'] for line in lines) == sorted(serial_nos + ['29999999'])
+    assert [line['serial_no'] for line in lines if not line['found']] == ['29999999']
+    assert all(line['pushed'] for line in lines if line['found'])
+
+
+def test_update_control_all_pushed_exits_zero(tmp_path):
+    server = MockValveServer(valve_count=0, net_equipment_count=5, latency=0)
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment]
+
+    code, lines = _run_cli(server, tmp_path, 'update-control', _input(tmp_path, serial_nos), '--chunk-size', '0')
+    assert code == 0
+    assert len(lines) == 5 and all(line['pushed'] for line in lines)
+
+
+def test_single_push_5xx_reports_every_device(tmp_path):
+    server = MockValveServer(valve_count=0, net_equipment_count=5, latency=0)
+    server.add_fault('updateControl', status=503)
+    serial_nos = [equipment['serialNo'] for equipment in server.net_equipment]
+
+    code, lines = _run_cli(server, tmp_path, 'update-control', _input(tmp_path, serial_nos), '--chunk-size', '0')
+    assert code == 1
+    assert sorted(line['serial_no'] for line in lines) == serial_nos
+    assert not any(line['pushed'] for line in lines)
+
+
+
+def test_sites_run_the_command_on_every_site(tmp_path):
+    server = MockValveServer(valve_count=5, net_equipment_count=0, latency=0)
+    sites = tmp_path / 'sites.json'
+    sites.write_text(json.dumps([
+        {'name': 'north', 'base_url': 'http://north', 'token': 'a'},
+        {'name': 'south', 'base_url': 'http://south', 'token': 'b'}
+    ]), encoding='utf-8')
+    output = tmp_path / 'result.ndjson'
+    serial_nos = [valve['serialNo'] for valve in server.valves[:3]]
+
+    code = asyncio.run(valve_cli.main(
+        ['--sites', str(sites), '--output', str(output), 'find', _input(tmp_path, serial_nos)],
+        client_kwargs={'transport': server.transport()}
+    ))
+    with open(output, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert code == 0
+    assert sorted((line['site'], line['serial_no']) for line in lines) == sorted(
+        (site, serial_no) for site in ('north', 'south') for serial_no in serial_nos
+    )
+    assert all(line['found'] for line in lines)
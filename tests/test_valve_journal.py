@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+import valve_journal
+from house_valve_client import HouseValveClient
+from mock_server import MockValveServer
+from models import UpdateHouseholdValveParams
+from valve_journal import ValveJournal, list_sessions, read_journal, rollback
+
+
+def _run(server, journal, operation):
+    async def run():
+        async with HouseValveClient(**server.client_kwargs(), journal=journal) as client:
+            return await operation(client)
+
+    return asyncio.run(run())
+
+
+def test_renumber_then_rollback_restores_serial_numbers(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    server = MockValveServer(valve_count=20, latency=0)
+    originals = {valve['uniqueId']: valve['serialNo'] for valve in server.valves[:5]}
+    tasks = [(valve['serialNo'], valve['address'], str(int(valve['serialNo']) + 50000000))
+             for valve in server.valves[:5]]
+
+    with ValveJournal(path, session='renumber') as journal:
+        results = _run(server, journal, lambda client: asyncio.gather(
+            *[client.update_valve_serial_no(*task) for task in tasks]
+        ))
+    assert all(result['success'] for result in results)
+
+    entries = read_journal(path, session='renumber')
+    assert len(entries) == 5
+    assert all(entry['before'] and entry['ok'] for entry in entries)
+
+    with ValveJournal(path, session='rollback') as journal:
+        rolled_back = _run(server, journal, lambda client: rollback(client, entries))
+    assert all(result['success'] for result in rolled_back), rolled_back
+    assert {valve['uniqueId']: valve['serialNo'] for valve in server.valves[:5]} == originals
+    assert [session['session'] for session in list_sessions(path)] == ['renumber', 'rollback']
+
+
+def test_direct_serial_change_journals_pre_image(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    server = MockValveServer(valve_count=5, latency=0)
+    valve = dict(server.valves[0])
+    params = UpdateHouseholdValveParams.from_valve(valve, serial_no='77000000')
+
+    with ValveJournal(path) as journal:
+        result = _run(server, journal, lambda client: client.update_household_valve(
+            params, current_serial_no=valve['serialNo']
+        ))
+    assert result['resultCode'] == 0
+
+    entries = read_journal(path)
+    assert entries[0]['before']['serialNo'] == valve['serialNo']
+
+    with ValveJournal(path) as journal:
+        rolled_back = _run(server, journal, lambda client: rollback(client, entries))
+    assert rolled_back[0]['success'], rolled_back[0]['message']
+    assert server.valves[0]['serialNo'] == valve['serialNo']
+
+
+def test_serial_change_without_pre_image_is_refused(tmp_path):
+    path = str(tmp_path / 'journal.ndjson')
+    server = MockValveServer(valve_count=5, latency=0)
+    params = UpdateHouseholdValveParams.from_valve(server.valves[0], serial_no='77000000')
+
+    with ValveJournal(path) as journal:
+        with pytest.raises(ValueError):
+            _run(server, journal, lambda client: client.update_household_valve(params))
+    assert 'updateHouseholdValve' not in server.calls
+    assert read_journal(path) == []
+
+
+def test_concurrent_writes_share_fsyncs_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / 'journal.ndjson')
+    server = MockValveServer(valve_count=40, latency=0)
+    threads = set()
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        threads.add(threading.current_thread() is threading.main_thread())
+        time.sleep(0.01)
+        fsync(fd)
+
+    monkeypatch.setattr(valve_journal.os, 'fsync', slow_fsync)
+    tasks = [(valve['serialNo'], valve['address'], str(int(valve['serialNo']) + 50000000))
+             for valve in server.valves[:40]]
+
+    with ValveJournal(path) as journal:
+        results = _run(server, journal, lambda client: asyncio.gather(
+            *[client.update_valve_serial_no(*task) for task in tasks]
+        ))
+        # 更新期间的fsync都在线程中执行，最后一批outcome记录在关闭日志时落盘
+        fsyncs, on_loop = journal.fsyncs, set(threads)
+    assert all(result['success'] for result in results)
+    assert on_loop == {False}
+    assert fsyncs < 40
+    assert journal.synced == journal.written == 80
+    assert all(entry['ok'] for entry in read_journal(path))
@@ -0,0 +1,30 @@
+from valve_store import ValveStore
+
+
+def test_records_without_unique_id_are_all_kept():
+    store = ValveStore([
+        {'uniqueId': 1, 'serialNo': '24000001', 'address': 'A-101'},
+        {'serialNo': '24000002', 'address': 'A-102'},
+        {'serialNo': '24000003', 'address': 'A-103'},
+        {'uniqueId': None, 'serialNo': '24000004', 'address': 'A-104'}
+    ])
+
+    assert len(store) == 4
+    assert store.find('24000003', 'A-103') is not None
+    assert store.by_unique_id(None) is None
+
+
+def test_add_replaces_record_with_same_unique_id():
+    store = ValveStore([{'uniqueId': 1, 'serialNo': '24000001', 'address': 'A-101'}])
+    store.add({'uniqueId': '1', 'serialNo': '24000009', 'address': 'A-101'})
+
+    assert len(store) == 1
+    assert store.by_serial_no('24000001') == []
+    assert store.by_unique_id(1).serial_no == '24000009'
+
+
+def test_load_result_keeps_rows_without_unique_id():
+    store = ValveStore()
+    result = {'resultCode': 0, 'data': {'total': 2, 'data': [{'serialNo': '1'}, {'serialNo': '2'}]}}
+    assert store.load_result(result) == 2
+    assert len(store) == 2
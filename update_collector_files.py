@@ -1,5 +1,6 @@
 import asyncio
 from house_valve_client import HouseValveClient
+from valve_cli import normalize_serial_nos
 
 async def main():
     # 待处理的采集箱编号列表
@@ -7,6 +8,9 @@ async def main():
         25012508,25012704,25012197,25012210,25012342,25013098,25013105,25013145,25014238,25014953,25015035,25015056,25015069,25013134,25013139,25012172,25012174,25012186,25012199,25012215,25012341,25012344,25013077,25013102,25013123,25014994,25015019,25012192,25012195,25012222,25012421,25012665,25012672,25012778,25012792,25013107,25013125,25013186,25013245,25012212,25012315,25012906,25012940,25012962,25012966,25012968,25012911,25012243,25012347,25012890,25013089,25013142,25013177,24006286,24006515,24000701,24000742,24000783,24001007,24001028,24001032,24001034,24001040,24001095,24001117,24006731,13180096,131800070,25013074,25013127,25012691,25012693,25012822,25013118,25012710,25013183,25012701,25012706,25012712,25013200,25013234,25015008,25012082,25012144,25012266,25012309,25013190,25013246,25014971,25012592,25012594,25012673,25012761,25012831,24480196,25013013,25003401,24006301,24006306,24006341,24006483,24006598,24006608,24006670,24006923,25012493,25012506,25012507,25012634,25012796,25012797,25013174,25012647
     ]
     
+    # 统一转为字符串并去重（接口参数模型要求字符串编号）
+    collector_serial_numbers, _ = normalize_serial_nos(collector_serial_numbers)
+    
     try:
         # 初始化客户端
         async with HouseValveClient(
@@ -0,0 +1,388 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import unicodedata
+from house_valve_client import HouseValveClient
+from bulk_renumber import read_renumber_csv, renumber_valves
+from comm_monitor import CommStatusMonitor
+from models import FindHouseholdValveParams
+from multi_site import MultiSiteCoordinator, load_sites
+from valve_journal import ValveJournal
+
+
+DEFAULT_BASE_URL = 'http://112.53.73.250:2288'
+
+# 输入中阀号之间的分隔符：空白、中英文逗号、分号、顿号
+_SEPARATORS = re.compile(r'[\s,，;；、]+')
+# Excel导出的数字列，如 25012508.0
+_FLOAT_SERIAL = re.compile(r'^(\d+)\.0+$')
+
+
+def normalize_serial_no(value):
+    """
+    规范化单个阀号/采集器编号
+
+    统一为字符串，全角字符转半角，去掉首尾空白和引号，Excel导出的 "25012508.0" 转为 "25012508"。
+
+    :param value: 原始编号（字符串或整数）
+    :return: 规范化后的编号，为空时返回None
+    """
+    if value is None:
+        return None
+    text = unicodedata.normalize('NFKC', str(value)).strip().strip('\'"').strip()
+    match = _FLOAT_SERIAL.match(text)
+    if match:
+        text = match.group(1)
+    return text or None
+
+
+def normalize_serial_nos(values):
+    """
+    规范化并去重编号列表，保持首次出现的顺序
+
+    :param values: 原始编号的可迭代对象
+    :return: (编号列表, 重复的编号数)
+    """
+    serial_nos = {}
+    duplicates = 0
+    for value in values:
+        serial_no = normalize_serial_no(value)
+        if serial_no is None:
+            continue
+        if serial_no in serial_nos:
+            duplicates += 1
+            continue
+        serial_nos[serial_no] = None
+    return list(serial_nos), duplicates
+
+
+def read_serial_nos(path):
+    """
+    从文件或标准输入读取编号
+
+    每行可包含多个以空白、逗号或分号分隔的编号，#之后的内容为注释。
+
+    :param path: 文件路径，'-'表示标准输入
+    :return: (规范化去重后的编号列表, 重复的编号数)
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+
+    tokens = []
+    for line in lines:
+        line = line.split('#', 1)[0]
+        tokens.extend(token for token in _SEPARATORS.split(line) if token)
+    return normalize_serial_nos(tokens)
+
+
+class NdjsonWriter:
+    """逐行写出NDJSON结果，每行写出后立即刷新"""
+
+    def __init__(self, path):
+        """
+        :param path: 输出文件路径，'-'表示标准输出
+        """
+        self.file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8')
+        self.count = 0
+        self.failed = 0
+
+    def write(self, item, ok=True):
+        """
+        :param item: 结果字典
+        :param ok: 是否计为成功
+        """
+        self.file.write(json.dumps(item, ensure_ascii=False, default=str) + '\n')
+        self.file.flush()
+        self.count += 1
+        if not ok:
+            self.failed += 1
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class SiteWriter:
+    """为每条结果加上站点名称后写出"""
+
+    def __init__(self, writer, site):
+        self.writer = writer
+        self.site = site
+
+    def write(self, item, ok=True):
+        self.writer.write({'site': self.site, **item}, ok)
+
+
+def log(message):
+    """输出进度信息到标准错误，不影响NDJSON输出"""
+    print(message, file=sys.stderr)
+
+
+async def run_update_control(client, args, writer):
+    serial_nos = args.serial_nos
+    if not serial_nos:
+        return
+
+    failed = 0
+
+    def write_device(device):
+        nonlocal failed
+        ok = device['found'] and device.get('pushed', False)
+        if not ok:
+            failed += 1
+        writer.write(device, ok=ok)
+
+    result = await client.update_control_by_serial_no(
+        serial_nos,
+        max_concurrency=args.concurrency,
+        resolver=args.resolver,
+        chunk_size=args.chunk_size or None,
+        chunk_concurrency=args.chunk_concurrency,
+        chunk_retries=args.retries,
+        on_device=write_device
+    )
+    log(result['message'])
+    if not result['success'] and failed == 0:
+        # 没有逐个输出失败设备时（如查询guid前出错）也要计为失败
+        writer.write({'error': result['message']}, ok=False)
+
+
+async def run_renumber(client, args, writer):
+    rows = args.rows
+
+    def write_result(i, row, result):
+        writer.write({
+            'row': i + 1,
+            **row,
+            'success': result['success'],
+            'skipped': result.get('skipped', False),
+            'message': result['message'],
+            'changes': result.get('changes')
+        }, ok=result['success'])
+
+    await renumber_valves(client, rows, args.concurrency, args.rate, write_result, args.dry_run)
+
+
+async def run_find(client, args, writer):
+    serial_nos = args.serial_nos
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def find_one(serial_no):
+        async with semaphore:
+            search_result = await client.find_household_valve(FindHouseholdValveParams(serial_no=serial_no))
+        if not (search_result and search_result.get('resultCode') == 0):
+            writer.write({'serial_no': serial_no, 'found': False, 'error': '查询失败'}, ok=False)
+            return
+        valves = [
+            valve for valve in search_result.get('data', {}).get('data') or []
+            if str(valve.get('serialNo')) == serial_no
+        ]
+        writer.write({'serial_no': serial_no, 'found': bool(valves), 'valves': valves}, ok=bool(valves))
+
+    await asyncio.gather(*[find_one(serial_no) for serial_no in serial_nos])
+
+
+async def run_meter_status(client, args, writer):
+    serial_nos = args.serial_nos
+    if not serial_nos:
+        return
+
+    def write_chunk(chunk, records, error):
+        records_by_serial_no = {str(record.get('serialNo')): record for record in records}
+        for serial_no in chunk:
+            if error is not None:
+                writer.write({'serial_no': serial_no, 'found': False, 'error': error}, ok=False)
+                continue
+            record = records_by_serial_no.get(serial_no)
+            writer.write({
+                'serial_no': serial_no,
+                'found': record is not None,
+                'comm_status': record.get('commStatus') if record else None,
+                'record': record
+            }, ok=record is not None)
+
+    result = await client.find_household_meter_current_data_batch(
+        serial_nos,
+        max_condition_length=args.max_condition_length,
+        max_concurrency=args.concurrency,
+        use_in=args.use_in,
+        on_chunk=write_chunk
+    )
+    log(result['message'])
+
+
+async def run_monitor(client, args, writer):
+    serial_nos = args.serial_nos
+    if not serial_nos:
+        return
+
+    def log_cycle(stats):
+        log(f"第{stats['cycle']}个周期：耗时 {stats['duration']:.1f} 秒，请求 {stats['requests']} 次，"
+            f"接收 {stats['response_bytes']} 字节，在线 {stats['online']}，离线 {stats['offline']}，"
+            f"无记录 {stats['missing']}，查询失败 {stats['failed']}，状态变化 {stats['transitions']}")
+        if args.cycle_output:
+            args.cycle_output.write(stats, ok=stats['failed_batches'] == 0)
+
+    monitor = CommStatusMonitor(
+        client,
+        serial_nos,
+        interval=args.interval,
+        batch_size=args.batch_size,
+        jitter=args.jitter,
+        max_concurrency=args.concurrency,
+        online_statuses=args.online_status or ('正常',),
+        on_transition=writer.write,
+        on_cycle=log_cycle,
+        max_condition_length=args.max_condition_length,
+        use_in=args.use_in,
+        emit_initial=args.emit_initial
+    )
+    await monitor.run(args.cycles or None)
+
+
+def read_renumber_rows(path):
+    """
+    读取阀号替换CSV，规范化阀号并去掉完全相同的行
+
+    :param path: CSV文件路径
+    :return: (替换任务列表, 重复的行数)
+    """
+    raw_rows = read_renumber_csv(path)
+    unique_rows = {}
+    for row in raw_rows:
+        row = {
+            'query_serial_no': normalize_serial_no(row['query_serial_no']) or '',
+            'query_address': row['query_address'],
+            'new_serial_no': normalize_serial_no(row['new_serial_no']) or ''
+        }
+        unique_rows.setdefault(tuple(row.values()), row)
+    return list(unique_rows.values()), len(raw_rows) - len(unique_rows)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='户阀平台命令行工具，结果按NDJSON逐行输出')
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help='接口地址')
+    parser.add_argument('--token', default=os.environ.get('HOUSE_VALVE_TOKEN'),
+                        help='认证token，默认读取环境变量HOUSE_VALVE_TOKEN')
+    parser.add_argument('--output', '-o', default='-', help="NDJSON结果文件，默认为'-'表示标准输出")
+    parser.add_argument('--sites', default=None,
+                        help='站点清单JSON文件，指定时在所有站点上并发执行，结果带site字段（忽略--base-url和--token）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    update_control = subparsers.add_parser('update-control', help='按采集器编号下发档案')
+    update_control.add_argument('input', nargs='?', default='-', help="采集器编号文件，默认为'-'表示标准输入")
+    update_control.add_argument('--concurrency', type=int, default=10, help='并发查询guid的最大数量')
+    update_control.add_argument('--resolver', choices=['auto', 'scan', 'lookup'], default='auto', help='guid查询方式')
+    update_control.add_argument('--chunk-size', type=int, default=50, help='每批下发的设备数量，0表示一次下发全部')
+    update_control.add_argument('--chunk-concurrency', type=int, default=4, help='同时下发的最大批数')
+    update_control.add_argument('--retries', type=int, default=1, help='每个失败批次的最大重试次数')
+
+    renumber = subparsers.add_parser('renumber', help='按CSV批量替换阀号')
+    renumber.add_argument('input', help='替换任务CSV文件，表头为 query_serial_no,query_address,new_serial_no')
+    renumber.add_argument('--concurrency', type=int, default=5, help='同时执行的最大任务数')
+    renumber.add_argument('--rate', type=float, default=None, help='每秒最多开始的任务数')
+    renumber.add_argument('--dry-run', action='store_true', help='只输出每行需要修改的字段，不执行更新')
+    renumber.add_argument('--journal', default=None, help='户阀修改日志文件，可用valve_journal.py回滚')
+
+    find = subparsers.add_parser('find', help='按阀号查询户阀')
+    find.add_argument('input', nargs='?', default='-', help="阀号文件，默认为'-'表示标准输入")
+    find.add_argument('--concurrency', type=int, default=10, help='同时查询的最大数量')
+
+    meter_status = subparsers.add_parser('meter-status', help='按阀号查询抄通状态')
+    meter_status.add_argument('input', nargs='?', default='-', help="阀号文件，默认为'-'表示标准输入")
+    meter_status.add_argument('--concurrency', type=int, default=5, help='并发查询的最大批数')
+    meter_status.add_argument('--max-condition-length', type=int, default=3000,
+                              help='单个查询条件URL编码后的最大长度')
+    meter_status.add_argument('--use-in', action='store_true', help='使用IN条件代替OR条件')
+
+    monitor = subparsers.add_parser('monitor', help='持续监控抄通状态，只输出状态变化')
+    monitor.add_argument('input', nargs='?', default='-', help="阀号文件，默认为'-'表示标准输入")
+    monitor.add_argument('--interval', type=float, default=300.0, help='每个阀号的查询间隔（秒）')
+    monitor.add_argument('--batch-size', type=int, default=500, help='每批查询的阀号数量')
+    monitor.add_argument('--jitter', type=float, default=0.5, help='每批在自己的时间片内随机推迟的最大比例（0~1）')
+    monitor.add_argument('--concurrency', type=int, default=2, help='同时查询的最大批数')
+    monitor.add_argument('--cycles', type=int, default=0, help='执行的周期数，0表示一直运行')
+    monitor.add_argument('--online-status', action='append', default=None,
+                         help="视为在线的commStatus取值，可重复指定，默认为'正常'")
+    monitor.add_argument('--emit-initial', action='store_true', help='第一次查询到的状态也作为变化输出')
+    monitor.add_argument('--cycle-output', default=None, help='每个周期的耗时和请求统计NDJSON文件')
+    monitor.add_argument('--max-condition-length', type=int, default=3000,
+                         help='单个查询条件URL编码后的最大长度')
+    monitor.add_argument('--use-in', action='store_true', help='使用IN条件代替OR条件')
+
+    return parser
+
+
+COMMANDS = {
+    'update-control': run_update_control,
+    'renumber': run_renumber,
+    'find': run_find,
+    'meter-status': run_meter_status,
+    'monitor': run_monitor
+}
+
+
+async def main(argv=None, client_kwargs=None):
+    """
+    :param argv: 命令行参数，默认为None表示sys.argv
+    :param client_kwargs: 额外传给HouseValveClient的参数（如transport）
+    :return: 退出码，全部成功时为0
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    journal_path = getattr(args, 'journal', None)
+    sites = load_sites(args.sites) if args.sites else None
+    if sites is None and not args.token:
+        parser.error("请通过--token或环境变量HOUSE_VALVE_TOKEN提供认证token")
+    if sites is not None and journal_path:
+        parser.error("--journal不能与--sites同时使用，请按站点分别执行")
+
+    # 在任何网络请求之前读取并规范化输入
+    if args.command == 'renumber':
+        args.rows, duplicates = read_renumber_rows(args.input)
+        log(f"共 {len(args.rows)} 个替换任务（去除重复 {duplicates} 个）")
+    else:
+        args.serial_nos, duplicates = read_serial_nos(args.input)
+        log(f"共 {len(args.serial_nos)} 个编号（去除重复 {duplicates} 个）")
+
+    command = COMMANDS[args.command]
+    journal = ValveJournal(journal_path) if journal_path else None
+    cycle_output = getattr(args, 'cycle_output', None)
+    if cycle_output:
+        args.cycle_output = NdjsonWriter(cycle_output)
+    writer = NdjsonWriter(args.output)
+    try:
+        if sites is None:
+            kwargs = {'base_url': args.base_url, 'token': args.token, 'journal': journal, **(client_kwargs or {})}
+            async with HouseValveClient(**kwargs) as client:
+                await command(client, args, writer)
+        else:
+            async def run_site(client, site):
+                await command(client, args, SiteWriter(writer, site.name))
+                return True
+
+            def log_site(result):
+                if not result['success']:
+                    writer.write({'site': result['site'], 'error': result['error']}, ok=False)
+
+            async with MultiSiteCoordinator(sites, client_kwargs=client_kwargs) as coordinator:
+                await coordinator.run(run_site, log_site)
+    finally:
+        writer.close()
+        if cycle_output:
+            args.cycle_output.close()
+        if journal is not None:
+            journal.close()
+
+    log(f"完成：输出 {writer.count} 条，失败 {writer.failed} 条")
+    return 0 if writer.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from models import UpdateHouseholdValveParams
+
+
+class ValveJournal:
+    """
+    户阀修改前镜像的追加写日志（NDJSON）
+
+    每次updateHouseholdValve之前追加一条write记录（修改前的户阀信息和将要写入的内容），
+    请求结束后追加一条outcome记录。文件只追加不修改，回滚时按序号范围或会话读取。
+    追加只写入操作系统缓冲，由sync在线程中fsync落盘，并发的更新共用一次fsync。
+    """
+
+    def __init__(self, path='valve_journal.ndjson', session=None):
+        """
+        :param path: 日志文件路径，默认为当前目录下的valve_journal.ndjson
+        :param session: 本次运行的会话标识，默认为None表示按当前时间生成
+        """
+        self.path = path
+        self.session = session or time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}'
+        self.next_seq = self._last_seq() + 1
+        self.file = open(path, 'a', encoding='utf-8')
+        self.written = 0
+        self.synced = 0
+        self.fsyncs = 0
+        self._sync_lock = None
+        self._sync_loop = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _last_seq(self):
+        last_seq = 0
+        for entry in _read_lines(self.path):
+            last_seq = max(last_seq, entry.get('seq', 0))
+        return last_seq
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.written += 1
+
+    async def sync(self):
+        """
+        将已追加的记录落盘
+
+        fsync在线程中执行，不阻塞事件循环；等待期间其他协程追加的记录由下一次fsync一并落盘。
+        """
+        loop = asyncio.get_running_loop()
+        if self._sync_loop is not loop:
+            self._sync_lock = asyncio.Lock()
+            self._sync_loop = loop
+        target = self.written
+        async with self._sync_lock:
+            if self.synced >= target:
+                return
+            written = self.written
+            await asyncio.to_thread(os.fsync, self.file.fileno())
+            self.fsyncs += 1
+            self.synced = written
+
+    def append(self, before, after):
+        """
+        在更新请求发出前追加修改前镜像，发出请求前应调用sync落盘
+
+        :param before: 修改前的户阀信息字典（findHouseholdValve返回的格式），未知时为None
+        :param after: 将要提交的updateHouseholdValve请求体
+        :return: 日志序号
+        """
+        seq = self.next_seq
+        self.next_seq += 1
+        self._write({
+            'type': 'write',
+            'seq': seq,
+            'session': self.session,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'unique_id': after.get('uniqueId'),
+            'before': before,
+            'after': after
+        })
+        return seq
+
+    def mark(self, seq, ok, message=None):
+        """
+        记录更新请求的结果
+
+        :param seq: append返回的日志序号
+        :param ok: 更新是否成功
+        :param message: 结果消息
+        """
+        self._write({'type': 'outcome', 'seq': seq, 'ok': ok, 'message': message})
+
+    def close(self):
+        """将尚未落盘的记录落盘并关闭日志文件"""
+        if self.file.closed:
+            return
+        if self.synced < self.written:
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+            self.synced = self.written
+        self.file.close()
+
+
+def _read_lines(path):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # 写入中断留下的不完整行
+                continue
+
+
+def read_journal(path, from_seq=None, to_seq=None, session=None):
+    """
+    读取日志中的写入记录
+
+    :param path: 日志文件路径
+    :param from_seq: 起始序号（含），默认为None表示不限
+    :param to_seq: 结束序号（含），默认为None表示不限
+    :param session: 会话标识，默认为None表示所有会话
+    :return: 按序号排列的写入记录列表，每条记录的ok为请求结果（请求中断时为None）
+    """
+    entries = {}
+    outcomes = {}
+    for entry in _read_lines(path):
+        if entry.get('type') == 'write':
+            entries[entry['seq']] = entry
+        elif entry.get('type') == 'outcome':
+            outcomes[entry['seq']] = entry
+
+    result = []
+    for seq in sorted(entries):
+        entry = entries[seq]
+        if from_seq is not None and seq < from_seq:
+            continue
+        if to_seq is not None and seq > to_seq:
+            continue
+        if session is not None and entry.get('session') != session:
+            continue
+        outcome = outcomes.get(seq)
+        entry['ok'] = outcome.get('ok') if outcome else None
+        result.append(entry)
+    return result
+
+
+def list_sessions(path):
+    """
+    :param path: 日志文件路径
+    :return: 会话列表，每项包含session、first_seq、last_seq、time和writes
+    """
+    sessions = {}
+    for entry in read_journal(path):
+        item = sessions.setdefault(entry['session'], {
+            'session': entry['session'],
+            'first_seq': entry['seq'],
+            'last_seq': entry['seq'],
+            'time': entry['time'],
+            'writes': 0
+        })
+        item['last_seq'] = entry['seq']
+        item['writes'] += 1
+    return list(sessions.values())
+
+
+async def rollback(client, entries, max_concurrency=10, dry_run=False, on_result=None):
+    """
+    按修改前镜像回滚日志中的写入
+
+    同一户阀的写入按序号倒序依次恢复，不同户阀之间并发执行。确认失败的写入会被跳过，
+    请求中断（结果未知）的写入仍会恢复。
+
+    :param client: HouseValveClient实例
+    :param entries: read_journal返回的写入记录列表
+    :param max_concurrency: 同时回滚的最大户阀数，默认为10
+    :param dry_run: 为True时只返回将要恢复的内容，不执行更新，默认为False
+    :param on_result: 每条记录处理完成时的回调，参数为 (写入记录, 结果字典)
+    :return: 结果字典列表，每项包含seq、unique_id、success和message
+    """
+    groups = {}
+    for entry in entries:
+        if entry.get('ok') is False:
+            continue
+        groups.setdefault(entry.get('unique_id'), []).append(entry)
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results = []
+
+    async def restore(entry):
+        result = {'seq': entry['seq'], 'unique_id': entry.get('unique_id'), 'success': False, 'message': ''}
+        before = entry.get('before')
+        if not before:
+            result['message'] = "日志中没有修改前镜像，无法恢复"
+            return result
+
+        params = UpdateHouseholdValveParams.from_valve(before)
+        if dry_run:
+            result['success'] = True
+            result['message'] = f"试运行：将恢复为 serialNo={params.serial_no}"
+            return result
+
+        # 按该次写入后的阀号查询当前记录，作为本次回滚写入的修改前镜像
+        after = entry.get('after') or {}
+        current = await client.find_valve_by_unique_id(entry.get('unique_id'), after.get('serialNo'))
+        try:
+            update_result = await client.update_household_valve(
+                params, pre_image=current, current_serial_no=after.get('serialNo')
+            )
+        except ValueError as e:
+            result['message'] = f"恢复失败：{e}"
+            return result
+        if update_result and update_result.get('resultCode') == 0:
+            result['success'] = True
+            result['message'] = f"已恢复为 serialNo={params.serial_no}"
+        elif update_result:
+            result['message'] = f"恢复失败：API返回错误 - {update_result.get('message', '未知错误')}"
+        else:
+            result['message'] = "恢复失败：API调用失败"
+        return result
+
+    async def run_group(group):
+        async with semaphore:
+            for entry in sorted(group, key=lambda item: item['seq'], reverse=True):
+                result = await restore(entry)
+                results.append(result)
+                if on_result is not None:
+                    on_result(entry, result)
+
+    await asyncio.gather(*[run_group(group) for group in groups.values()])
+    return sorted(results, key=lambda item: item['seq'], reverse=True)
+
+
+async def main():
+    from house_valve_client import HouseValveClient
+
+    parser = argparse.ArgumentParser(description='户阀修改日志：查看会话、按日志回滚')
+    parser.add_argument('--journal', default='valve_journal.ndjson', help='日志文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('sessions', help='列出日志中的会话')
+
+    rollback_parser = subparsers.add_parser('rollback', help='按修改前镜像回滚')
+    rollback_parser.add_argument('--base-url', default='http://112.53.73.250:2288', help='接口地址')
+    rollback_parser.add_argument('--token', required=True, help='认证token')
+    rollback_parser.add_argument('--session', help='只回滚该会话的写入')
+    rollback_parser.add_argument('--from-seq', type=int, help='起始序号（含）')
+    rollback_parser.add_argument('--to-seq', type=int, help='结束序号（含）')
+    rollback_parser.add_argument('--concurrency', type=int, default=10, help='同时回滚的最大户阀数')
+    rollback_parser.add_argument('--dry-run', action='store_true', help='只输出将要恢复的内容，不执行更新')
+    args = parser.parse_args()
+
+    if args.command == 'sessions':
+        for item in list_sessions(args.journal):
+            print(f"{item['session']}  序号 {item['first_seq']}-{item['last_seq']}  写入 {item['writes']} 次  开始于 {item['time']}")
+        return 0
+
+    if args.session is None and args.from_seq is None and args.to_seq is None:
+        parser.error("请指定--session或--from-seq/--to-seq，避免误回滚整个日志")
+
+    entries = read_journal(args.journal, args.from_seq, args.to_seq, args.session)
+    print(f"共 {len(entries)} 条写入记录待回滚")
+
+    def print_result(entry, result):
+        status = "成功" if result['success'] else "失败"
+        print(f"  [{entry['seq']}] uniqueId={entry.get('unique_id')} {status}：{result['message']}")
+
+    # 回滚写入同样记录到日志中，需要时可以再次回滚
+    with ValveJournal(args.journal) as journal:
+        async with HouseValveClient(base_url=args.base_url, token=args.token, journal=journal) as client:
+            results = await rollback(client, entries, args.concurrency, args.dry_run, print_result)
+
+    success_count = sum(1 for result in results if result['success'])
+    print(f"完成：成功 {success_count} 条，失败 {len(results) - success_count} 条")
+    return 0 if success_count == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,264 @@
+import sys
+from typing import Optional
+
+
+# 户阀接口字段（驼峰）到记录属性（下划线）的映射
+VALVE_FIELDS = {
+    'uniqueId': 'unique_id',
+    'serialNo': 'serial_no',
+    'address': 'address',
+    'stationBranchName': 'station_branch_name',
+    'stationBranchId': 'station_branch_id',
+    'type': 'type_valve',
+    'unitName': 'unit_name',
+    'factoryId': 'factory_id',
+    'modelId': 'model_id',
+    'netEquId': 'net_equ_id',
+    'collectorId': 'collector_id',
+    'port': 'port',
+    'baudRate': 'baud_rate',
+    'checkBit': 'check_bit',
+    'index': 'index',
+    'caliber': 'caliber',
+    'isReadCard': 'is_read_card',
+    'isTemControl': 'is_tem_control',
+    'isSettingTem': 'is_setting_tem',
+    'isTemRange': 'is_tem_range',
+    'isLockTem': 'is_lock_tem',
+    'detailPosition': 'detail_position',
+    'intermediatePath': 'intermediate_path',
+    'enabled': 'enabled',
+    'installDate': 'install_date',
+    'createDate': 'create_date',
+    'memo': 'memo',
+    'panelSerialNo': 'panel_serial_no',
+    'communicationType': 'communication_type',
+    'panelId': 'panel_id',
+    'roomPanelId': 'room_panel_id',
+    'identificationCode': 'identification_code',
+    'equipmentUse': 'equipment_use',
+    'installSite': 'install_site'
+}
+
+# 取值重复度高的字段，字符串值会被驻留以节省内存
+INTERNED_FIELDS = {
+    'station_branch_name', 'type_valve', 'unit_name', 'baud_rate', 'check_bit', 'is_read_card',
+    'is_tem_control', 'is_setting_tem', 'is_tem_range', 'is_lock_tem', 'intermediate_path',
+    'equipment_use', 'install_site'
+}
+
+
+class ValveRecord:
+    """
+    紧凑的户阀记录
+
+    已知字段保存在__slots__属性中，接口返回的其他字段保存在extra字典中（没有时为None）。
+    """
+
+    __slots__ = tuple(VALVE_FIELDS.values()) + ('extra',)
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, valve):
+        """
+        从接口返回的户阀信息字典创建记录
+
+        :param valve: 户阀信息字典（驼峰字段名）
+        :return: ValveRecord实例
+        """
+        record = cls.__new__(cls)
+        for key, name in VALVE_FIELDS.items():
+            value = valve.get(key)
+            if name in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, name, value)
+        extra = {key: value for key, value in valve.items() if key not in VALVE_FIELDS}
+        record.extra = extra or None
+        return record
+
+    def to_dict(self):
+        """
+        :return: 接口格式的户阀信息字典（驼峰字段名）
+        """
+        valve = {key: getattr(self, name) for key, name in VALVE_FIELDS.items()}
+        if self.extra:
+            valve.update(self.extra)
+        return valve
+
+    def get(self, key, default=None):
+        """
+        按接口字段名读取值，与户阀信息字典的get用法相同
+
+        :param key: 驼峰字段名，如serialNo
+        :param default: 字段不存在或值为None时的默认值
+        :return: 字段值
+        """
+        name = VALVE_FIELDS.get(key)
+        if name is not None:
+            value = getattr(self, name)
+        elif self.extra:
+            value = self.extra.get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"ValveRecord(unique_id={self.unique_id!r}, serial_no={self.serial_no!r}, address={self.address!r})"
+
+
+def _key(value):
+    return None if value is None else str(value)
+
+
+class ValveStore:
+    """
+    带哈希索引的户阀内存存储
+
+    按uniqueId唯一存储，并在serialNo、address、collectorId、netEquId上建立索引，查询为O(1)。
+    没有uniqueId的记录各自单独存储（不会互相覆盖），可通过索引查询，但不能按uniqueId查找或删除。
+    """
+
+    INDEXES = ('serial_no', 'address', 'collector_id', 'net_equ_id')
+
+    def __init__(self, valves=None):
+        """
+        :param valves: 初始户阀列表，元素可以是户阀信息字典或ValveRecord
+        """
+        self.records = {}
+        # 没有uniqueId的记录数，用于生成不会与uniqueId冲突的存储键
+        self._anonymous = 0
+        self.indexes = {name: {} for name in self.INDEXES}
+        if valves:
+            self.add_many(valves)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def _index(self, record):
+        for name, index in self.indexes.items():
+            key = _key(getattr(record, name))
+            if key is not None:
+                index.setdefault(key, []).append(record)
+
+    def _unindex(self, record):
+        for name, index in self.indexes.items():
+            key = _key(getattr(record, name))
+            bucket = index.get(key)
+            if bucket is None:
+                continue
+            bucket[:] = [item for item in bucket if item is not record]
+            if not bucket:
+                del index[key]
+
+    def add(self, valve):
+        """
+        添加或替换一条户阀记录（按uniqueId）
+
+        :param valve: 户阀信息字典或ValveRecord
+        :return: 存入的ValveRecord
+        """
+        record = valve if isinstance(valve, ValveRecord) else ValveRecord.from_dict(valve)
+        unique_id = _key(record.unique_id)
+        if unique_id is None:
+            self._anonymous += 1
+            unique_id = (None, self._anonymous)
+        old = self.records.get(unique_id)
+        if old is not None:
+            self._unindex(old)
+        self.records[unique_id] = record
+        self._index(record)
+        return record
+
+    def add_many(self, valves):
+        """
+        :param valves: 户阀信息字典或ValveRecord的可迭代对象
+        :return: 添加的记录数
+        """
+        count = 0
+        for valve in valves:
+            self.add(valve)
+            count += 1
+        return count
+
+    def remove(self, unique_id):
+        """
+        :param unique_id: 户阀唯一ID
+        :return: 被删除的ValveRecord，不存在时返回None
+        """
+        record = self.records.pop(_key(unique_id), None)
+        if record is not None:
+            self._unindex(record)
+        return record
+
+    def load_result(self, result):
+        """
+        从find_household_valve的返回结果加载户阀
+
+        :param result: find_*接口返回的字典
+        :return: 添加的记录数
+        """
+        if not (result and result.get('resultCode') == 0):
+            return 0
+        return self.add_many(result.get('data', {}).get('data') or [])
+
+    def load_snapshot(self, snapshot):
+        """
+        从本地快照加载户阀
+
+        :param snapshot: RegistrySnapshot实例
+        :return: 添加的记录数
+        """
+        return self.add_many(snapshot.iter_valves())
+
+    async def load_from_client(self, client, params=None):
+        """
+        通过接口自动翻页加载户阀
+
+        :param client: HouseValveClient实例
+        :param params: 户阀查询参数模型，默认为None表示全部户阀
+        :return: 添加的记录数
+        """
+        count = 0
+        async for valve in client.iter_household_valves(params):
+            self.add(valve)
+            count += 1
+        return count
+
+    def by_unique_id(self, unique_id) -> Optional[ValveRecord]:
+        """按uniqueId查找户阀，不存在时返回None"""
+        return self.records.get(_key(unique_id))
+
+    def by_serial_no(self, serial_no):
+        """按户阀编号查找户阀，返回ValveRecord列表"""
+        return list(self.indexes['serial_no'].get(_key(serial_no), ()))
+
+    def by_address(self, address):
+        """按地址查找户阀，返回ValveRecord列表"""
+        return list(self.indexes['address'].get(_key(address), ()))
+
+    def by_collector(self, collector_id):
+        """按collectorId查找户阀，返回ValveRecord列表"""
+        return list(self.indexes['collector_id'].get(_key(collector_id), ()))
+
+    def by_net_equ(self, net_equ_id):
+        """按netEquId查找户阀，返回ValveRecord列表"""
+        return list(self.indexes['net_equ_id'].get(_key(net_equ_id), ()))
+
+    def find(self, serial_no, address) -> Optional[ValveRecord]:
+        """
+        按阀号和地址查找唯一户阀
+
+        :param serial_no: 户阀编号
+        :param address: 户阀地址
+        :return: 匹配的ValveRecord，不存在时返回None
+        """
+        for record in self.indexes['serial_no'].get(_key(serial_no), ()):
+            if record.address == address:
+                return record
+        return None